@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Load test for the annotation server.
+Starts a local multi-threaded instance (or targets --url, e.g. a gunicorn
+deployment) and measures, with several simulated annotators:
+1. Cold start: all clients open the same uncached trial at once
+   (it must be synchronized only once)
+2. Responsiveness: latency of light requests while that trial is loading
+3. Paging: clients page through the trial concurrently
+"""
+
+import sys
+sys.path.append('src')
+sys.path.append('web-tool')
+
+import argparse
+import json
+import logging
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+PAGE_SECONDS = 20.0
+
+def fetch(url: str, headers: dict = None) -> tuple:
+    """GET a URL; returns (status, body size, seconds)."""
+    request = urllib.request.Request(url, headers=headers or {})
+    start = time.perf_counter()
+    with urllib.request.urlopen(request) as response:
+        body = response.read()
+        status = response.status
+    return status, len(body), time.perf_counter() - start
+
+def get_json(url: str) -> dict:
+    """GET a JSON response."""
+    with urllib.request.urlopen(url) as response:
+        return json.loads(response.read())
+
+def start_local_server(data_dir: str) -> tuple:
+    """Serve create_app() on a free local port in a background thread; returns (url, server)."""
+    from werkzeug.serving import make_server
+    from annotation_server import create_app
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)  # No per-request log lines
+    server = make_server('127.0.0.1', 0, create_app(data_dir=data_dir), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}', server
+
+def summarize(label: str, latencies: list) -> None:
+    """Print latency percentiles in milliseconds."""
+    ms = np.array(latencies) * 1000
+    print(f"   {label:<34} n={len(ms):<4} p50 {np.percentile(ms, 50):8.1f} ms   "
+          f"p95 {np.percentile(ms, 95):8.1f} ms   max {ms.max():8.1f} ms")
+
+def cold_start(base_url: str, trial_id: str, clients: int) -> None:
+    """All clients request the first page of an uncached trial at the same time."""
+    print(f"1. Cold start: {clients} clients open {trial_id} at once...")
+    before = get_json(f'{base_url}/api/cache/stats')['pipeline']['synchronized']['misses']
+
+    # Light requests keep running while the trial loads
+    light_latencies = []
+    loading = threading.Event()
+    loading.set()
+
+    def poll_light_requests():
+        while loading.is_set():
+            light_latencies.append(fetch(f'{base_url}/api/trials')[2])
+            time.sleep(0.01)
+
+    poller = threading.Thread(target=poll_light_requests)
+    poller.start()
+
+    barrier = threading.Barrier(clients)
+
+    def open_trial(_):
+        barrier.wait()
+        return fetch(f'{base_url}/api/data/{trial_id}?format=binary&start=0&end={PAGE_SECONDS}')
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        results = list(pool.map(open_trial, range(clients)))
+    elapsed = time.perf_counter() - start
+    loading.clear()
+    poller.join()
+
+    after = get_json(f'{base_url}/api/cache/stats')['pipeline']['synchronized']['misses']
+    assert all(status == 200 for status, _, _ in results)
+    summarize('first page', [seconds for _, _, seconds in results])
+    print(f"   wall time {elapsed:.2f} s, synchronizations: {after - before}")
+
+    print("2. Light requests (/api/trials) while the trial was loading...")
+    summarize('trial list', light_latencies)
+
+def paging(base_url: str, trial_id: str, clients: int, pages: int, duration: float) -> None:
+    """Each client pages through the trial, starting at a different page."""
+    print(f"3. Paging: {clients} clients x {pages} pages of {PAGE_SECONDS:.0f} s...")
+    n_pages = max(1, int(duration // PAGE_SECONDS))
+    headers = {'Accept-Encoding': 'gzip'}
+
+    def annotate(client):
+        latencies = []
+        for page in range(pages):
+            start = ((client + page) % n_pages) * PAGE_SECONDS
+            url = f'{base_url}/api/data/{trial_id}?format=binary&start={start}&end={start + PAGE_SECONDS}'
+            status, _, seconds = fetch(url, headers)
+            assert status == 200
+            latencies.append(seconds)
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        latencies = [seconds for client in pool.map(annotate, range(clients)) for seconds in client]
+    elapsed = time.perf_counter() - start
+
+    summarize('page (binary, gzip)', latencies)
+    print(f"   throughput {len(latencies) / elapsed:.1f} pages/s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='Server to test (default: start a local instance)')
+    parser.add_argument('--data-dir', default='data', help='Data directory of the local instance')
+    parser.add_argument('--trial', default='T5', help='Trial to load')
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent annotators')
+    parser.add_argument('--pages', type=int, default=10, help='Pages requested per annotator')
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        base_url, server = start_local_server(args.data_dir)
+    base_url = base_url.rstrip('/')
+    print(f"Load testing {base_url} ({args.clients} clients, trial {args.trial})\n")
+
+    trials = {trial['id']: trial for trial in get_json(f'{base_url}/api/trials')['trials']}
+    if args.trial not in trials:
+        raise SystemExit(f"Trial {args.trial} not available (found: {sorted(trials)})")
+
+    cold_start(base_url, args.trial, args.clients)
+    paging(base_url, args.trial, args.clients, args.pages, trials[args.trial]['duration_seconds'])
+
+    stats = get_json(f'{base_url}/api/cache/stats')
+    print(f"\nTrial cache: {stats['trials']['entries']} entries, {stats['trials']['bytes'] / 1e6:.0f} MB; "
+          f"response cache: {stats['responses']['entries']} entries, {stats['responses']['bytes'] / 1e6:.0f} MB")
+
+    if server is not None:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark event matching: the validation notebook's nested-loop greedy
+calculate_accuracy vs the sorted-array event_matching engine.
+Checks optimality against a full assignment on random event sets, then scores
+synthetic predictions (timing jitter, misses, false positives) for a 300 s trial.
+"""
+
+import sys
+sys.path.append('src')
+
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import linear_sum_assignment
+
+from event_matching import match_events, score_events
+
+EVENT_TYPES = ('left_heel_strike', 'left_toe_off', 'right_heel_strike', 'right_toe_off')
+DURATION_S = 300.0
+CYCLE_S = 1.1
+TOLERANCE_S = 0.1
+N_RANDOM_CASES = 500
+N_REPEATS = 3
+
+def make_events(rng: np.random.Generator) -> tuple:
+    """Ground truth events every gait cycle and predictions with jitter, misses and false positives."""
+    truth = []
+    predicted = []
+    for i, event_type in enumerate(EVENT_TYPES):
+        times = np.arange(i * CYCLE_S / 4, DURATION_S, CYCLE_S)
+        truth.append(pd.DataFrame({'time': times, 'type': event_type}))
+
+        detected = times[rng.random(len(times)) > 0.1]
+        detected = detected + rng.normal(0, 0.04, len(detected))
+        false_positives = rng.uniform(0, DURATION_S, len(times) // 10)
+        predicted.append(pd.DataFrame({'time': np.concatenate([detected, false_positives]), 'type': event_type}))
+    return pd.concat(predicted, ignore_index=True), pd.concat(truth, ignore_index=True)
+
+def calculate_accuracy_legacy(predicted_events: pd.DataFrame, ground_truth_events: pd.DataFrame,
+                              tolerance: float = TOLERANCE_S) -> dict:
+    """calculate_accuracy of 03_validation.ipynb: greedy nested loops over DataFrame rows."""
+    matched_gt = set()
+    for pred_idx, pred_event in predicted_events.iterrows():
+        for gt_idx, gt_event in ground_truth_events.iterrows():
+            if (gt_event['type'] == pred_event['type'] and
+                abs(gt_event['time'] - pred_event['time']) <= tolerance and
+                gt_idx not in matched_gt):
+                matched_gt.add(gt_idx)
+                break
+    return {'true_positives': len(matched_gt)}
+
+def match_brute_force(predicted: np.ndarray, truth: np.ndarray, tolerance: float) -> tuple:
+    """Maximum matching with minimal total error over the full cost matrix: (matches, total error)."""
+    distance = np.abs(predicted[:, None] - truth[None, :])
+    within = distance <= tolerance
+    reward = tolerance * (min(distance.shape) + 1) + 1.0
+    rows, cols = linear_sum_assignment(np.where(within, distance - reward, 0.0))
+    valid = within[rows, cols]
+    return int(valid.sum()), float(distance[rows[valid], cols[valid]].sum())
+
+def match_greedy(predicted: np.ndarray, truth: np.ndarray, tolerance: float) -> int:
+    """Number of matches of the legacy greedy order (first free truth event for each prediction)."""
+    matched = set()
+    for pred_time in predicted:
+        for i, truth_time in enumerate(truth):
+            if abs(truth_time - pred_time) <= tolerance and i not in matched:
+                matched.add(i)
+                break
+    return len(matched)
+
+def check_optimality(rng: np.random.Generator) -> tuple:
+    """
+    Compare match_events with the full assignment on dense random event sets.
+
+    Returns:
+        (failures, cases where the greedy order finds fewer matches)
+    """
+    failures = 0
+    greedy_short = 0
+    for _ in range(N_RANDOM_CASES):
+        predicted = rng.uniform(0, 2, rng.integers(0, 30))
+        truth = rng.uniform(0, 2, rng.integers(0, 30))
+        pred_index, truth_index = match_events(predicted, truth, TOLERANCE_S)
+
+        one_to_one = len(set(pred_index)) == len(pred_index) and len(set(truth_index)) == len(truth_index)
+        within = np.all(np.abs(predicted[pred_index] - truth[truth_index]) <= TOLERANCE_S)
+        expected = match_brute_force(predicted, truth, TOLERANCE_S) if len(predicted) and len(truth) else (0, 0.0)
+        total_error = float(np.abs(predicted[pred_index] - truth[truth_index]).sum())
+        if not (one_to_one and within and len(pred_index) == expected[0] and abs(total_error - expected[1]) < 1e-9):
+            failures += 1
+        greedy_short += match_greedy(predicted, truth, TOLERANCE_S) < len(pred_index)
+    return failures, greedy_short
+
+def best_time(func, *args, repeats: int = N_REPEATS, **kwargs) -> float:
+    """Best wall time of several runs."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    rng = np.random.default_rng(0)
+    failures, greedy_short = check_optimality(rng)
+    print(f"Optimality: {N_RANDOM_CASES - failures}/{N_RANDOM_CASES} random cases match the full assignment; "
+          f"greedy matching finds fewer matches in {greedy_short}")
+
+    predicted, truth = make_events(rng)
+    print(f"\nEvents: {len(predicted)} predicted, {len(truth)} ground truth ({DURATION_S:.0f} s trial)")
+
+    start = time.perf_counter()
+    legacy = calculate_accuracy_legacy(predicted, truth)
+    legacy_seconds = time.perf_counter() - start
+    scores = score_events(predicted, truth, TOLERANCE_S)
+    print(f"True positives: greedy {legacy['true_positives']}, optimal {scores['true_positives']}")
+    print(f"Precision {scores['precision']:.3f}, recall {scores['recall']:.3f}, F1 {scores['f1']:.3f}; "
+          f"median |error| {scores['timing_error']['median_abs'] * 1000:.1f} ms, "
+          f"p95 {scores['timing_error']['p95_abs'] * 1000:.1f} ms")
+
+    # Sweeps pass {type: times} and skip the matches table
+    predicted_times = {t: g.to_numpy() for t, g in predicted.groupby('type')['time']}
+    truth_times = {t: g.to_numpy() for t, g in truth.groupby('type')['time']}
+    results = [
+        ('nested loops (legacy)', legacy_seconds),
+        ('score_events, DataFrames', best_time(score_events, predicted, truth, TOLERANCE_S)),
+        ('score_events, arrays (sweep)', best_time(score_events, predicted_times, truth_times, TOLERANCE_S,
+                                                   include_matches=False)),
+    ]
+
+    print(f"\n{'Method':<32}{'Best time (s)':>15}")
+    for label, seconds in results:
+        print(f"{label:<32}{seconds:>15.4f}")
+    print(f"\nSpeedup: {results[0][1] / results[1][1]:.0f}x; "
+          f"{1 / results[2][1]:.0f} parameter settings scored per second")
+
+if __name__ == "__main__":
+    main()
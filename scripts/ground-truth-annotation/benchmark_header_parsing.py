@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark EMG loading: legacy two-pass header parsing vs single-pass streamed header.
+Generates a synthetic 300 s, 16-channel, 2000 Hz EMG export and reports wall time
+and peak RSS for each loader, each measured in a fresh process.
+"""
+
+import sys
+sys.path.append('src')
+
+import multiprocessing as mp
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DURATION_S = 300.0
+N_CHANNELS = 16
+EMG_RATE = 2000
+
+def write_synthetic_emg(data_dir: Path, trial_id: str = "T1") -> Path:
+    """Write a Vicon-style EMG CSV export with random channel data."""
+    emg_dir = data_dir / "emg"
+    emg_dir.mkdir(parents=True, exist_ok=True)
+    filepath = emg_dir / f"Sub1_EMG_{trial_id}.csv"
+
+    n_samples = int(DURATION_S * EMG_RATE)
+    rng = np.random.default_rng(0)
+
+    channel_names = [f'Noraxon Desk Receiver - EMG{i+1}' for i in range(N_CHANNELS)]
+    with open(filepath, 'w') as f:
+        f.write("Devices\n")
+        f.write(f"{EMG_RATE}\n")
+        f.write(",," + ",".join(['Noraxon Desk Receiver'] + [''] * (N_CHANNELS - 1)) + "\n")
+        f.write("Frame,Sub Frame," + ",".join(channel_names) + "\n")
+        f.write(",," + ",".join(['V'] * N_CHANNELS) + "\n")
+        # Write in blocks to keep this (parent) process small - child processes
+        # inherit its peak RSS
+        block = EMG_RATE * 10
+        for offset in range(0, n_samples, block):
+            index = np.arange(offset, min(offset + block, n_samples))
+            data = np.column_stack([
+                index // 20 + 1,
+                index % 20,
+                rng.normal(0, 1e-4, (len(index), N_CHANNELS))
+            ])
+            np.savetxt(f, data, delimiter=',', fmt=['%d', '%d'] + ['%.6e'] * N_CHANNELS)
+
+    return filepath
+
+def load_emg_legacy(filepath: Path) -> pd.DataFrame:
+    """Previous implementation: read_csv plus readlines() of the whole file for names."""
+    df = pd.read_csv(filepath, skiprows=4, header=0)
+    with open(filepath, 'r') as f:
+        lines = f.readlines()
+        header_line = lines[3].strip()
+        column_names = [col.strip() for col in header_line.split(',')]
+    df.columns = column_names[:len(df.columns)]
+    df['time'] = df.index / 2000.0
+    return df
+
+def load_emg_streamed(filepath: Path) -> pd.DataFrame:
+    """Current implementation: GaitDataLoader.load_emg without the binary cache."""
+    from data_loader import GaitDataLoader
+    loader = GaitDataLoader(str(filepath.parent.parent), use_cache=False)
+    return loader.load_emg(filepath.stem.split('_')[-1])
+
+def _run(method_name: str, filepath: str, queue) -> None:
+    """Child process: time one loader and report peak RSS."""
+    method = globals()[method_name]
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    df = method(Path(filepath))
+    elapsed = time.perf_counter() - start
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put({
+        'seconds': elapsed,
+        'peak_rss_mb': peak_kb / 1024,
+        'load_rss_mb': (peak_kb - baseline_kb) / 1024,
+        'shape': df.shape
+    })
+
+def measure(method_name: str, filepath: Path) -> dict:
+    """Run one loader in a fresh process so peak RSS is not shared."""
+    ctx = mp.get_context('spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run, args=(method_name, str(filepath), queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+def main():
+    print(f"Generating synthetic EMG: {DURATION_S:.0f} s, {N_CHANNELS} channels @ {EMG_RATE} Hz...")
+    with tempfile.TemporaryDirectory() as tmp:
+        filepath = write_synthetic_emg(Path(tmp))
+        print(f"   File size: {filepath.stat().st_size / 1e6:.1f} MB")
+
+        results = {}
+        for label, method_name in [('legacy (readlines + read_csv)', 'load_emg_legacy'),
+                                   ('streamed header (names=)', 'load_emg_streamed')]:
+            results[label] = measure(method_name, filepath)
+
+        print(f"\n{'Loader':<32}{'Wall time (s)':>15}{'Peak RSS (MB)':>15}{'Load RSS (MB)':>15}")
+        for label, r in results.items():
+            print(f"{label:<32}{r['seconds']:>15.2f}{r['peak_rss_mb']:>15.1f}{r['load_rss_mb']:>15.1f}")
+
+        legacy, streamed = results.values()
+        assert legacy['shape'] == streamed['shape'], "Loaders returned different shapes"
+        print(f"\nSpeedup: {legacy['seconds'] / streamed['seconds']:.2f}x, "
+              f"peak RSS reduction: {legacy['peak_rss_mb'] - streamed['peak_rss_mb']:.1f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -11,7 +11,8 @@ import json
 from pathlib import Path
 
 from data_loader import GaitDataLoader
-from synchronizer import MultiModalSynchronizer, compute_emg_envelopes
+from pipeline import TrialPipeline
+from synchronizer import MultiModalSynchronizer
 from visualizer import GaitDataVisualizer, create_constrained_gait_plot
 
 class GaitEventAnnotator:
@@ -20,21 +21,25 @@ class GaitEventAnnotator:
     Handles data loading, synchronization, visualization, and export.
     """
     
-    def __init__(self, data_dir: str = "data", output_dir: str = "output"):
+    def __init__(self, data_dir: str = "data", output_dir: str = "output",
+                 dtype=np.float64):
         """
         Initialize annotator with data and output directories.
         
         Args:
             data_dir: Directory containing CSV data files
             output_dir: Directory for saving annotation results
+            dtype: Floating dtype for loaded signals (np.float32 halves memory)
         """
         self.data_dir = Path(data_dir)
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
         
         # Initialize components
-        self.loader = GaitDataLoader(data_dir)
-        self.synchronizer = MultiModalSynchronizer(target_rate=1000)
+        self.loader = GaitDataLoader(data_dir, dtype=dtype)
+        self.synchronizer = MultiModalSynchronizer(target_rate=1000, dtype=dtype)
+        # Memoizes load/synchronize/envelope results, so reloading a trial is free
+        self.pipeline = TrialPipeline(self.loader, self.synchronizer, envelope_window_ms=50.0)
         self.visualizer = GaitDataVisualizer()
         
         # Data storage
@@ -54,15 +59,19 @@ class GaitEventAnnotator:
         
         self.trial_id = trial_id
         
-        # Load all modalities
-        self.raw_data = self.loader.load_all_modalities(trial_id)
+        # Load all modalities in parallel, with key markers for better annotation
+        # visualization taken from the already-parsed kinematics (memoized per trial)
+        self.raw_data = self.pipeline.raw(trial_id)
         
-        # Also load key markers for better annotation visualization
-        self.raw_data['key_markers'] = self.loader.load_kinematics_key_markers(trial_id)
+        if self.pipeline.last_sources['raw'] == 'computed':
+            timings = self.loader.last_load_timings
+            print("Load times: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items()))
+        else:
+            print("Using cached trial data")
         
         # Synchronize data
         print("Synchronizing multi-modal data...")
-        self.synchronized_data = self.synchronizer.synchronize_all_modalities(self.raw_data)
+        self.synchronized_data = self.pipeline.synchronized(trial_id)
         
         # Replace kinematics with key markers for annotation interface
         if 'key_markers' in self.synchronized_data:
@@ -72,11 +81,7 @@ class GaitEventAnnotator:
         # Compute EMG envelopes for visualization
         if 'emg' in self.synchronized_data:
             print("Computing EMG envelopes...")
-            self.emg_envelopes = compute_emg_envelopes(
-                self.synchronized_data['emg'],
-                window_ms=50.0,
-                sampling_rate=1000
-            )
+            self.emg_envelopes = self.pipeline.envelopes(trial_id)
         
         duration = self.synchronized_data['kinetics']['time'].max()
         print(f"Trial {trial_id} loaded successfully. Duration: {duration:.1f} seconds")
@@ -3,220 +3,558 @@ Data loading utilities for multi-modal gait analysis data.
 Handles CSV parsing for Kinetics, EMG, and Kinematics data.
 """
 
+import itertools
+import time
 import pandas as pd
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional
 import warnings
 
+from trial_cache import TrialCache
+
+# Vicon CSV exports: section title, sampling rate, device/marker names,
+# column names, units - data starts on the 6th line
+HEADER_LINES = 5
+
+def read_header_lines(filepath: Path, n_lines: int = HEADER_LINES) -> List[str]:
+    """
+    Read only the leading header lines of a Vicon CSV export.
+    
+    Args:
+        filepath: Path to CSV file
+        n_lines: Number of header lines to read
+        
+    Returns:
+        List of header lines without line terminators
+    """
+    with open(filepath, 'r') as f:
+        return [line.rstrip('\r\n') for line in itertools.islice(f, n_lines)]
+
+def _split_header(line: str) -> List[str]:
+    """Split a header line into stripped fields."""
+    return [field.strip() for field in line.split(',')]
+
+def _fit_names(names: List[str], n_fields: int) -> List[str]:
+    """Truncate or pad column names to the number of CSV fields, keeping them unique."""
+    names = list(names[:n_fields])
+    while len(names) < n_fields:
+        names.append(f'Extra_{len(names)}')
+    
+    seen = {}
+    for i, name in enumerate(names):
+        if name in seen:
+            seen[name] += 1
+            names[i] = f'{name}.{seen[name]}'
+        else:
+            seen[name] = 0
+    return names
+
+def kinetics_column_names(header_lines: List[str]) -> List[str]:
+    """
+    Build column names for a dual force plate kinetics export.
+    
+    Args:
+        header_lines: First HEADER_LINES lines of the kinetics CSV
+        
+    Returns:
+        Column names: Frame, Sub Frame, Fx_L ... Cz_L, Fx_R ... Cz_R
+    """
+    # Create unique column names for dual force plates
+    # Left plate: Frame, Sub Frame, Fx_L, Fy_L, Fz_L, Mx_L, My_L, Mz_L, Cx_L, Cy_L, Cz_L
+    # Right plate: Fx_R, Fy_R, Fz_R, Mx_R, My_R, Mz_R, Cx_R, Cy_R, Cz_R
+    unique_names = ['Frame', 'Sub Frame']
+    force_components = ['Fx', 'Fy', 'Fz', 'Mx', 'My', 'Mz', 'Cx', 'Cy', 'Cz']
+    
+    # Left force plate columns
+    for comp in force_components:
+        unique_names.append(f'{comp}_L')
+    
+    # Right force plate columns  
+    for comp in force_components:
+        unique_names.append(f'{comp}_R')
+    
+    # Units row (line 5) determines how many columns the data has
+    n_fields = len(_split_header(header_lines[4]))
+    return _fit_names(unique_names, n_fields)
+
+def emg_column_names(header_lines: List[str]) -> List[str]:
+    """
+    Build column names for an EMG export.
+    
+    Args:
+        header_lines: First HEADER_LINES lines of the EMG CSV
+        
+    Returns:
+        Column names taken from the channel name row (line 4)
+    """
+    n_fields = len(_split_header(header_lines[4]))
+    return _fit_names(_split_header(header_lines[3]), n_fields)
+
+def kinematics_column_names(header_lines: List[str]) -> List[str]:
+    """
+    Build semantic column names for a kinematics (marker trajectory) export.
+    
+    Args:
+        header_lines: First HEADER_LINES lines of the kinematics CSV
+        
+    Returns:
+        Column names: Frame, Sub Frame, <MARKER>_X, <MARKER>_Y, <MARKER>_Z, ...
+    """
+    # Row 3 (0-indexed line 2) contains marker names
+    marker_names = _split_header(header_lines[2])
+    
+    # Create semantic column names using actual marker names
+    unique_names = ['Frame', 'Sub Frame']
+    
+    # Process marker names (skip first 2 empty entries for Frame, Sub Frame)
+    marker_names_clean = marker_names[2:]  # Skip Frame, Sub Frame entries
+    
+    # Create column names with marker semantics
+    coord_idx = 0
+    for marker_name in marker_names_clean:
+        if marker_name and marker_name.strip():  # Skip empty entries
+            # Clean marker name (remove S12: prefix for readability)
+            clean_name = marker_name.replace('S12:', '').strip()
+            if clean_name:
+                unique_names.extend([
+                    f'{clean_name}_X',
+                    f'{clean_name}_Y',
+                    f'{clean_name}_Z'
+                ])
+            else:
+                # Fallback for empty or malformed names
+                unique_names.extend([
+                    f'Marker{coord_idx//3+1:02d}_X',
+                    f'Marker{coord_idx//3+1:02d}_Y',
+                    f'Marker{coord_idx//3+1:02d}_Z'
+                ])
+            coord_idx += 3
+    
+    # Units row (line 5) determines how many columns the data has;
+    # any remaining columns are named Extra_<n>
+    n_fields = len(_split_header(header_lines[4]))
+    return _fit_names(unique_names, n_fields)
+
+def _resolve_columns(columns: List[str], available: List[str], modality: str) -> List[int]:
+    """Map requested column names to their positions, raising KeyError for unknown names."""
+    positions = {name: i for i, name in enumerate(available)}
+    missing = [col for col in columns if col not in positions]
+    if missing:
+        raise KeyError(f"Columns not found in {modality} data: {missing}")
+    return [positions[col] for col in columns]
+
+# Frame counter columns present in every export
+FRAME_COLUMNS = ('Frame', 'Sub Frame')
+
+# Source file layout per modality: (sub-directory, file label, column naming function)
+MODALITY_FILES = {
+    'kinetics': ('kinetics', 'Kinetics', kinetics_column_names),
+    'emg': ('emg', 'EMG', emg_column_names),
+    'kinematics': ('kinematics', 'Kinematics', kinematics_column_names)
+}
+
+SAMPLING_RATES = {
+    'kinetics': 1000,  # Hz
+    'emg': 2000,       # Hz
+    'kinematics': 100  # Hz
+}
+
+# The 4 key markers for gait events
+KEY_MARKERS = {
+    'right_toe': ['RTOE_X', 'RTOE_Y', 'RTOE_Z'],
+    'right_heel': ['RCAL_X', 'RCAL_Y', 'RCAL_Z'],
+    'left_toe': ['LTOE_X', 'LTOE_Y', 'LTOE_Z'],
+    'left_heel': ['LCAL_X', 'LCAL_Y', 'LCAL_Z']
+}
+
+def _window_rows(time_range: Tuple[float, float], sampling_rate: int) -> Tuple[int, int]:
+    """
+    Row slice covering a time window.
+    
+    Includes the last sample at or before start and the first sample at or
+    after end, so the window can be interpolated without extrapolating.
+    
+    Args:
+        time_range: (start, end) in seconds
+        sampling_rate: Modality sampling rate in Hz
+        
+    Returns:
+        (first_row, stop_row) for iloc-style slicing
+    """
+    start, end = time_range
+    if end < start:
+        raise ValueError(f"Invalid time range: end ({end}) is before start ({start})")
+    first = max(0, int(np.floor(start * sampling_rate + 1e-6)))
+    stop = max(first, int(np.ceil(end * sampling_rate - 1e-6)) + 1)
+    return first, stop
+
 class GaitDataLoader:
     """Load and parse multi-modal gait analysis CSV files."""
     
-    def __init__(self, data_dir: str = "data"):
-        """Initialize with data directory path."""
-        self.data_dir = Path(data_dir)
+    def __init__(self, data_dir: str = "data", cache_dir: Optional[str] = None,
+                 use_cache: bool = True, dtype=np.float64):
+        """
+        Initialize with data directory path.
         
-    def load_kinetics(self, trial_id: str) -> pd.DataFrame:
+        Args:
+            data_dir: Directory containing kinetics/emg/kinematics CSV folders
+            cache_dir: Directory for the binary trial cache (default: <data_dir>/.cache)
+            use_cache: Whether to build and memory-map the binary trial cache
+            dtype: Floating dtype for signal columns (np.float32 halves memory);
+                   Frame/Sub Frame keep integer types and 'time' stays float64
         """
-        Load kinetics (force plate) data for specified trial.
+        self.data_dir = Path(data_dir)
+        self.use_cache = use_cache
+        self.dtype = np.dtype(dtype)
+        if self.dtype.kind != 'f':
+            raise ValueError(f"dtype must be a floating point type, got {self.dtype}")
+        self.cache = TrialCache(Path(cache_dir) if cache_dir is not None else self.data_dir / ".cache")
+        self.last_load_timings = {}
+        self._trial_index = None
+    
+    def _filepath(self, modality: str, trial_id: str) -> Path:
+        """Get source CSV path for a modality and trial."""
+        subdir, label, _ = MODALITY_FILES[modality]
+        return self.data_dir / subdir / f"Sub1_{label}_{trial_id}.csv"
+    
+    def _load_cached(self, filepath: Path, rebuild_cache: bool) -> Optional[pd.DataFrame]:
+        """Return cached DataFrame for a source file, or None if it must be parsed."""
+        if not self.use_cache or rebuild_cache:
+            return None
+        return self.cache.load(filepath, variant=self.dtype.name)
+    
+    def _store_cached(self, filepath: Path, df: pd.DataFrame) -> pd.DataFrame:
+        """Store a freshly parsed DataFrame in the cache (if enabled)."""
+        if self.use_cache:
+            try:
+                self.cache.store(filepath, df, variant=self.dtype.name)
+            except OSError as e:
+                warnings.warn(f"Could not write trial cache for {filepath.name}: {e}")
+        return df
+    
+    def _signal_dtypes(self, column_names: List[str]) -> Dict[str, np.dtype]:
+        """Explicit read_csv dtypes for signal columns (frame counters keep inferred ints)."""
+        return {name: self.dtype for name in column_names if name not in FRAME_COLUMNS}
+    
+    def get_column_names(self, modality: str, trial_id: str) -> List[str]:
+        """
+        Get semantic column names for a modality without reading the data.
         
         Args:
+            modality: 'kinetics', 'emg' or 'kinematics'
             trial_id: Trial identifier (e.g., "T5")
             
         Returns:
-            DataFrame with columns: Frame, Sub Frame, force plate data
+            Column names as produced by the corresponding load method (excluding 'time')
         """
-        filepath = self.data_dir / "kinetics" / f"Sub1_Kinetics_{trial_id}.csv"
-        
-        # Read CSV with proper header handling
-        # Line 3 has column names, line 4 has units, data starts at line 5
-        df = pd.read_csv(filepath, skiprows=4, header=0)
-        
-        # Create unique column names for dual force plates
-        # Left plate: Frame, Sub Frame, Fx_L, Fy_L, Fz_L, Mx_L, My_L, Mz_L, Cx_L, Cy_L, Cz_L
-        # Right plate: Fx_R, Fy_R, Fz_R, Mx_R, My_R, Mz_R, Cx_R, Cy_R, Cz_R
-        unique_names = ['Frame', 'Sub Frame']
-        force_components = ['Fx', 'Fy', 'Fz', 'Mx', 'My', 'Mz', 'Cx', 'Cy', 'Cz']
+        _, _, naming = MODALITY_FILES[modality]
+        return naming(read_header_lines(self._filepath(modality, trial_id)))
+    
+    def _read_modality(self, modality: str, trial_id: str,
+                       columns: Optional[List[str]] = None,
+                       rebuild_cache: bool = False,
+                       time_range: Optional[Tuple[float, float]] = None) -> pd.DataFrame:
+        """
+        Read one modality CSV (or its cached copy) with semantic column names.
         
-        # Left force plate columns
-        for comp in force_components:
-            unique_names.append(f'{comp}_L')
+        Full reads are cached; column-projected and time-windowed reads are served
+        from a valid cache entry if one exists, otherwise only the requested
+        columns and rows are parsed.
+        """
+        filepath = self._filepath(modality, trial_id)
+        _, _, naming = MODALITY_FILES[modality]
+        sampling_rate = SAMPLING_RATES[modality]
+        
+        if columns is not None:
+            columns = [col for col in columns if col != 'time']
+        
+        rows = _window_rows(time_range, sampling_rate) if time_range is not None else None
+        
+        cached = self._load_cached(filepath, rebuild_cache)
+        if cached is not None:
+            if columns is not None:
+                _resolve_columns(columns, list(cached.columns), modality)
+                cached = cached[columns + ['time']]
+            if rows is not None:
+                cached = cached.iloc[rows[0]:rows[1]]
+            return cached
+        
+        # Single read_csv pass using names from the streamed header
+        column_names = naming(read_header_lines(filepath))
+        
+        # Time window: skip the rows before it and stop parsing after it
+        skiprows, nrows = HEADER_LINES, None
+        if rows is not None:
+            skiprows, nrows = HEADER_LINES + rows[0], rows[1] - rows[0]
+        
+        if columns is None:
+            df = pd.read_csv(filepath, skiprows=skiprows, nrows=nrows, header=None,
+                             names=column_names, dtype=self._signal_dtypes(column_names))
+        else:
+            # Resolve semantic names to raw CSV positions so only those columns are parsed
+            indices = sorted(_resolve_columns(columns, column_names, modality))
+            selected = [column_names[i] for i in indices]
+            df = pd.read_csv(filepath, skiprows=skiprows, nrows=nrows, header=None,
+                             names=selected, usecols=indices,
+                             dtype=self._signal_dtypes(selected))
+            df = df.reindex(columns=columns)
+        
+        if rows is not None:
+            # Index (and so time) counts samples from the start of the recording
+            df.index = pd.RangeIndex(rows[0], rows[0] + len(df))
+        
+        # Convert to time in seconds using the modality sampling rate
+        # Use sample index instead of Frame column
+        df['time'] = df.index / float(sampling_rate)
         
-        # Right force plate columns  
-        for comp in force_components:
-            unique_names.append(f'{comp}_R')
+        if columns is not None or rows is not None:
+            return df
+        return self._store_cached(filepath, df)
         
-        # Set proper column names
-        df.columns = unique_names[:len(df.columns)]
+    def iter_chunks(self, modality: str, trial_id: str, chunk_seconds: float = 10.0,
+                    columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        """
+        Stream a modality in fixed-duration chunks with bounded memory.
         
-        # Convert to time in seconds (1000 Hz sampling)
-        # Use sample index instead of Frame column
-        df['time'] = df.index / 1000.0
+        Args:
+            modality: 'kinetics', 'emg' or 'kinematics'
+            trial_id: Trial identifier (e.g., "T5")
+            chunk_seconds: Duration of each chunk in seconds
+            columns: Subset of columns to read; None reads all
+            
+        Yields:
+            DataFrames with the same columns as the load methods; 'time' and the
+            index continue across chunks (the last chunk may be shorter)
+        """
+        filepath = self._filepath(modality, trial_id)
+        _, _, naming = MODALITY_FILES[modality]
+        sampling_rate = SAMPLING_RATES[modality]
+        chunk_rows = max(1, int(round(chunk_seconds * sampling_rate)))
+        
+        if columns is not None:
+            columns = [col for col in columns if col != 'time']
+        
+        # A valid cache entry is memory-mapped: slice the rows first, so only
+        # one chunk of the trial is ever read into memory
+        cached = self._load_cached(filepath, rebuild_cache=False)
+        if cached is not None:
+            selected = list(cached.columns) if columns is None else columns + ['time']
+            if columns is not None:
+                _resolve_columns(columns, list(cached.columns), modality)
+            for start in range(0, len(cached), chunk_rows):
+                # In-memory copy of the chunk, like the chunks parsed from CSV
+                yield cached.iloc[start:start + chunk_rows][selected].copy()
+            return
+        
+        column_names = naming(read_header_lines(filepath))
+        if columns is None:
+            selected, usecols = column_names, None
+        else:
+            usecols = sorted(_resolve_columns(columns, column_names, modality))
+            selected = [column_names[i] for i in usecols]
+        
+        reader = pd.read_csv(filepath, skiprows=HEADER_LINES, header=None,
+                             names=selected, usecols=usecols,
+                             dtype=self._signal_dtypes(selected),
+                             chunksize=chunk_rows)
+        
+        with reader:
+            for chunk in reader:
+                if columns is not None:
+                    chunk = chunk.reindex(columns=columns)
+                # read_csv keeps counting the index across chunks, so time continues
+                chunk['time'] = chunk.index / float(sampling_rate)
+                yield chunk
+    
+    def iter_kinetics(self, trial_id: str, chunk_seconds: float = 10.0,
+                      columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        """Stream kinetics data in fixed-duration chunks (see iter_chunks)."""
+        return self.iter_chunks('kinetics', trial_id, chunk_seconds, columns)
+    
+    def iter_emg(self, trial_id: str, chunk_seconds: float = 10.0,
+                 columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        """Stream EMG data in fixed-duration chunks (see iter_chunks)."""
+        return self.iter_chunks('emg', trial_id, chunk_seconds, columns)
+    
+    def iter_kinematics(self, trial_id: str, chunk_seconds: float = 10.0,
+                        columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        """Stream kinematics data in fixed-duration chunks (see iter_chunks)."""
+        return self.iter_chunks('kinematics', trial_id, chunk_seconds, columns)
+        
+    def load_kinetics(self, trial_id: str, columns: Optional[List[str]] = None,
+                      rebuild_cache: bool = False,
+                      time_range: Optional[Tuple[float, float]] = None) -> pd.DataFrame:
+        """
+        Load kinetics (force plate) data for specified trial.
         
-        return df
+        Args:
+            trial_id: Trial identifier (e.g., "T5")
+            columns: Subset of columns to load (e.g., ['Fz_L', 'Fz_R']); None loads all
+            rebuild_cache: Re-parse the CSV and overwrite any cached copy
+            time_range: (start, end) in seconds to load; None loads the whole trial
+            
+        Returns:
+            DataFrame with columns: Frame, Sub Frame, force plate data
+        """
+        return self._read_modality('kinetics', trial_id, columns, rebuild_cache, time_range)
     
-    def load_emg(self, trial_id: str) -> pd.DataFrame:
+    def load_emg(self, trial_id: str, columns: Optional[List[str]] = None,
+                 rebuild_cache: bool = False,
+                 time_range: Optional[Tuple[float, float]] = None) -> pd.DataFrame:
         """
         Load EMG data for specified trial.
         
         Args:
             trial_id: Trial identifier (e.g., "T5")
+            columns: Subset of EMG channel columns to load; None loads all
+            rebuild_cache: Re-parse the CSV and overwrite any cached copy
+            time_range: (start, end) in seconds to load; None loads the whole trial
             
         Returns:
             DataFrame with EMG channels
         """
-        filepath = self.data_dir / "emg" / f"Sub1_EMG_{trial_id}.csv"
-        
-        # Read CSV with proper header handling
-        # Line 3 has column names, line 4 has units, data starts at line 5
-        df = pd.read_csv(filepath, skiprows=4, header=0)
-        
-        # Use the header row (line 3) for column names
-        with open(filepath, 'r') as f:
-            lines = f.readlines()
-            header_line = lines[3].strip()
-            column_names = [col.strip() for col in header_line.split(',')]
-        
-        # Set proper column names
-        df.columns = column_names[:len(df.columns)]
-        
-        # Convert to time in seconds (2000 Hz sampling)
-        # Use sample index instead of Frame column  
-        df['time'] = df.index / 2000.0
-        
-        return df
+        return self._read_modality('emg', trial_id, columns, rebuild_cache, time_range)
     
-    def load_kinematics(self, trial_id: str) -> pd.DataFrame:
+    def load_kinematics(self, trial_id: str, columns: Optional[List[str]] = None,
+                        rebuild_cache: bool = False,
+                        time_range: Optional[Tuple[float, float]] = None) -> pd.DataFrame:
         """
         Load kinematics (motion capture) data for specified trial.
         
         Args:
             trial_id: Trial identifier (e.g., "T5")
+            columns: Subset of marker columns to load (e.g., ['RTOE_Z']); None loads all
+            rebuild_cache: Re-parse the CSV and overwrite any cached copy
+            time_range: (start, end) in seconds to load; None loads the whole trial
             
         Returns:
             DataFrame with marker positions using semantic marker names
         """
-        filepath = self.data_dir / "kinematics" / f"Sub1_Kinematics_{trial_id}.csv"
-        
-        # Read marker names from header row 3 (0-indexed line 2)
-        with open(filepath, 'r') as f:
-            lines = f.readlines()
-            marker_header = lines[2].strip()  # Row 3 contains marker names
-            marker_names = [name.strip() for name in marker_header.split(',')]
-        
-        # Read CSV with proper header handling
-        # Line 3 has marker names, line 4 has X,Y,Z, line 5 has units, data starts at line 6
-        df = pd.read_csv(filepath, skiprows=4, header=0)
-        
-        # Create semantic column names using actual marker names
-        unique_names = ['Frame', 'Sub Frame']
-        
-        # Process marker names (skip first 2 empty entries for Frame, Sub Frame)
-        marker_names_clean = marker_names[2:]  # Skip Frame, Sub Frame entries
-        
-        # Create column names with marker semantics
-        coord_idx = 0
-        for marker_name in marker_names_clean:
-            if marker_name and marker_name.strip():  # Skip empty entries
-                # Clean marker name (remove S12: prefix for readability)
-                clean_name = marker_name.replace('S12:', '').strip()
-                if clean_name:
-                    unique_names.extend([
-                        f'{clean_name}_X',
-                        f'{clean_name}_Y',
-                        f'{clean_name}_Z'
-                    ])
-                else:
-                    # Fallback for empty or malformed names
-                    unique_names.extend([
-                        f'Marker{coord_idx//3+1:02d}_X',
-                        f'Marker{coord_idx//3+1:02d}_Y',
-                        f'Marker{coord_idx//3+1:02d}_Z'
-                    ])
-                coord_idx += 3
-        
-        # Handle any remaining columns
-        while len(unique_names) < len(df.columns):
-            unique_names.append(f'Extra_{len(unique_names)}')
-        
-        # Set proper column names (only use as many as we have)
-        df.columns = unique_names[:len(df.columns)]
-        
-        # Convert to time in seconds (100 Hz sampling)
-        # Use sample index instead of Frame column
-        df['time'] = df.index / 100.0
-        
-        return df
+        return self._read_modality('kinematics', trial_id, columns, rebuild_cache, time_range)
     
-    def load_kinematics_key_markers(self, trial_id: str) -> pd.DataFrame:
+    def load_kinematics_key_markers(self, trial_id: str,
+                                    time_range: Optional[Tuple[float, float]] = None) -> pd.DataFrame:
         """
         Load only key gait markers (heel and toe positions) for annotation.
         
         Args:
             trial_id: Trial identifier (e.g., "T5")
+            time_range: (start, end) in seconds to load; None loads the whole trial
             
         Returns:
             DataFrame with only heel/toe marker positions for gait annotation
         """
-        # Load full kinematics data with semantic names
-        full_kinematics = self.load_kinematics(trial_id)
-        
-        # Define the 4 key markers for gait events
-        key_markers = {
-            'right_toe': ['RTOE_X', 'RTOE_Y', 'RTOE_Z'],
-            'right_heel': ['RCAL_X', 'RCAL_Y', 'RCAL_Z'],
-            'left_toe': ['LTOE_X', 'LTOE_Y', 'LTOE_Z'],
-            'left_heel': ['LCAL_X', 'LCAL_Y', 'LCAL_Z']
-        }
+        # Only parse the heel/toe columns that exist in this trial
+        available = set(self.get_column_names('kinematics', trial_id))
+        wanted = [col for cols in KEY_MARKERS.values() for col in cols if col in available]
+        kinematics = self.load_kinematics(trial_id, columns=wanted, time_range=time_range)
         
-        # Extract only key markers
-        key_data = pd.DataFrame()
-        key_data['time'] = full_kinematics['time']
-        
-        for marker_label, marker_cols in key_markers.items():
-            for coord_col in marker_cols:
-                if coord_col in full_kinematics.columns:
-                    # Use semantic names like 'right_toe_z' for clarity
-                    coord_suffix = coord_col.split('_')[-1].lower()  # x, y, or z
-                    new_col_name = f'{marker_label}_{coord_suffix}'
-                    key_data[new_col_name] = full_kinematics[coord_col]
-                else:
-                    # Handle missing markers gracefully
-                    coord_suffix = coord_col.split('_')[-1].lower()
-                    new_col_name = f'{marker_label}_{coord_suffix}'
-                    key_data[new_col_name] = np.nan
-                    warnings.warn(f"Marker {coord_col} not found in kinematics data")
-        
-        return key_data
-    
-    def load_all_modalities(self, trial_id: str) -> Dict[str, pd.DataFrame]:
+        return extract_key_markers(kinematics)
+    
+    def load_all_modalities(self, trial_id: str, max_workers: int = 3,
+                            include_key_markers: bool = False,
+                            time_range: Optional[Tuple[float, float]] = None) -> Dict[str, pd.DataFrame]:
         """
         Load all data modalities for a trial.
         
+        The three CSV files are parsed concurrently in a thread pool (pandas'
+        C parser releases the GIL). Per-modality load times are stored in
+        self.last_load_timings.
+        
         Args:
             trial_id: Trial identifier (e.g., "T5")
+            max_workers: Number of loader threads (1 loads sequentially)
+            include_key_markers: Also return heel/toe markers extracted from the
+                                 already-parsed kinematics under 'key_markers'
+            time_range: (start, end) in seconds to load; None loads the whole trial
             
         Returns:
-            Dictionary with keys: 'kinetics', 'emg', 'kinematics'
+            Dictionary with keys: 'kinetics', 'emg', 'kinematics' (and 'key_markers')
         """
-        return {
-            'kinetics': self.load_kinetics(trial_id),
-            'emg': self.load_emg(trial_id),
-            'kinematics': self.load_kinematics(trial_id)
+        loaders = {
+            'kinetics': self.load_kinetics,
+            'emg': self.load_emg,
+            'kinematics': self.load_kinematics
         }
+        timings = {}
+        
+        def timed_load(modality: str) -> pd.DataFrame:
+            start = time.perf_counter()
+            df = loaders[modality](trial_id, time_range=time_range)
+            timings[modality] = time.perf_counter() - start
+            return df
+        
+        total_start = time.perf_counter()
+        if max_workers > 1:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(loaders))) as executor:
+                futures = {modality: executor.submit(timed_load, modality) for modality in loaders}
+                data = {modality: future.result() for modality, future in futures.items()}
+        else:
+            data = {modality: timed_load(modality) for modality in loaders}
+        
+        if include_key_markers:
+            # Reuse the parsed kinematics instead of reading the file again
+            start = time.perf_counter()
+            data['key_markers'] = extract_key_markers(data['kinematics'])
+            timings['key_markers'] = time.perf_counter() - start
+        
+        timings['total'] = time.perf_counter() - total_start
+        self.last_load_timings = timings
+        
+        return data
+    
+    def get_trial_index(self):
+        """Get the trial index for this data directory (persisted next to the trial cache)."""
+        # Imported here because trial_index depends on this module's constants
+        from trial_index import TrialIndex
+        
+        if self._trial_index is None:
+            self._trial_index = TrialIndex(str(self.data_dir),
+                                           index_path=str(self.cache.cache_dir / "trial_index.json"))
+        return self._trial_index
     
     def get_trial_duration(self, trial_id: str) -> float:
-        """Get trial duration in seconds."""
-        kinetics = self.load_kinetics(trial_id)
+        """Get trial duration in seconds (from line counts, without parsing the data)."""
+        trial = self.get_trial_index().get_trial(trial_id)
+        if trial is not None and 'kinetics' in trial['modalities']:
+            return trial['modalities']['kinetics']['duration']
+        
+        kinetics = self.load_kinetics(trial_id, columns=['Frame'])
         return kinetics['time'].max()
     
     def get_sampling_rates(self) -> Dict[str, int]:
         """Get sampling rates for each modality."""
-        return {
-            'kinetics': 1000,  # Hz
-            'emg': 2000,       # Hz
-            'kinematics': 100  # Hz
-        }
+        return dict(SAMPLING_RATES)
+
+def extract_key_markers(kinematics_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Extract key gait markers (heel and toe positions) from kinematics data.
+    
+    Args:
+        kinematics_df: Kinematics DataFrame with semantic marker columns (e.g., RTOE_Z)
+        
+    Returns:
+        DataFrame with time and right/left toe/heel x, y, z columns
+    """
+    # Extract only key markers
+    key_data = pd.DataFrame()
+    key_data['time'] = kinematics_df['time']
+    
+    for marker_label, marker_cols in KEY_MARKERS.items():
+        for coord_col in marker_cols:
+            # Use semantic names like 'right_toe_z' for clarity
+            coord_suffix = coord_col.split('_')[-1].lower()  # x, y, or z
+            new_col_name = f'{marker_label}_{coord_suffix}'
+            if coord_col in kinematics_df.columns:
+                key_data[new_col_name] = kinematics_df[coord_col]
+            else:
+                # Handle missing markers gracefully
+                key_data[new_col_name] = np.nan
+                warnings.warn(f"Marker {coord_col} not found in kinematics data")
+    
+    return key_data
 
 def extract_key_kinematic_markers(kinematics_df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
     """
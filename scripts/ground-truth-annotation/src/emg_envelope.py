@@ -0,0 +1,111 @@
+"""
+Vectorized EMG envelope computation.
+Computes envelopes for all channels of a (samples x channels) array in one call.
+"""
+
+import numpy as np
+from scipy import signal
+
+ENVELOPE_METHODS = ('savgol', 'lowpass', 'rms')
+
+def _window_samples(window_ms: float, sampling_rate: float) -> int:
+    """Convert a window length in milliseconds to samples (at least 1)."""
+    return max(1, int(window_ms * sampling_rate / 1000))
+
+def moving_rms(values: np.ndarray, window: int, axis: int = 0) -> np.ndarray:
+    """
+    Centered moving RMS using cumulative sums.
+
+    The window for sample i covers samples i - window // 2 to i - window // 2 + window - 1
+    (the same alignment as pandas rolling(window, center=True)). Near the edges
+    the RMS is taken over the available samples; NaN samples are skipped.
+
+    Args:
+        values: Signal array
+        window: Window length in samples
+        axis: Time axis of values
+
+    Returns:
+        Moving RMS with the same shape as values, float64
+    """
+    values = np.moveaxis(np.asarray(values, dtype=np.float64), axis, -1)
+    n = values.shape[-1]
+    half = window // 2
+
+    valid = ~np.isnan(values)
+    squares = np.where(valid, values, 0.0)
+    np.square(squares, out=squares)
+
+    def padded_cumsum(x: np.ndarray) -> np.ndarray:
+        # Entry j holds the sum of samples [0, clip(j - half, 0, n)), so the sum over
+        # the window of sample i is entry i + window minus entry i
+        csum = np.zeros(x.shape[:-1] + (n + window + 1,))
+        np.cumsum(x, axis=-1, out=csum[..., half + 1:half + n + 1])
+        csum[..., half + n + 1:] = csum[..., half + n:half + n + 1]
+        return csum
+
+    sum_squares = padded_cumsum(squares)
+    counts = padded_cumsum(valid)
+
+    total = sum_squares[..., window:window + n] - sum_squares[..., :n]
+    count = counts[..., window:window + n] - counts[..., :n]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_square = np.divide(total, count, out=total)
+
+    # Cancellation in the running sums can leave tiny negative values
+    np.maximum(mean_square, 0.0, out=mean_square)
+    np.sqrt(mean_square, out=mean_square)
+    return np.moveaxis(mean_square, -1, axis)
+
+def emg_envelope(values: np.ndarray, sampling_rate: float = 1000,
+                 method: str = 'savgol', window_ms: float = 50.0,
+                 cutoff_hz: float = 6.0, filter_order: int = 4,
+                 polyorder: int = 3, dtype=None) -> np.ndarray:
+    """
+    Compute EMG envelopes for all channels at once.
+
+    Channels are processed as one channel-major array, so each filter runs
+    over contiguous samples.
+
+    Args:
+        values: EMG signals, shape (n_samples,) or (n_samples, n_channels)
+        sampling_rate: Sampling rate in Hz
+        method: 'savgol' (Savitzky-Golay smoothing of the rectified signal),
+                'lowpass' (rectification + zero-phase Butterworth lowpass) or
+                'rms' (centered moving RMS)
+        window_ms: Window length in milliseconds ('savgol' and 'rms')
+        cutoff_hz: Lowpass cutoff frequency in Hz ('lowpass')
+        filter_order: Butterworth filter order ('lowpass')
+        polyorder: Polynomial order ('savgol')
+        dtype: Output dtype (None keeps float32 input as float32, else float64)
+
+    Returns:
+        Envelopes with the same shape as values
+    """
+    if method not in ENVELOPE_METHODS:
+        raise ValueError(f"Unknown envelope method: {method} (expected one of {ENVELOPE_METHODS})")
+
+    values = np.asarray(values)
+    if dtype is None:
+        dtype = values.dtype if values.dtype.kind == 'f' else np.float64
+
+    # (n_channels, n_samples), contiguous along time
+    channel_major = np.ascontiguousarray(np.atleast_2d(values.T), dtype=np.float64)
+
+    if method == 'rms':
+        envelope = moving_rms(channel_major, _window_samples(window_ms, sampling_rate), axis=-1)
+
+    elif method == 'savgol':
+        rectified = np.abs(channel_major)
+        envelope = signal.savgol_filter(rectified, _window_samples(window_ms, sampling_rate),
+                                        polyorder, axis=-1)
+
+    else:
+        rectified = np.abs(channel_major)
+        sos = signal.butter(filter_order, cutoff_hz, btype='low', fs=sampling_rate, output='sos')
+        # Shorten the edge padding for signals shorter than the default
+        padlen = min(3 * (2 * len(sos) + 1), rectified.shape[-1] - 1)
+        envelope = signal.sosfiltfilt(sos, rectified, axis=-1, padlen=padlen)
+
+    envelope = envelope.astype(dtype, copy=False)
+    return envelope[0] if values.ndim == 1 else envelope.T
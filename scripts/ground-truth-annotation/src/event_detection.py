@@ -0,0 +1,156 @@
+"""
+Vectorized gait event detection from force plates.
+Detects heel strikes and toe offs of both legs from the vertical ground
+reaction forces (Fz_L / Fz_R) of synchronized kinetics, over whole arrays.
+"""
+
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+# Vertical force columns of each plate in synchronized kinetics
+FORCE_COLUMNS = {'left': 'Fz_L', 'right': 'Fz_R'}
+
+# Event types, as used by the annotation tool and the ground truth files
+EVENT_TYPES = ('left_heel_strike', 'left_toe_off', 'right_heel_strike', 'right_toe_off')
+
+# Default detection parameters (thresholds in N, durations in seconds)
+DEFAULT_HEEL_STRIKE_THRESHOLD = 50.0
+DEFAULT_TOE_OFF_THRESHOLD = 20.0
+DEFAULT_MIN_STANCE_S = 0.1
+DEFAULT_MIN_SWING_S = 0.0
+
+def contact_state(force: np.ndarray, heel_strike_threshold: float = DEFAULT_HEEL_STRIKE_THRESHOLD,
+                  toe_off_threshold: float = DEFAULT_TOE_OFF_THRESHOLD) -> np.ndarray:
+    """
+    Foot contact per sample, with hysteresis.
+
+    A foot is in contact from the first sample at or above heel_strike_threshold
+    until the next sample at or below toe_off_threshold. Samples in between the
+    thresholds (and NaN samples) keep the state of the last sample outside them;
+    samples before the first such sample take its state.
+
+    Args:
+        force: Vertical force of one plate
+        heel_strike_threshold: Force that starts a contact
+        toe_off_threshold: Force that ends a contact (below heel_strike_threshold)
+
+    Returns:
+        Boolean array, True while the foot is in contact
+    """
+    if toe_off_threshold >= heel_strike_threshold:
+        raise ValueError(f"toe_off_threshold ({toe_off_threshold}) must be below "
+                         f"heel_strike_threshold ({heel_strike_threshold})")
+
+    force = np.asarray(force, dtype=np.float64)
+    loaded = force >= heel_strike_threshold
+    decided = loaded | (force <= toe_off_threshold)
+    if not decided.any():
+        return np.zeros(len(force), dtype=bool)
+
+    # Index of the last decided sample at or before each sample (forward fill)
+    last_decided = np.where(decided, np.arange(len(force)), 0)
+    np.maximum.accumulate(last_decided, out=last_decided)
+    state = loaded[last_decided]
+    first = int(np.argmax(decided))
+    state[:first] = loaded[first]
+    return state
+
+def _drop_short_intervals(edges: np.ndarray, starts: np.ndarray, times: np.ndarray,
+                          min_duration: float) -> np.ndarray:
+    """
+    Mask of edges to keep after removing intervals shorter than min_duration.
+
+    Edges alternate between starting and ending intervals, so removing an
+    interval's start and end edges keeps them alternating.
+    """
+    keep = np.ones(len(edges), dtype=bool)
+    if min_duration <= 0 or len(edges) < 2:
+        return keep
+
+    durations = times[edges[1:]] - times[edges[:-1]]
+    short = starts[:-1] & (durations < min_duration)
+    keep[:-1] &= ~short
+    keep[1:] &= ~short
+    return keep
+
+def detect_contacts(force: np.ndarray, times: Optional[np.ndarray] = None,
+                    sampling_rate: float = 1000,
+                    heel_strike_threshold: float = DEFAULT_HEEL_STRIKE_THRESHOLD,
+                    toe_off_threshold: float = DEFAULT_TOE_OFF_THRESHOLD,
+                    min_stance_s: float = DEFAULT_MIN_STANCE_S,
+                    min_swing_s: float = DEFAULT_MIN_SWING_S) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Detect heel strikes and toe offs of one force plate.
+
+    Contacts follow contact_state. Swings shorter than min_swing_s (force
+    dropouts during stance) are merged into the surrounding stance first, then
+    stances shorter than min_stance_s (spikes) are removed. Contacts cut off by
+    the start or end of the signal are kept.
+
+    Args:
+        force: Vertical force of one plate
+        times: Sample times in seconds (default: index / sampling_rate)
+        sampling_rate: Sampling rate in Hz (only used without times)
+        heel_strike_threshold: Force that starts a contact
+        toe_off_threshold: Force that ends a contact
+        min_stance_s: Minimum contact duration in seconds
+        min_swing_s: Minimum time between contacts in seconds
+
+    Returns:
+        (heel_strikes, toe_offs) as sample indices: the first sample of each
+        contact and the first sample after it
+    """
+    state = contact_state(force, heel_strike_threshold, toe_off_threshold)
+    times = np.arange(len(state)) / sampling_rate if times is None else np.asarray(times, dtype=np.float64)
+
+    edges = np.flatnonzero(state[1:] != state[:-1]) + 1
+    is_heel_strike = state[edges]
+
+    keep = _drop_short_intervals(edges, ~is_heel_strike, times, min_swing_s)
+    edges, is_heel_strike = edges[keep], is_heel_strike[keep]
+    keep = _drop_short_intervals(edges, is_heel_strike, times, min_stance_s)
+    edges, is_heel_strike = edges[keep], is_heel_strike[keep]
+
+    return edges[is_heel_strike], edges[~is_heel_strike]
+
+def detect_gait_events(kinetics: Union[pd.DataFrame, Dict[str, pd.DataFrame]],
+                       heel_strike_threshold: float = DEFAULT_HEEL_STRIKE_THRESHOLD,
+                       toe_off_threshold: float = DEFAULT_TOE_OFF_THRESHOLD,
+                       min_stance_s: float = DEFAULT_MIN_STANCE_S,
+                       min_swing_s: float = DEFAULT_MIN_SWING_S) -> pd.DataFrame:
+    """
+    Detect heel strikes and toe offs of both legs.
+
+    Args:
+        kinetics: Synchronized kinetics with 'time', 'Fz_L' and 'Fz_R' columns,
+                  or the synchronizer output containing it under 'kinetics'
+        heel_strike_threshold: Force (N) that starts a contact
+        toe_off_threshold: Force (N) that ends a contact
+        min_stance_s: Minimum contact duration in seconds
+        min_swing_s: Minimum time between contacts of one foot in seconds
+
+    Returns:
+        DataFrame with columns time, type (see EVENT_TYPES) and sample (row of
+        kinetics), sorted by time
+    """
+    if isinstance(kinetics, dict):
+        kinetics = kinetics['kinetics']
+    times = kinetics['time'].to_numpy(dtype=np.float64)
+
+    events = []
+    for side, column in FORCE_COLUMNS.items():
+        heel_strikes, toe_offs = detect_contacts(
+            kinetics[column].to_numpy(), times,
+            heel_strike_threshold=heel_strike_threshold, toe_off_threshold=toe_off_threshold,
+            min_stance_s=min_stance_s, min_swing_s=min_swing_s
+        )
+        for event, samples in (('heel_strike', heel_strikes), ('toe_off', toe_offs)):
+            events.append(pd.DataFrame({
+                'time': times[samples],
+                'type': f'{side}_{event}',
+                'sample': samples
+            }))
+
+    return pd.concat(events, ignore_index=True).sort_values(['time', 'type'], kind='stable').reset_index(drop=True)
@@ -0,0 +1,191 @@
+"""
+Event matching and accuracy scoring against ground truth.
+Matches predicted and ground truth events one-to-one within a time tolerance
+per event type and reports precision, recall, F1 and timing errors.
+"""
+
+from typing import Dict, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import linear_sum_assignment
+
+# Default matching tolerance in seconds (as in the validation notebook)
+DEFAULT_TOLERANCE_S = 0.1
+
+def match_events(predicted: np.ndarray, truth: np.ndarray,
+                 tolerance: float = DEFAULT_TOLERANCE_S) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Optimal one-to-one matching of event times within a tolerance.
+
+    Finds the largest number of (predicted, truth) pairs at most tolerance
+    apart and, among those, the one with the smallest total timing error.
+    Both sequences are merged in time order and split wherever consecutive
+    events are more than tolerance apart: no pair can span such a gap, so each
+    cluster is matched on its own. Clusters of one predicted and one truth
+    event (the common case) are paired directly; larger clusters are solved as
+    small assignment problems. NaN times are never matched.
+
+    Args:
+        predicted: Predicted event times in seconds (any order)
+        truth: Ground truth event times in seconds (any order)
+        tolerance: Maximum time difference of a match in seconds
+
+    Returns:
+        (predicted_index, truth_index): indices into the inputs of the matched
+        pairs, ordered by truth time
+    """
+    if tolerance < 0:
+        raise ValueError(f"tolerance must not be negative, got {tolerance}")
+
+    predicted = np.asarray(predicted, dtype=np.float64).ravel()
+    truth = np.asarray(truth, dtype=np.float64).ravel()
+    pred_ids = np.flatnonzero(~np.isnan(predicted))
+    truth_ids = np.flatnonzero(~np.isnan(truth))
+    empty = np.array([], dtype=np.intp)
+    if len(pred_ids) == 0 or len(truth_ids) == 0:
+        return empty, empty
+
+    # All events in time order; ids index the inputs
+    times = np.concatenate([predicted[pred_ids], truth[truth_ids]])
+    is_pred = np.concatenate([np.ones(len(pred_ids), dtype=bool), np.zeros(len(truth_ids), dtype=bool)])
+    ids = np.concatenate([pred_ids, truth_ids])
+    order = np.argsort(times, kind='stable')
+    times, is_pred, ids = times[order], is_pred[order], ids[order]
+
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(times) > tolerance) + 1])
+    ends = np.append(starts[1:], len(times))
+    n_pred = np.add.reduceat(is_pred.astype(np.intp), starts)
+    n_truth = (ends - starts) - n_pred
+
+    # Pairs: consecutive events, so at most tolerance apart
+    pairs = starts[(n_pred == 1) & (n_truth == 1)]
+    first_is_pred = is_pred[pairs]
+    pred_matches = [np.where(first_is_pred, ids[pairs], ids[pairs + 1])]
+    truth_matches = [np.where(first_is_pred, ids[pairs + 1], ids[pairs])]
+
+    for start, end in zip(starts[(n_pred > 0) & (n_truth > 0) & (ends - starts > 2)],
+                          ends[(n_pred > 0) & (n_truth > 0) & (ends - starts > 2)]):
+        cluster_pred = ids[start:end][is_pred[start:end]]
+        cluster_truth = ids[start:end][~is_pred[start:end]]
+        distance = np.abs(predicted[cluster_pred][:, None] - truth[cluster_truth][None, :])
+        within = distance <= tolerance
+        # Each match earns more than any total timing error saves, so the
+        # assignment maximizes matches first and minimizes error second
+        reward = tolerance * (min(distance.shape) + 1) + 1.0
+        rows, cols = linear_sum_assignment(np.where(within, distance - reward, 0.0))
+        valid = within[rows, cols]
+        pred_matches.append(cluster_pred[rows[valid]])
+        truth_matches.append(cluster_truth[cols[valid]])
+
+    pred_index = np.concatenate(pred_matches).astype(np.intp)
+    truth_index = np.concatenate(truth_matches).astype(np.intp)
+    by_truth = np.argsort(truth[truth_index], kind='stable')
+    return pred_index[by_truth], truth_index[by_truth]
+
+def timing_error_summary(errors: np.ndarray) -> Dict[str, float]:
+    """
+    Distribution of signed timing errors (predicted - truth, seconds).
+
+    Returns:
+        Dictionary with mean, std, mean_abs, median_abs, p95_abs and max_abs
+        (NaN without errors)
+    """
+    errors = np.asarray(errors, dtype=np.float64)
+    if len(errors) == 0:
+        return {key: float('nan') for key in ('mean', 'std', 'mean_abs', 'median_abs', 'p95_abs', 'max_abs')}
+
+    abs_errors = np.abs(errors)
+    return {
+        'mean': float(errors.mean()),
+        'std': float(errors.std()),
+        'mean_abs': float(abs_errors.mean()),
+        'median_abs': float(np.median(abs_errors)),
+        'p95_abs': float(np.percentile(abs_errors, 95)),
+        'max_abs': float(abs_errors.max())
+    }
+
+def detection_scores(true_positives: int, n_predicted: int, n_truth: int) -> Dict[str, float]:
+    """
+    Precision, recall and F1 from match counts.
+
+    Returns:
+        Dictionary with true_positives, false_positives, false_negatives,
+        precision, recall and f1 (0 where undefined)
+    """
+    true_positives, n_predicted, n_truth = int(true_positives), int(n_predicted), int(n_truth)
+    precision = true_positives / n_predicted if n_predicted > 0 else 0.0
+    recall = true_positives / n_truth if n_truth > 0 else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall > 0 else 0.0
+    return {
+        'true_positives': true_positives,
+        'false_positives': n_predicted - true_positives,
+        'false_negatives': n_truth - true_positives,
+        'precision': precision,
+        'recall': recall,
+        'f1': f1
+    }
+
+def _times_by_type(events: Union[pd.DataFrame, Mapping[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """Event times per type from a DataFrame (time, type) or a {type: times} mapping."""
+    if isinstance(events, pd.DataFrame):
+        if len(events) == 0:
+            return {}
+        return {event_type: group.to_numpy(dtype=np.float64)
+                for event_type, group in events.groupby('type', sort=True)['time']}
+    return {event_type: np.asarray(times, dtype=np.float64) for event_type, times in events.items()}
+
+def score_events(predicted: Union[pd.DataFrame, Mapping[str, np.ndarray]],
+                 ground_truth: Union[pd.DataFrame, Mapping[str, np.ndarray]],
+                 tolerance: float = DEFAULT_TOLERANCE_S,
+                 event_types: Optional[Sequence[str]] = None,
+                 include_matches: bool = True) -> Dict:
+    """
+    Score predicted events against ground truth, matching within each event type.
+
+    Args:
+        predicted: Events with 'time' and 'type' columns, or {type: times}
+        ground_truth: Ground truth events in the same form
+        tolerance: Maximum time difference of a match in seconds
+        event_types: Types to score (default: all types in either input)
+        include_matches: Also return the matched pairs as a DataFrame (skip
+                         it when scoring many parameter settings)
+
+    Returns:
+        Dictionary with the overall detection_scores, 'timing_error' (see
+        timing_error_summary), 'per_type' (the same per event type) and,
+        with include_matches, 'matches' (type, truth_time, predicted_time,
+        error for every matched pair)
+    """
+    predicted_times = _times_by_type(predicted)
+    truth_times = _times_by_type(ground_truth)
+    if event_types is None:
+        event_types = sorted(set(predicted_times) | set(truth_times))
+
+    empty = np.array([], dtype=np.float64)
+    per_type = {}
+    matches = []
+    totals = np.zeros(3, dtype=np.int64)
+    for event_type in event_types:
+        pred = predicted_times.get(event_type, empty)
+        truth = truth_times.get(event_type, empty)
+        pred_index, truth_index = match_events(pred, truth, tolerance)
+        errors = pred[pred_index] - truth[truth_index]
+
+        per_type[event_type] = dict(detection_scores(len(pred_index), len(pred), len(truth)),
+                                    timing_error=timing_error_summary(errors))
+        totals += (len(pred_index), len(pred), len(truth))
+        matches.append((event_type, truth[truth_index], pred[pred_index], errors))
+
+    all_errors = np.concatenate([errors for *_, errors in matches]) if matches else empty
+    scores = dict(detection_scores(*totals), timing_error=timing_error_summary(all_errors), per_type=per_type)
+
+    if include_matches:
+        scores['matches'] = pd.DataFrame({
+            'type': np.concatenate([np.full(len(errors), event_type, dtype=object)
+                                    for event_type, *_, errors in matches]) if matches else [],
+            'truth_time': np.concatenate([truth for _, truth, _, _ in matches]) if matches else empty,
+            'predicted_time': np.concatenate([pred for _, _, pred, _ in matches]) if matches else empty,
+            'error': all_errors
+        })
+    return scores
@@ -0,0 +1,235 @@
+"""
+Background jobs with per-stage progress.
+Runs functions on a pool of worker threads in priority order, deduplicates
+jobs by key and lets callers poll or wait for progress updates.
+"""
+
+import itertools
+import queue
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Sequence
+
+# Job and stage states
+JOB_STATES = ('queued', 'running', 'done', 'failed')
+STAGE_STATES = ('pending', 'running', 'done', 'skipped')
+
+class Job:
+    """State of one background job (read it through JobManager snapshots)."""
+
+    def __init__(self, job_id: str, key: Hashable, stages: Sequence[str], priority: int):
+        self.id = job_id
+        self.key = key
+        self.priority = priority
+        self.status = 'queued'
+        self.stages = OrderedDict((stage, {'status': 'pending', 'seconds': None}) for stage in stages)
+        self.error = None
+        self.result = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        # Incremented on every change, so waiters can tell whether they missed one
+        self.version = 0
+        self._stage_started = {}
+
+    def to_dict(self) -> Dict:
+        """JSON-serializable snapshot (without the result)."""
+        return {
+            'job_id': self.id,
+            'key': self.key if isinstance(self.key, (str, int, float)) else str(self.key),
+            'status': self.status,
+            'priority': self.priority,
+            'stages': {stage: dict(info) for stage, info in self.stages.items()},
+            'error': self.error,
+            'submitted': self.submitted,
+            'started': self.started,
+            'finished': self.finished,
+            'version': self.version
+        }
+
+class JobManager:
+    """
+    Pool of worker threads running jobs in priority order.
+
+    A job function is called as func(report), where report(stage, status)
+    records progress ('running' or 'done') for one of the job's stages.
+    Submitting a key that is already queued or running returns the existing
+    job (raising its priority if needed), so prefetching and explicit
+    requests for the same trial share one computation.
+    """
+
+    def __init__(self, max_workers: int = 2, stages: Sequence[str] = (), history: int = 100):
+        """
+        Initialize job manager (worker threads start with the first job).
+
+        Args:
+            max_workers: Number of worker threads
+            stages: Default stage names of a job
+            history: Number of finished jobs kept for polling
+        """
+        self.max_workers = max_workers
+        self.stages = tuple(stages)
+        self.history = history
+        self._queue = queue.PriorityQueue()
+        self._jobs = OrderedDict()
+        self._active = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._order = itertools.count()
+        self._workers = []
+
+    def submit(self, key: Hashable, func: Callable, priority: int = 0,
+               stages: Optional[Sequence[str]] = None) -> Dict:
+        """
+        Queue a job unless one with the same key is queued or running.
+
+        Args:
+            key: Identifies the work (e.g. a trial id)
+            func: Function called as func(report) on a worker thread
+            priority: Lower runs first (e.g. 0 for requested work, 1 for prefetching)
+            stages: Stage names reported by func (default: the manager's stages)
+
+        Returns:
+            Snapshot of the new or existing job
+        """
+        with self._lock:
+            job = self._active.get(key)
+            if job is not None:
+                if job.status == 'queued' and priority < job.priority:
+                    # Queue it again ahead of its old entry, which workers will skip
+                    job.priority = priority
+                    job.version += 1
+                    self._queue.put((priority, next(self._order), job.id, func))
+                    self._changed.notify_all()
+                return job.to_dict()
+
+            # Random ids never collide with another manager's (e.g. another server process)
+            job = Job(uuid.uuid4().hex, key, stages if stages is not None else self.stages, priority)
+            self._jobs[job.id] = job
+            self._active[key] = job
+            self._queue.put((priority, next(self._order), job.id, func))
+            self._start_workers()
+            self._trim_history()
+            return job.to_dict()
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Snapshot of a job, or None if unknown (or dropped from the history)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job is not None else None
+
+    def result(self, job_id: str):
+        """
+        Return value of a finished job (None while it runs or if it failed).
+
+        Results are kept with the job history, so job functions should return
+        small summaries rather than the data they prepare.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.result if job is not None else None
+
+    def list_jobs(self) -> List[Dict]:
+        """Snapshots of all known jobs, oldest first."""
+        with self._lock:
+            return [job.to_dict() for job in self._jobs.values()]
+
+    def wait(self, job_id: str, version: int = -1, timeout: Optional[float] = None) -> Optional[Dict]:
+        """
+        Wait until a job changes past the given version or finishes.
+
+        Args:
+            job_id: Job identifier
+            version: Last version seen by the caller (-1: return immediately)
+            timeout: Maximum seconds to wait
+
+        Returns:
+            Snapshot of the job (unchanged if the timeout expired), or None if unknown
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._changed:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None or job.version > version or job.status in ('done', 'failed'):
+                    return job.to_dict() if job is not None else None
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return job.to_dict()
+                self._changed.wait(remaining)
+
+    def stats(self) -> Dict:
+        """Job counts per state and the number of workers."""
+        with self._lock:
+            counts = {state: 0 for state in JOB_STATES}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return dict(counts, workers=len(self._workers), max_workers=self.max_workers)
+
+    def _start_workers(self) -> None:
+        """Start worker threads up to max_workers (caller holds the lock)."""
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._work, name=f'job-worker-{len(self._workers) + 1}',
+                                      daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    def _trim_history(self) -> None:
+        """Forget the oldest finished jobs beyond the history limit (caller holds the lock)."""
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in ('done', 'failed')]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    def _report(self, job: Job, stage: str, status: str) -> None:
+        """Record stage progress of a running job."""
+        if status not in STAGE_STATES:
+            raise ValueError(f"Unknown stage status: {status} (expected one of {STAGE_STATES})")
+        with self._changed:
+            info = job.stages.setdefault(stage, {'status': 'pending', 'seconds': None})
+            info['status'] = status
+            if status == 'running':
+                job._stage_started[stage] = time.perf_counter()
+            elif stage in job._stage_started:
+                info['seconds'] = time.perf_counter() - job._stage_started.pop(stage)
+            job.version += 1
+            self._changed.notify_all()
+
+    def _work(self) -> None:
+        """Worker thread: run queued jobs in priority order."""
+        while True:
+            _, _, job_id, func = self._queue.get()
+            with self._lock:
+                job = self._jobs.get(job_id)
+                # Skip stale entries of re-prioritized jobs
+                if job is None or job.status != 'queued':
+                    continue
+                job.status = 'running'
+                job.started = time.time()
+                job.version += 1
+                self._changed.notify_all()
+
+            try:
+                result = func(lambda stage, status: self._report(job, stage, status))
+            except Exception as e:
+                traceback.print_exc()
+                status, result, error = 'failed', None, str(e)
+            else:
+                status, error = 'done', None
+
+            with self._changed:
+                if status == 'done':
+                    # Stages the function never reached (e.g. results were cached)
+                    for info in job.stages.values():
+                        if info['status'] == 'pending':
+                            info['status'] = 'skipped'
+                job.status = status
+                job.result = result
+                job.error = error
+                job.finished = time.time()
+                job.version += 1
+                if self._active.get(job.key) is job:
+                    del self._active[job.key]
+                self._trim_history()
+                self._changed.notify_all()
@@ -0,0 +1,130 @@
+"""
+Multi-resolution min/max pyramid for plotting long signals.
+Answers "min and max of every pixel column between start and end" without
+touching every sample, so peaks stay visible at any zoom level.
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+
+class MinMaxPyramid:
+    """
+    Min/max pyramid over the samples of one or more channels.
+
+    Level 0 is the signal itself; each level above it holds the min and max of
+    `factor` consecutive buckets of the level below. A query picks the coarsest
+    level whose buckets still fit inside one pixel and reduces those buckets to
+    one min/max pair per pixel, so every sample's extremes are represented.
+    """
+
+    def __init__(self, values: np.ndarray, sampling_rate: float, start_time: float = 0.0,
+                 factor: int = 4, min_buckets: int = 256, dtype=None):
+        """
+        Build pyramid.
+
+        Args:
+            values: Signals, shape (n_samples,) or (n_samples, n_channels)
+            sampling_rate: Sampling rate in Hz
+            start_time: Time of the first sample in seconds
+            factor: Buckets of a level merged into one bucket of the next level
+            min_buckets: Stop adding levels once a level has at most this many buckets
+            dtype: Storage dtype (None keeps the dtype of values)
+        """
+        if factor < 2:
+            raise ValueError(f"factor must be at least 2, got {factor}")
+
+        values = np.asarray(values, dtype=dtype)
+        self.ndim = values.ndim
+        values = values.reshape(len(values), -1)
+
+        self.sampling_rate = sampling_rate
+        self.start_time = start_time
+        self.factor = factor
+        self.n_samples = len(values)
+
+        # levels[k] = (mins, maxs) with buckets of factor ** k samples
+        self.levels = [(values, values)]
+        while len(self.levels[-1][0]) > max(min_buckets, 1):
+            mins, maxs = self.levels[-1]
+            self.levels.append((self._reduce(mins, np.fmin), self._reduce(maxs, np.fmax)))
+
+    def _reduce(self, values: np.ndarray, func) -> np.ndarray:
+        """Merge groups of `factor` buckets (NaN only where a whole group is NaN)."""
+        n_full = len(values) // self.factor * self.factor
+        reduced = func.reduce(values[:n_full].reshape(-1, self.factor, values.shape[1]), axis=1)
+        if n_full < len(values):
+            reduced = np.concatenate([reduced, func.reduce(values[n_full:], axis=0, keepdims=True)])
+        return reduced
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by all levels (level 0 is the input signal)."""
+        return int(self.levels[0][0].nbytes + sum(mins.nbytes + maxs.nbytes for mins, maxs in self.levels[1:]))
+
+    @property
+    def duration(self) -> float:
+        """Time between the first and last sample in seconds."""
+        return max(self.n_samples - 1, 0) / self.sampling_rate
+
+    def query(self, start: Optional[float] = None, end: Optional[float] = None,
+              width: int = 1000) -> Dict:
+        """
+        Get one min/max pair per pixel for a time range.
+
+        When the range holds no more samples than pixels, the samples are
+        returned as they are (min == max).
+
+        Args:
+            start: Range start in seconds (None: first sample)
+            end: Range end in seconds, inclusive (None: last sample)
+            width: Number of pixels
+
+        Returns:
+            Dictionary with 'time' (start time of each pixel), 'min' and 'max'
+            (shaped like the input, one row per pixel), 'level' and
+            'bucket_size' (samples per bucket of the level used)
+        """
+        if width < 1:
+            raise ValueError(f"width must be positive, got {width}")
+
+        start = self.start_time if start is None else start
+        end = self.start_time + self.duration if end is None else end
+        if end < start:
+            raise ValueError(f"Range end ({end}) is before start ({start})")
+
+        first = min(max(0, int(np.ceil((start - self.start_time) * self.sampling_rate - 1e-6))), self.n_samples)
+        stop = min(max(first, int(np.floor((end - self.start_time) * self.sampling_rate + 1e-6)) + 1), self.n_samples)
+        n = stop - first
+
+        if n <= width:
+            samples = self.levels[0][0][first:stop]
+            edges = np.arange(first, stop)
+            level, mins, maxs = 0, samples, samples
+        else:
+            # Coarsest level whose buckets are no wider than a pixel
+            samples_per_pixel = n // width
+            level = 0
+            while level + 1 < len(self.levels) and self.factor ** (level + 1) <= samples_per_pixel:
+                level += 1
+            size = self.factor ** level
+
+            edges = first + (np.arange(width + 1) * n) // width
+            bucket_edges = edges // size
+            level_mins, level_maxs = self.levels[level]
+            # A bucket straddling a pixel edge counts towards the later pixel, so a pixel
+            # may include up to size - 1 samples before its start time
+            last_bucket = -(-stop // size)
+            mins = np.fmin.reduceat(level_mins[:last_bucket], bucket_edges[:-1], axis=0)
+            maxs = np.fmax.reduceat(level_maxs[:last_bucket], bucket_edges[:-1], axis=0)
+            edges = edges[:-1]
+
+        if self.ndim == 1:
+            mins, maxs = mins[:, 0], maxs[:, 0]
+        return {
+            'time': self.start_time + edges / self.sampling_rate,
+            'min': mins,
+            'max': maxs,
+            'level': level,
+            'bucket_size': self.factor ** level
+        }
@@ -0,0 +1,369 @@
+"""
+Parallel parameter sweeps for force plate gait event detection.
+Scores detection parameters (grid or random search) against the annotated
+ground truth of many trials on a process pool. The synchronized force arrays
+are placed in shared memory once, so workers read them without pickling.
+
+Usage (from scripts/ground-truth-annotation):
+    python src/parameter_sweep.py --search grid --workers 4
+    python src/parameter_sweep.py --search random --samples 2000 --trials T5,T6
+"""
+
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from event_detection import EVENT_TYPES, FORCE_COLUMNS, detect_contacts
+from event_matching import DEFAULT_TOLERANCE_S, detection_scores, match_events, timing_error_summary
+
+# Parameters of detect_contacts that can be swept
+PARAMETER_NAMES = ('heel_strike_threshold', 'toe_off_threshold', 'min_stance_s', 'min_swing_s')
+
+# Default grid (values per parameter) and random search ranges ((low, high) per parameter)
+DEFAULT_GRID = {
+    'heel_strike_threshold': [20.0, 30.0, 50.0, 75.0, 100.0],
+    'toe_off_threshold': [5.0, 10.0, 20.0, 30.0, 50.0],
+    'min_stance_s': [0.0, 0.1, 0.2, 0.3],
+    'min_swing_s': [0.0, 0.05, 0.1]
+}
+DEFAULT_RANGES = {
+    'heel_strike_threshold': (10.0, 150.0),
+    'toe_off_threshold': (2.0, 60.0),
+    'min_stance_s': (0.0, 0.4),
+    'min_swing_s': (0.0, 0.15)
+}
+
+# Synchronized kinetics columns shared with the workers
+SHARED_SIGNALS = ('time',) + tuple(FORCE_COLUMNS.values())
+
+def grid_candidates(grid: Mapping[str, Sequence[float]] = DEFAULT_GRID) -> List[Dict[str, float]]:
+    """
+    All combinations of a parameter grid.
+
+    Combinations with toe_off_threshold not below heel_strike_threshold are
+    skipped (no hysteresis).
+
+    Args:
+        grid: Values per parameter (see PARAMETER_NAMES)
+
+    Returns:
+        List of parameter dictionaries
+    """
+    names = list(grid)
+    candidates = [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+    return [params for params in candidates if _valid(params)]
+
+def random_candidates(n: int, ranges: Mapping[str, Tuple[float, float]] = DEFAULT_RANGES,
+                      seed: int = 0) -> List[Dict[str, float]]:
+    """
+    Random parameter settings, uniform within the given ranges.
+
+    Args:
+        n: Number of settings
+        ranges: (low, high) per parameter (see PARAMETER_NAMES)
+        seed: Random seed
+
+    Returns:
+        List of n parameter dictionaries (all with toe_off_threshold below
+        heel_strike_threshold)
+    """
+    rng = np.random.default_rng(seed)
+    candidates = []
+    while len(candidates) < n:
+        draws = {name: rng.uniform(low, high, n) for name, (low, high) in ranges.items()}
+        batch = [{name: float(values[i]) for name, values in draws.items()} for i in range(n)]
+        valid = [params for params in batch if _valid(params)]
+        if not valid:
+            raise ValueError(f"Ranges allow no setting with toe_off_threshold below heel_strike_threshold: {ranges}")
+        candidates.extend(valid)
+    return candidates[:n]
+
+def _valid(params: Mapping[str, float]) -> bool:
+    """Whether toe_off_threshold is below heel_strike_threshold (if both are set)."""
+    return params.get('toe_off_threshold', -np.inf) < params.get('heel_strike_threshold', np.inf)
+
+def load_ground_truth(output_dir: str, trial_ids: Optional[Sequence[str]] = None) -> Dict[str, Dict]:
+    """
+    Load T*_ground_truth_events.json files written by the annotation tools.
+
+    Args:
+        output_dir: Directory of the ground truth files
+        trial_ids: Trials to load (default: all files found)
+
+    Returns:
+        {trial_id: {'ranges': annotated (start, end) times, shape (n, 2),
+                    'duration': end of the last range,
+                    'events': {event type: sorted times}}}
+        Files without annotated_ranges cover 0 to duration_seconds.
+    """
+    ground_truth = {}
+    for path in sorted(Path(output_dir).glob('T*_ground_truth_events.json')):
+        trial_id = path.name.split('_')[0]
+        if trial_ids is not None and trial_id not in trial_ids:
+            continue
+
+        with open(path, 'r') as f:
+            data = json.load(f)
+        events = pd.DataFrame(data.get('events', []), columns=['time', 'type'])
+        trial_info = data.get('trial_info', {})
+        ranges = np.array(trial_info.get('annotated_ranges', [[0.0, trial_info.get('duration_seconds', 20.0)]]),
+                          dtype=np.float64).reshape(-1, 2)
+        ranges = ranges[np.argsort(ranges[:, 0], kind='stable')]
+        ground_truth[trial_id] = {
+            'ranges': ranges,
+            'duration': float(ranges[:, 1].max()) if len(ranges) else 0.0,
+            'events': {event_type: np.sort(events.loc[events['type'] == event_type, 'time'].to_numpy(dtype=np.float64))
+                       for event_type in EVENT_TYPES}
+        }
+
+    missing = sorted(set(trial_ids or []) - set(ground_truth))
+    if missing:
+        raise FileNotFoundError(f"No ground truth for {missing} in {output_dir}")
+    return ground_truth
+
+def load_forces(pipeline, ground_truth: Mapping[str, Dict]) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Synchronized time and vertical forces of each trial up to its last annotated range.
+
+    Args:
+        pipeline: TrialPipeline used to load and synchronize the trials
+        ground_truth: As returned by load_ground_truth
+
+    Returns:
+        {trial_id: {signal: float64 array}} for the SHARED_SIGNALS
+    """
+    forces = {}
+    for trial_id, truth in ground_truth.items():
+        kinetics = pipeline.synchronized(trial_id, modalities=('kinetics',),
+                                         start=0.0, end=truth['duration'])['kinetics']
+        forces[trial_id] = {signal: kinetics[signal].to_numpy(dtype=np.float64) for signal in SHARED_SIGNALS}
+    return forces
+
+class SharedForceArrays:
+    """
+    Force arrays of all trials in one shared memory block.
+
+    The creating process owns the block (use it as a context manager, which
+    unlinks it on exit); workers attach to it by name with attach(descriptor)
+    and get zero-copy views.
+    """
+
+    def __init__(self, arrays: Mapping[str, Mapping[str, np.ndarray]]):
+        """
+        Copy arrays into a new shared memory block.
+
+        Args:
+            arrays: {trial_id: {signal: 1-D array}}
+        """
+        self.layout = {}
+        offset = 0
+        for trial_id, signals in arrays.items():
+            self.layout[trial_id] = {}
+            for signal, values in signals.items():
+                self.layout[trial_id][signal] = (offset, len(values))
+                offset += len(values) * np.dtype(np.float64).itemsize
+
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for trial_id, signals in arrays.items():
+            for signal, (start, length) in self.layout[trial_id].items():
+                view = np.ndarray(length, dtype=np.float64, buffer=self.shm.buf, offset=start)
+                view[:] = signals[signal]
+
+    @property
+    def descriptor(self) -> Tuple[str, Dict]:
+        """Picklable (block name, layout) passed to attach()."""
+        return self.shm.name, self.layout
+
+    @staticmethod
+    def attach(descriptor: Tuple[str, Dict]) -> Tuple[shared_memory.SharedMemory, Dict[str, Dict[str, np.ndarray]]]:
+        """
+        Attach to a block created by another process.
+
+        Returns:
+            (block, {trial_id: {signal: read-only view}}); keep the block
+            referenced while the views are used
+        """
+        name, layout = descriptor
+        # Pool workers share the creator's resource tracker, which unlinks the
+        # block only if the creator doesn't
+        shm = shared_memory.SharedMemory(name=name)
+
+        arrays = {}
+        for trial_id, signals in layout.items():
+            arrays[trial_id] = {}
+            for signal, (start, length) in signals.items():
+                view = np.ndarray(length, dtype=np.float64, buffer=shm.buf, offset=start)
+                view.flags.writeable = False
+                arrays[trial_id][signal] = view
+        return shm, arrays
+
+    def close(self) -> None:
+        """Release and remove the shared memory block."""
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def in_ranges(times: np.ndarray, ranges: np.ndarray) -> np.ndarray:
+    """Mask of times within any of the sorted, non-overlapping (start, end) ranges (inclusive)."""
+    index = np.searchsorted(ranges[:, 0], times, side='right') - 1
+    return (index >= 0) & (times <= ranges[np.maximum(index, 0), 1])
+
+def evaluate_parameters(params: Mapping[str, float], forces: Mapping[str, Mapping[str, np.ndarray]],
+                        ground_truth: Mapping[str, Dict],
+                        tolerance: float = DEFAULT_TOLERANCE_S) -> Dict:
+    """
+    Score one parameter setting over all trials.
+
+    Detections outside the annotated ranges are ignored, so unannotated parts
+    of a trial don't count as false positives. Matches, precision, recall and
+    F1 are pooled over trials (and event types); timing errors over all
+    matched events.
+
+    Args:
+        params: Keyword arguments of detect_contacts (see PARAMETER_NAMES)
+        forces: As returned by load_forces (or SharedForceArrays.attach)
+        ground_truth: As returned by load_ground_truth
+        tolerance: Matching tolerance in seconds
+
+    Returns:
+        Flat dictionary: the parameters, detection_scores, timing error
+        statistics (mean_error, mean_abs_error, p95_abs_error in seconds) and
+        f1 per event type (f1_<type>)
+    """
+    counts = {event_type: np.zeros(3, dtype=np.int64) for event_type in EVENT_TYPES}
+    errors = []
+    for trial_id, truth in ground_truth.items():
+        signals = forces[trial_id]
+        times = signals['time']
+        for side, column in FORCE_COLUMNS.items():
+            heel_strikes, toe_offs = detect_contacts(signals[column], times, **params)
+            for event, samples in (('heel_strike', heel_strikes), ('toe_off', toe_offs)):
+                event_type = f'{side}_{event}'
+                predicted = times[samples]
+                predicted = predicted[in_ranges(predicted, truth['ranges'])]
+                truth_times = truth['events'][event_type]
+                pred_index, truth_index = match_events(predicted, truth_times, tolerance)
+                counts[event_type] += (len(pred_index), len(predicted), len(truth_times))
+                errors.append(predicted[pred_index] - truth_times[truth_index])
+
+    timing = timing_error_summary(np.concatenate(errors) if errors else [])
+    result = dict(params)
+    result.update(detection_scores(*sum(counts.values())))
+    result.update(mean_error=timing['mean'], mean_abs_error=timing['mean_abs'], p95_abs_error=timing['p95_abs'])
+    for event_type in EVENT_TYPES:
+        result[f'f1_{event_type}'] = detection_scores(*counts[event_type])['f1']
+    return result
+
+# State of a pool worker, set by _init_worker
+_worker = {}
+
+def _init_worker(descriptor: Tuple[str, Dict], ground_truth: Mapping[str, Dict], tolerance: float) -> None:
+    """Attach a pool worker to the shared force arrays."""
+    _worker['shm'], _worker['forces'] = SharedForceArrays.attach(descriptor)
+    _worker['ground_truth'] = ground_truth
+    _worker['tolerance'] = tolerance
+
+def _evaluate_in_worker(params: Mapping[str, float]) -> Dict:
+    """Score one parameter setting in a pool worker."""
+    return evaluate_parameters(params, _worker['forces'], _worker['ground_truth'], _worker['tolerance'])
+
+def rank_results(results: pd.DataFrame) -> pd.DataFrame:
+    """Sort by F1 (descending), then mean absolute timing error, and number the ranks."""
+    ranked = results.sort_values(['f1', 'mean_abs_error'], ascending=[False, True],
+                                 na_position='last', kind='stable').reset_index(drop=True)
+    ranked.insert(0, 'rank', np.arange(1, len(ranked) + 1))
+    return ranked
+
+def run_sweep(forces: Mapping[str, Mapping[str, np.ndarray]], ground_truth: Mapping[str, Dict],
+              candidates: Sequence[Mapping[str, float]], workers: Optional[int] = None,
+              tolerance: float = DEFAULT_TOLERANCE_S, chunksize: Optional[int] = None) -> pd.DataFrame:
+    """
+    Score parameter settings on a process pool.
+
+    Args:
+        forces: As returned by load_forces
+        ground_truth: As returned by load_ground_truth
+        candidates: Parameter settings (see grid_candidates, random_candidates)
+        workers: Worker processes (default: CPU count; 1 runs in this process)
+        tolerance: Matching tolerance in seconds
+        chunksize: Settings sent to a worker at a time (default: about 4 chunks per worker)
+
+    Returns:
+        Ranked results table (see evaluate_parameters, rank_results)
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        rows = [evaluate_parameters(params, forces, ground_truth, tolerance) for params in candidates]
+        return rank_results(pd.DataFrame(rows))
+
+    chunksize = chunksize or max(1, len(candidates) // (workers * 4))
+    with SharedForceArrays(forces) as shared:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shared.descriptor, ground_truth, tolerance)) as pool:
+            rows = list(pool.map(_evaluate_in_worker, candidates, chunksize=chunksize))
+    return rank_results(pd.DataFrame(rows))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data-dir', default='data', help='Trial data directory')
+    parser.add_argument('--ground-truth-dir', default='output', help='Directory of T*_ground_truth_events.json')
+    parser.add_argument('--trials', help='Comma-separated trials (default: all with ground truth)')
+    parser.add_argument('--search', choices=('grid', 'random'), default='grid', help='Search strategy')
+    parser.add_argument('--samples', type=int, default=1000, help='Settings drawn by random search')
+    parser.add_argument('--seed', type=int, default=0, help='Random search seed')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE_S, help='Matching tolerance (s)')
+    parser.add_argument('--results', default='output/parameter_sweep_results.csv', help='Ranked results CSV')
+    parser.add_argument('--top', type=int, default=10, help='Settings printed')
+    args = parser.parse_args()
+
+    from data_loader import GaitDataLoader
+    from pipeline import TrialPipeline
+    from synchronizer import MultiModalSynchronizer
+
+    trial_ids = args.trials.split(',') if args.trials else None
+    ground_truth = load_ground_truth(args.ground_truth_dir, trial_ids)
+    if not ground_truth:
+        raise SystemExit(f"No T*_ground_truth_events.json in {args.ground_truth_dir}")
+
+    pipeline = TrialPipeline(GaitDataLoader(args.data_dir), MultiModalSynchronizer(target_rate=1000))
+    forces = load_forces(pipeline, ground_truth)
+    n_events = sum(len(times) for truth in ground_truth.values() for times in truth['events'].values())
+    print(f"✓ {len(forces)} trials, {n_events} ground truth events: {', '.join(forces)}")
+
+    if args.search == 'grid':
+        candidates = grid_candidates()
+    else:
+        candidates = random_candidates(args.samples, seed=args.seed)
+
+    workers = args.workers or os.cpu_count() or 1
+    print(f"Scoring {len(candidates)} settings ({args.search} search) on {workers} workers...")
+    start = time.perf_counter()
+    results = run_sweep(forces, ground_truth, candidates, workers=workers, tolerance=args.tolerance)
+    elapsed = time.perf_counter() - start
+    print(f"✓ Done in {elapsed:.1f} s ({len(candidates) / elapsed:.0f} settings/s)")
+
+    Path(args.results).parent.mkdir(parents=True, exist_ok=True)
+    results.to_csv(args.results, index=False)
+    print(f"✓ Ranked results saved to: {args.results}")
+
+    columns = ['rank'] + list(PARAMETER_NAMES) + ['f1', 'precision', 'recall', 'mean_abs_error']
+    print(f"\nTop {args.top} settings:")
+    print(results[columns].head(args.top).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
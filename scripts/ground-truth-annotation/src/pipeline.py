@@ -0,0 +1,531 @@
+"""
+Memoized trial processing pipeline.
+Caches raw loads, synchronized frames and EMG envelopes keyed by source file
+fingerprints and stage parameters, in memory (LRU) and optionally on disk.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Hashable, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from data_loader import GaitDataLoader, extract_key_markers
+from synchronizer import (EMG_FILTER_ORDER, MARKER_MODALITIES, WINDOW_PADDING_S,
+                          MultiModalSynchronizer, compute_emg_envelopes)
+from trial_cache import TrialCache
+
+# Source file behind each modality a pipeline can load
+MODALITY_SOURCES = {
+    'kinetics': 'kinetics',
+    'emg': 'emg',
+    'kinematics': 'kinematics',
+    'key_markers': 'kinematics'
+}
+
+DEFAULT_MODALITIES = ('kinetics', 'emg', 'kinematics', 'key_markers')
+
+STAGES = ('raw', 'synchronized', 'envelopes')
+
+# Size of the on-disk tier; least recently used entries are removed beyond it
+DISK_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+def estimate_nbytes(value) -> int:
+    """
+    Estimate the memory held by a cached value.
+
+    Counts the array data of DataFrames/Series/ndarrays (including memory-mapped
+    ones) and recurses into dicts, lists and tuples; other objects count as 0.
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=False).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=False))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(estimate_nbytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_nbytes(item) for item in value)
+    return 0
+
+class LRUCache:
+    """Thread-safe in-memory LRU mapping bounded by entry count and bytes, with statistics."""
+
+    def __init__(self, max_entries: int = 16, max_bytes: Optional[int] = None):
+        """
+        Initialize cache.
+
+        Args:
+            max_entries: Maximum number of entries kept (least recently used are evicted)
+            max_bytes: Maximum total size of the entries (see estimate_nbytes);
+                       None for no size limit
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default=None):
+        """Get a value and mark it as most recently used (default on miss)."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value, nbytes: Optional[int] = None) -> bool:
+        """
+        Store a value, evicting least recently used entries beyond the limits.
+
+        Args:
+            key: Cache key
+            value: Value to store
+            nbytes: Size of the value (default: estimate_nbytes(value))
+
+        Returns:
+            True if stored, False if the value alone exceeds max_bytes
+        """
+        if nbytes is None:
+            nbytes = estimate_nbytes(value)
+
+        with self._lock:
+            self._remove(key)
+            if self.max_bytes is not None and nbytes > self.max_bytes:
+                return False
+
+            self._entries[key] = value
+            self._sizes[key] = nbytes
+            self.nbytes += nbytes
+            while (len(self._entries) > self.max_entries or
+                   (self.max_bytes is not None and self.nbytes > self.max_bytes)):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            return True
+
+    def _remove(self, key: Hashable) -> None:
+        """Drop an entry (caller holds the lock)."""
+        if key in self._entries:
+            del self._entries[key]
+            self.nbytes -= self._sizes.pop(key)
+
+    def pop(self, key: Hashable, default=None):
+        """Remove and return an entry (default if missing)."""
+        with self._lock:
+            value = self._entries.get(key, default)
+            self._remove(key)
+            return value
+
+    def clear(self) -> None:
+        """Remove all entries (statistics are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.nbytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def stats(self) -> Dict:
+        """Get entry count, size and hit/miss/eviction counters."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'bytes': self.nbytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+class SingleFlight:
+    """
+    Run a computation at most once at a time per key.
+
+    Concurrent callers asking for a key that is already being computed wait
+    for that computation and share its result (or exception) instead of
+    repeating it; callers for other keys are not blocked.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key: Hashable, func: Callable):
+        """
+        Call func() unless a call for key is in flight, then wait for that one.
+
+        Args:
+            key: Identifies the computation
+            func: Computation without arguments
+
+        Returns:
+            Result of func() (from this or the in-flight call)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {'done': threading.Event(), 'result': None, 'error': None}
+
+        if not leader:
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result']
+
+        try:
+            call['result'] = func()
+            return call['result']
+        except BaseException as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call['done'].set()
+
+    def in_flight(self) -> int:
+        """Number of computations currently running."""
+        with self._lock:
+            return len(self._calls)
+
+class TrialPipeline:
+    """
+    Memoized load -> synchronize -> envelope pipeline.
+
+    Each stage result is keyed by the fingerprints (path, mtime, size) of the
+    source files it depends on plus the parameters of that stage and the stages
+    before it, so a changed CSV or different settings never return stale data.
+    Results are shared between callers and must be treated as read-only.
+    The pipeline is thread-safe; concurrent requests for the same stage result
+    compute it once.
+    """
+
+    def __init__(self, loader: Optional[GaitDataLoader] = None,
+                 synchronizer: Optional[MultiModalSynchronizer] = None,
+                 envelope_window_ms: float = 50.0, envelope_method: str = 'savgol',
+                 max_entries: int = 16, max_bytes: Optional[int] = None,
+                 disk_cache_dir: Optional[Union[str, Path]] = None,
+                 disk_max_entries: Optional[int] = None,
+                 disk_max_bytes: Optional[int] = DISK_CACHE_MAX_BYTES):
+        """
+        Initialize pipeline.
+
+        Args:
+            loader: Data loader (default: GaitDataLoader("data"))
+            synchronizer: Synchronizer (default: MultiModalSynchronizer at 1000 Hz)
+            envelope_window_ms: EMG envelope smoothing window in milliseconds
+            envelope_method: EMG envelope method ('savgol', 'lowpass' or 'rms')
+            max_entries: Size of the in-memory LRU tier (entries across all stages)
+            max_bytes: Size limit of the in-memory LRU tier in bytes (None: no limit)
+            disk_cache_dir: Directory for the on-disk tier of synchronized frames and
+                            envelopes (None keeps results in memory only). Every
+                            window, parameter set and source version gets its own
+                            entries, so the tier is pruned to disk_max_entries and
+                            disk_max_bytes after each store, least recently used first
+            disk_max_entries: Number of frames kept in the on-disk tier (None: no limit)
+            disk_max_bytes: Size limit of the on-disk tier in bytes (default 2 GiB,
+                            None: no limit)
+        """
+        self.loader = loader if loader is not None else GaitDataLoader()
+        self.synchronizer = synchronizer if synchronizer is not None else MultiModalSynchronizer()
+        self.envelope_window_ms = envelope_window_ms
+        self.envelope_method = envelope_method
+        self.memory = LRUCache(max_entries, max_bytes)
+        self.disk = TrialCache(disk_cache_dir) if disk_cache_dir is not None else None
+        self.disk_max_entries = disk_max_entries
+        self.disk_max_bytes = disk_max_bytes
+        self.stage_stats = {stage: {'memory_hits': 0, 'disk_hits': 0, 'misses': 0} for stage in STAGES}
+        self.last_sources = {}
+        self._stats_lock = threading.Lock()
+        self._in_flight = SingleFlight()
+
+    def _record(self, stage: str, source: str) -> None:
+        """Count where a stage result came from ('memory', 'disk' or 'computed')."""
+        counter = {'memory': 'memory_hits', 'disk': 'disk_hits', 'computed': 'misses'}[source]
+        with self._stats_lock:
+            self.stage_stats[stage][counter] += 1
+            self.last_sources[stage] = source
+
+    def _fingerprints(self, trial_id: str, modalities: Sequence[str]) -> Dict[str, Dict]:
+        """Fingerprints of the source files behind the requested modalities."""
+        sources = sorted({MODALITY_SOURCES[modality] for modality in modalities})
+        return {source: TrialCache.fingerprint(self.loader._filepath(source, trial_id))
+                for source in sources}
+
+    def source_fingerprints(self, trial_id: str,
+                            modalities: Sequence[str] = DEFAULT_MODALITIES) -> Dict[str, Dict]:
+        """
+        Fingerprints (path, mtime, size) of the source files behind the given modalities.
+
+        Args:
+            trial_id: Trial identifier (e.g., "T5")
+            modalities: Modalities of interest
+
+        Returns:
+            Dictionary of TrialCache.fingerprint results keyed by source ('kinetics', ...)
+        """
+        return self._fingerprints(trial_id, modalities)
+
+    def _key(self, stage: str, trial_id: str, modalities: Sequence[str], params: Dict) -> str:
+        """Content key of a stage result: source fingerprints + all upstream parameters."""
+        payload = {
+            'stage': stage,
+            'trial_id': trial_id,
+            'modalities': sorted(modalities),
+            'sources': self._fingerprints(trial_id, modalities),
+            'params': params
+        }
+        return hashlib.sha1(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def _raw_params(self, time_range: Optional[Tuple[float, float]]) -> Dict:
+        """Parameters of the raw load stage."""
+        return {'dtype': self.loader.dtype.name,
+                'time_range': list(time_range) if time_range is not None else None}
+
+    def _sync_params(self, start: Optional[float], end: Optional[float]) -> Dict:
+        """Parameters of the synchronization stage."""
+        return {'target_rate': self.synchronizer.target_rate,
+                'dtype': self.synchronizer.dtype.name if self.synchronizer.dtype is not None else None,
+                'emg_method': self.synchronizer.emg_method,
+                'emg_filter_order': EMG_FILTER_ORDER,
+                'window': [start, end],
+                'padding': WINDOW_PADDING_S if (start, end) != (None, None) else None,
+                'marker_gaps': 'bridged' if (start, end) != (None, None) else None}
+
+    def _window_params(self, trial_id: str, start: Optional[float],
+                       end: Optional[float]) -> Tuple[Optional[Tuple[float, float]], Dict]:
+        """Raw time range to load for a synchronization window, and the upstream key parameters."""
+        time_range = None
+        if (start, end) != (None, None):
+            end_loaded = end if end is not None else self.loader.get_trial_duration(trial_id)
+            time_range = self.synchronizer.padded_range(start or 0.0, end_loaded)
+        params = {'raw': self._raw_params(time_range), 'synchronized': self._sync_params(start, end)}
+        return time_range, params
+
+    def trial_key(self, trial_id: str, modalities: Sequence[str] = DEFAULT_MODALITIES,
+                  start: Optional[float] = None, end: Optional[float] = None) -> str:
+        """
+        Content key covering a trial's synchronized data and envelopes.
+
+        Changes whenever a source file or any stage parameter changes, so callers
+        can cache derived results (e.g. responses) under it.
+
+        Args:
+            trial_id: Trial identifier (e.g., "T5")
+            modalities: Modalities of the synchronized data
+            start: Window start in seconds (None: start of the trial)
+            end: Window end in seconds (None: end of the shortest modality)
+
+        Returns:
+            Hex digest key
+        """
+        _, params = self._window_params(trial_id, start, end)
+        params['envelopes'] = self._envelope_params()
+        return self._key('envelopes', trial_id, list(modalities), params)
+
+    def _envelope_params(self) -> Dict:
+        """Parameters of the envelope stage."""
+        return {'window_ms': self.envelope_window_ms, 'method': self.envelope_method}
+
+    def _disk_load(self, trial_id: str, key: str, names: Sequence[str]) -> Optional[Dict[str, pd.DataFrame]]:
+        """Load all frames of a stage result from the disk tier, or None if any is missing."""
+        if self.disk is None:
+            return None
+        source = self.loader._filepath('kinetics', trial_id)
+        frames = {}
+        for name in names:
+            df = self.disk.load(source, variant=f'{key}:{name}')
+            if df is None:
+                return None
+            frames[name] = df
+        return frames
+
+    def _disk_store(self, trial_id: str, key: str, frames: Dict[str, pd.DataFrame]) -> None:
+        """Write all frames of a stage result to the disk tier."""
+        if self.disk is None:
+            return
+        source = self.loader._filepath('kinetics', trial_id)
+        for name, df in frames.items():
+            self.disk.store(source, df, variant=f'{key}:{name}')
+        # Entries of old windows, parameters and source versions are never read again
+        self.disk.prune(self.disk_max_entries, self.disk_max_bytes)
+
+    def _load_raw(self, trial_id: str, modalities: Sequence[str],
+                  time_range: Optional[Tuple[float, float]]) -> Dict[str, pd.DataFrame]:
+        """
+        Load raw modalities, reusing parsed kinematics for key markers when both are needed.
+
+        With a time range, marker modalities are still loaded whole: the
+        synchronizer bridges marker gaps at the window edges with samples from
+        beyond the padding (markers are the smallest, 100 Hz, file).
+        """
+        if time_range is None and {'kinetics', 'emg', 'kinematics'} <= set(modalities):
+            data = self.loader.load_all_modalities(
+                trial_id, include_key_markers='key_markers' in modalities)
+            return {modality: data[modality] for modality in modalities}
+
+        loaders = {
+            'kinetics': self.loader.load_kinetics,
+            'emg': self.loader.load_emg,
+            'kinematics': self.loader.load_kinematics,
+            'key_markers': self.loader.load_kinematics_key_markers
+        }
+        data = {}
+        for modality in modalities:
+            if modality == 'key_markers' and 'kinematics' in modalities:
+                continue
+            modality_range = None if modality in MARKER_MODALITIES else time_range
+            data[modality] = loaders[modality](trial_id, time_range=modality_range)
+        if 'key_markers' in modalities and 'kinematics' in modalities:
+            data['key_markers'] = extract_key_markers(data['kinematics'])
+        return {modality: data[modality] for modality in modalities}
+
+    def raw(self, trial_id: str, modalities: Sequence[str] = DEFAULT_MODALITIES,
+            time_range: Optional[Tuple[float, float]] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Get raw trial data (memoized in memory; parsed CSVs are already cached by the loader).
+
+        Args:
+            trial_id: Trial identifier (e.g., "T5")
+            modalities: Modalities to load ('kinetics', 'emg', 'kinematics', 'key_markers')
+            time_range: (start, end) in seconds to load; None loads the whole trial
+
+        Returns:
+            Dictionary of raw DataFrames keyed by modality
+        """
+        modalities = list(modalities)
+        key = self._key('raw', trial_id, modalities, self._raw_params(time_range))
+
+        def load():
+            data = self.memory.get(key)
+            if data is not None:
+                self._record('raw', 'memory')
+            else:
+                data = self._load_raw(trial_id, modalities, time_range)
+                self.memory.put(key, data)
+                self._record('raw', 'computed')
+            return data
+
+        # New dict so callers can add or replace modalities without touching the cache
+        return dict(self._in_flight.do(key, load))
+
+    def synchronized(self, trial_id: str, modalities: Sequence[str] = DEFAULT_MODALITIES,
+                     start: Optional[float] = None,
+                     end: Optional[float] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Get synchronized trial data.
+
+        Args:
+            trial_id: Trial identifier (e.g., "T5")
+            modalities: Modalities to synchronize
+            start: Window start in seconds (None: start of the trial)
+            end: Window end in seconds (None: end of the shortest modality)
+
+        Returns:
+            Dictionary of synchronized DataFrames keyed by modality
+        """
+        modalities = list(modalities)
+        time_range, params = self._window_params(trial_id, start, end)
+        key = self._key('synchronized', trial_id, modalities, params)
+
+        def synchronize():
+            data = self.memory.get(key)
+            if data is not None:
+                self._record('synchronized', 'memory')
+                return data
+
+            data = self._disk_load(trial_id, key, modalities)
+            if data is not None:
+                self._record('synchronized', 'disk')
+            else:
+                raw = self.raw(trial_id, modalities, time_range=time_range)
+                data = self.synchronizer.synchronize_all_modalities(raw, start=start, end=end)
+                self._disk_store(trial_id, key, data)
+                self._record('synchronized', 'computed')
+
+            self.memory.put(key, data)
+            return data
+
+        return dict(self._in_flight.do(key, synchronize))
+
+    def envelopes(self, trial_id: str, modalities: Sequence[str] = DEFAULT_MODALITIES,
+                  start: Optional[float] = None, end: Optional[float] = None) -> pd.DataFrame:
+        """
+        Get EMG envelopes of the synchronized EMG.
+
+        Args:
+            trial_id: Trial identifier (e.g., "T5")
+            modalities: Modalities of the synchronized data the envelopes belong to
+                        (shares its cache entry with synchronized(); must include 'emg')
+            start: Window start in seconds (None: start of the trial)
+            end: Window end in seconds (None: end of the shortest modality)
+
+        Returns:
+            DataFrame with time and one <channel>_envelope column per EMG channel
+        """
+        modalities = list(modalities)
+        if 'emg' not in modalities:
+            raise ValueError("EMG envelopes require the 'emg' modality")
+        key = self.trial_key(trial_id, modalities, start, end)
+
+        def compute():
+            envelopes = self.memory.get(key)
+            if envelopes is not None:
+                self._record('envelopes', 'memory')
+                return envelopes
+
+            frames = self._disk_load(trial_id, key, ['emg_envelopes'])
+            if frames is not None:
+                envelopes = frames['emg_envelopes']
+                self._record('envelopes', 'disk')
+            else:
+                emg = self.synchronized(trial_id, modalities, start=start, end=end)['emg']
+                envelopes = compute_emg_envelopes(emg, window_ms=self.envelope_window_ms,
+                                                  sampling_rate=self.synchronizer.target_rate,
+                                                  dtype=self.synchronizer.dtype,
+                                                  method=self.envelope_method)
+                self._disk_store(trial_id, key, {'emg_envelopes': envelopes})
+                self._record('envelopes', 'computed')
+
+            self.memory.put(key, envelopes)
+            return envelopes
+
+        return self._in_flight.do(key, compute)
+
+    def stats(self) -> Dict:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with per-stage memory_hits/disk_hits/misses and the LRU
+            tier's entry count and counters under 'memory'
+        """
+        with self._stats_lock:
+            stats = {stage: dict(counts) for stage, counts in self.stage_stats.items()}
+        stats['memory'] = self.memory.stats()
+        return stats
+
+    def clear(self, disk: bool = False) -> None:
+        """Drop in-memory results (and the disk tier if disk=True)."""
+        self.memory.clear()
+        if disk and self.disk is not None:
+            self.disk.clear()
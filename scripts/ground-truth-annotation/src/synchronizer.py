@@ -5,33 +5,158 @@ Aligns data from different modalities to a common timeline.
 
 import pandas as pd
 import numpy as np
-from typing import Dict, Tuple
+from fractions import Fraction
+from typing import Dict, Iterable, Iterator, Optional, Tuple
 from scipy import signal
-from scipy.interpolate import interp1d
+
+from emg_envelope import emg_envelope
+
+# Extra data (seconds) processed on each side of a synchronization window, so
+# filtfilt edge transients and interpolation neighbours fall outside the window
+WINDOW_PADDING_S = 0.1
+
+# Butterworth order of the EMG anti-aliasing filter ('filtfilt' downsampling)
+EMG_FILTER_ORDER = 4
+
+# Marker modalities are interpolated across occlusion gaps of any length, so a
+# window also needs each marker's nearest valid samples beyond its padding
+MARKER_MODALITIES = ('kinematics', 'key_markers')
+
+def _output_dtype(values_dtype, dtype=None) -> np.dtype:
+    """
+    Resolve the dtype for processed signal columns.
+    
+    An explicit dtype wins; otherwise floating inputs keep their precision
+    (float32 stays float32) and everything else is promoted to float64.
+    """
+    if dtype is not None:
+        return np.dtype(dtype)
+    values_dtype = np.dtype(values_dtype)
+    if values_dtype.kind == 'f':
+        return values_dtype
+    return np.dtype(np.float64)
+
+def _find_valid(values: np.ndarray, position: int, step: int) -> Optional[int]:
+    """
+    Row of the nearest non-NaN value from position on, searching in growing blocks.
+    
+    Args:
+        values: 1D array
+        position: First row to check
+        step: 1 to search forward, -1 to search backward
+        
+    Returns:
+        Row index, or None if there is no valid value in that direction
+    """
+    block = 64
+    while 0 <= position < len(values):
+        if step > 0:
+            stop = min(len(values), position + block)
+            hits = np.flatnonzero(~np.isnan(values[position:stop]))
+            if len(hits):
+                return position + int(hits[0])
+            position = stop
+        else:
+            first = max(0, position - block + 1)
+            hits = np.flatnonzero(~np.isnan(values[first:position + 1]))
+            if len(hits):
+                return first + int(hits[-1])
+            position = first - 1
+        block *= 2
+    return None
+
+def linear_resample(source_times: np.ndarray, values: np.ndarray,
+                    target_times: np.ndarray, block_size: int = 65536) -> np.ndarray:
+    """
+    Linearly interpolate all columns of a 2D array onto new time points at once.
+    
+    Equivalent to interp1d(kind='linear', fill_value='extrapolate') applied per
+    column, but the sample positions and weights are computed once and shared
+    by every column.
+    
+    Args:
+        source_times: Sorted sample times, shape (n_source,)
+        values: Sample values, shape (n_source, n_columns); must not contain NaN
+        target_times: Target time points, shape (n_target,)
+        block_size: Number of target rows processed per block (bounds temporaries)
+        
+    Returns:
+        Interpolated values, shape (n_target, n_columns), float64; all NaN
+        when there are fewer than 2 source samples to interpolate between
+    """
+    source_times = np.asarray(source_times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    target_times = np.asarray(target_times, dtype=np.float64)
+    
+    if len(source_times) < 2:
+        return np.full((len(target_times), values.shape[1]), np.nan)
+    
+    result = np.empty((len(target_times), values.shape[1]), dtype=np.float64)
+    
+    # Left sample of the enclosing interval; the first/last interval is used
+    # for linear extrapolation outside the source range
+    left = np.searchsorted(source_times, target_times, side='right') - 1
+    left = np.clip(left, 0, len(source_times) - 2)
+    
+    t0 = source_times[left]
+    weights = (target_times - t0) / (source_times[left + 1] - t0)
+    
+    for start in range(0, len(target_times), block_size):
+        rows = slice(start, start + block_size)
+        y0 = values[left[rows]]
+        y1 = values[left[rows] + 1]
+        np.subtract(y1, y0, out=y1)
+        y1 *= weights[rows, None]
+        np.add(y0, y1, out=result[rows])
+    
+    return result
 
 class MultiModalSynchronizer:
     """Synchronize multi-modal gait data to common timeline."""
     
-    def __init__(self, target_rate: int = 1000):
+    def __init__(self, target_rate: int = 1000, dtype=None, emg_method: str = 'filtfilt'):
         """
         Initialize synchronizer.
         
         Args:
             target_rate: Target sampling rate in Hz (default 1000 Hz)
+            dtype: Output dtype for signal columns (None keeps float32 inputs as
+                   float32 and promotes other columns to float64); time stays float64
+            emg_method: EMG downsampling method, 'filtfilt' or 'polyphase'
+                        (non-integer rate ratios always use 'polyphase')
         """
         self.target_rate = target_rate
+        self.dtype = np.dtype(dtype) if dtype is not None else None
+        self.emg_method = emg_method
     
-    def create_master_timeline(self, duration: float) -> np.ndarray:
+    def create_master_timeline(self, duration: float, start: float = 0.0) -> np.ndarray:
         """
         Create master timeline at target sampling rate.
         
         Args:
             duration: Duration in seconds
+            start: Start time in seconds (the timeline covers start to start + duration)
+            
+        Returns:
+            Time array at target sampling rate (sample k is exactly k / target_rate,
+            so modalities recorded at the target rate line up with it sample for sample)
+        """
+        first = int(np.ceil(start * self.target_rate - 1e-6))
+        last = int(np.floor((start + duration) * self.target_rate + 1e-6))
+        return np.arange(first, last + 1) / float(self.target_rate)
+    
+    def padded_range(self, start: float, end: float) -> Tuple[float, float]:
+        """
+        Time range of raw data needed to synchronize the window (start, end).
+        
+        Args:
+            start: Window start in seconds
+            end: Window end in seconds
             
         Returns:
-            Time array at target sampling rate
+            (start, end) widened by WINDOW_PADDING_S, for windowed loading
         """
-        return np.linspace(0, duration, int(duration * self.target_rate))
+        return max(0.0, start - WINDOW_PADDING_S), end + WINDOW_PADDING_S
     
     def resample_to_target_rate(self, data: pd.DataFrame, 
                                time_col: str = 'time',
@@ -51,68 +176,199 @@ class MultiModalSynchronizer:
             duration = data[time_col].max()
             target_times = self.create_master_timeline(duration)
         
-        # Create resampled DataFrame
-        resampled = pd.DataFrame({'time': target_times})
+        target_times = np.asarray(target_times, dtype=np.float64)
+        source_times = data[time_col].to_numpy(dtype=np.float64)
+        numeric_cols = [col for col in data.columns
+                        if col != time_col and pd.api.types.is_numeric_dtype(data[col])]
         
-        # Interpolate each numeric column
-        for col in data.columns:
-            if col != time_col and pd.api.types.is_numeric_dtype(data[col]):
-                # Remove NaN values for interpolation
-                valid_mask = ~data[col].isna()
-                if valid_mask.sum() > 1:  # Need at least 2 points
-                    interp_func = interp1d(
-                        data[time_col][valid_mask], 
-                        data[col][valid_mask],
-                        kind='linear',
-                        bounds_error=False,
-                        fill_value='extrapolate'
-                    )
-                    resampled[col] = interp_func(target_times)
-                else:
-                    resampled[col] = np.nan
+        # Group columns by output dtype and NaN presence: NaN-free groups are
+        # interpolated in one batched operation, columns with gaps use their own valid samples
+        groups = {}
+        for col in numeric_cols:
+            out_dtype = _output_dtype(data[col].dtype, self.dtype)
+            has_nan = bool(data[col].isna().any())
+            groups.setdefault((out_dtype, has_nan), []).append(col)
         
-        return resampled
+        frames = [pd.DataFrame({'time': target_times})]
+        for (out_dtype, has_nan), cols in groups.items():
+            values = data[cols].to_numpy(dtype=np.float64)
+            resampled = np.empty((len(target_times), len(cols)), dtype=out_dtype)
+            
+            if not has_nan:
+                resampled[:] = linear_resample(source_times, values, target_times)
+            else:
+                for i in range(len(cols)):
+                    # Remove NaN values for interpolation
+                    valid_mask = ~np.isnan(values[:, i])
+                    if valid_mask.sum() > 1:  # Need at least 2 points
+                        resampled[:, i] = linear_resample(source_times[valid_mask],
+                                                          values[valid_mask, i:i + 1],
+                                                          target_times)[:, 0]
+                    else:
+                        resampled[:, i] = np.nan
+            
+            frames.append(pd.DataFrame(resampled, columns=cols, copy=False))
+        
+        # Keep the original column order: time first, then numeric columns
+        return pd.concat(frames, axis=1)[['time'] + numeric_cols]
     
-    def downsample_emg(self, emg_data: pd.DataFrame) -> pd.DataFrame:
+    def downsample_emg(self, emg_data: pd.DataFrame, method: Optional[str] = None,
+                       original_rate: int = 2000) -> pd.DataFrame:
         """
         Downsample EMG data from 2000 Hz to target rate.
         Applies anti-aliasing filter before downsampling.
         
         Args:
             emg_data: EMG DataFrame at 2000 Hz
+            method: 'filtfilt' (zero-phase Butterworth + decimation, integer ratios only)
+                    or 'polyphase' (FIR filter and rational resampling in one step);
+                    defaults to self.emg_method
+            original_rate: EMG sampling rate in Hz
             
         Returns:
-            Downsampled EMG DataFrame
+            Downsampled EMG DataFrame on a uniform grid at the target rate
         """
-        # Calculate downsampling factor
-        original_rate = 2000
-        downsample_factor = original_rate // self.target_rate
+        method = method or self.emg_method
+        if method not in ('filtfilt', 'polyphase'):
+            raise ValueError(f"Unknown EMG downsampling method: {method}")
         
-        if downsample_factor == 1:
-            return emg_data
+        # Rational resampling factor, e.g. 2000 -> 1000 Hz is 1/2, 2000 -> 1500 Hz is 3/4
+        ratio = Fraction(self.target_rate, original_rate).limit_denominator(1000)
+        up, down = ratio.numerator, ratio.denominator
         
-        # Apply anti-aliasing filter
-        nyquist = original_rate / 2
-        cutoff = self.target_rate / 2
-        b, a = signal.butter(4, cutoff / nyquist, btype='low')
+        if up == down:
+            return emg_data
         
-        # Create new downsampled DataFrame with correct length
-        downsampled_data = {}
+        # Decimation by slicing only works for integer ratios
+        if up != 1:
+            method = 'polyphase'
         
-        # Downsample time vector first to get correct length
-        downsampled_time = emg_data['time'][::downsample_factor]
-        downsampled_data['time'] = downsampled_time
+        channels = [col for col in emg_data.columns
+                    if col != 'time' and pd.api.types.is_numeric_dtype(emg_data[col])]
+        values = emg_data[channels].to_numpy(dtype=np.float64)
         
-        # Filter and downsample each EMG channel
-        for col in emg_data.columns:
-            if col != 'time' and pd.api.types.is_numeric_dtype(emg_data[col]):
-                # Apply filter
-                filtered = signal.filtfilt(b, a, emg_data[col])
-                # Downsample
-                downsampled_data[col] = filtered[::downsample_factor]
+        if method == 'filtfilt':
+            # Apply anti-aliasing filter to all channels at once, then decimate
+            nyquist = original_rate / 2
+            cutoff = self.target_rate / 2
+            b, a = signal.butter(EMG_FILTER_ORDER, cutoff / nyquist, btype='low')
+            # Keep every down-th sample of the recording, so a window starting at
+            # any sample decimates in phase with the full trial
+            times = emg_data['time'].to_numpy()
+            offset = (-int(round(times[0] * original_rate))) % down if len(times) else 0
+            downsampled_values = signal.filtfilt(b, a, values, axis=0)[offset::down]
+            downsampled_time = times[offset::down]
+        else:
+            # Polyphase FIR anti-aliasing + rational resampling across all channels;
+            # 'line' padding avoids edge transients on trending channels (e.g. Frame)
+            downsampled_values = signal.resample_poly(values, up, down, axis=0, padtype='line')
+            start_time = emg_data['time'].iloc[0] if len(emg_data) > 0 else 0.0
+            downsampled_time = start_time + np.arange(len(downsampled_values)) / self.target_rate
         
         # Create new DataFrame with consistent length
-        return pd.DataFrame(downsampled_data)
+        frames = [pd.DataFrame({'time': downsampled_time})]
+        for i, col in enumerate(channels):
+            out_dtype = _output_dtype(emg_data[col].dtype, self.dtype)
+            frames.append(pd.DataFrame({col: downsampled_values[:, i].astype(out_dtype)}))
+        return pd.concat(frames, axis=1)
+    
+    def _aligned_view(self, data: pd.DataFrame, target_times: np.ndarray) -> Optional[pd.DataFrame]:
+        """
+        Return data restricted to target_times if its samples already lie on that grid.
+        
+        Args:
+            data: DataFrame with 'time' column
+            target_times: Target time points
+            
+        Returns:
+            Row slice of data laid out like resample_to_target_rate output
+            ('time' first as float64, numeric columns in _output_dtype; columns that
+            already have it are not copied), or None if the grids differ and
+            interpolation is needed
+        """
+        n = len(target_times)
+        if n == 0:
+            return None
+        
+        times = data['time'].to_numpy()
+        tolerance = 1e-3 / self.target_rate
+        first = np.searchsorted(times, target_times[0] - tolerance)
+        if len(times) - first < n:
+            return None
+        
+        # Cheap rejection on the end points before comparing every sample
+        times = times[first:first + n]
+        if (abs(times[0] - target_times[0]) > tolerance or
+                abs(times[-1] - target_times[-1]) > tolerance):
+            return None
+        if not np.allclose(times, target_times, rtol=0, atol=tolerance):
+            return None
+        
+        aligned = data.iloc[first:first + n]
+        if first > 0 or not isinstance(data.index, pd.RangeIndex) or data.index.start != 0:
+            # Same 0-based row labels as resampled modalities (windows start mid-recording)
+            aligned = aligned.set_axis(pd.RangeIndex(n), axis=0)
+        # Same columns and dtypes as the interpolation path, whichever grid the data is on
+        numeric_cols = [col for col in aligned.columns
+                        if col != 'time' and pd.api.types.is_numeric_dtype(aligned[col])]
+        aligned = aligned[['time'] + numeric_cols]
+        casts = {col: _output_dtype(aligned[col].dtype, self.dtype) for col in numeric_cols}
+        casts['time'] = np.dtype(np.float64)
+        casts = {col: dtype for col, dtype in casts.items() if aligned[col].dtype != dtype}
+        if casts:
+            aligned = aligned.astype(casts)
+        return aligned
+    
+    def _window_rows(self, data: pd.DataFrame, window_start: float, window_end: float,
+                     bridge_gaps: bool = False) -> pd.DataFrame:
+        """
+        Rows of data needed to synchronize the window (start, end).
+        
+        Args:
+            data: Time-sorted DataFrame with 'time' column
+            window_start: Window start in seconds
+            window_end: Window end in seconds
+            bridge_gaps: Also keep, for every column with NaN in the padded
+                         window, its last valid sample before and first valid
+                         sample after it (and a second one where the batch path
+                         extrapolates), so gaps longer than WINDOW_PADDING_S are
+                         interpolated as in the whole recording
+            
+        Returns:
+            Row slice of data (no copy), or a copy of the selected rows when
+            samples beyond the padding are added
+        """
+        times = data['time'].to_numpy()
+        first = int(np.searchsorted(times, window_start - WINDOW_PADDING_S, side='left'))
+        stop = int(np.searchsorted(times, window_end + WINDOW_PADDING_S, side='right'))
+        if not bridge_gaps:
+            return data.iloc[first:stop]
+        
+        extra = set()
+        for col in data.columns:
+            values = data[col].to_numpy()
+            if col == 'time' or values.dtype.kind != 'f':
+                continue
+            missing = np.isnan(values[first:stop])
+            if not missing.any():
+                continue
+            
+            before = _find_valid(values, first - 1, -1)
+            after = _find_valid(values, stop, 1)
+            rows = [row for row in (before, after) if row is not None]
+            if len(rows) == 1 and not (~missing).any():
+                # Beyond a column's valid samples the batch path extrapolates
+                # from its first or last two
+                rows.append(_find_valid(values, after + 1, 1) if before is None
+                            else _find_valid(values, before - 1, -1))
+            extra.update(row for row in rows if row is not None)
+        
+        if not extra:
+            return data.iloc[first:stop]
+        rows = np.concatenate([sorted(row for row in extra if row < first),
+                               np.arange(first, stop),
+                               sorted(row for row in extra if row >= stop)]).astype(np.intp)
+        return data.iloc[rows]
     
     def upsample_kinematics(self, kinematics_data: pd.DataFrame, 
                            target_times: np.ndarray) -> pd.DataFrame:
@@ -129,12 +385,26 @@ class MultiModalSynchronizer:
         """
         return self.resample_to_target_rate(kinematics_data, 'time', target_times)
     
-    def synchronize_all_modalities(self, data_dict: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    def synchronize_all_modalities(self, data_dict: Dict[str, pd.DataFrame],
+                                   start: Optional[float] = None,
+                                   end: Optional[float] = None) -> Dict[str, pd.DataFrame]:
         """
         Synchronize all data modalities to common timeline.
         
+        With start/end only the samples of that window (plus WINDOW_PADDING_S on
+        each side for filter edges and interpolation) are filtered and resampled,
+        so the cost is proportional to the window, not the recording. Marker
+        columns (MARKER_MODALITIES) with a gap at a window edge also use their
+        nearest valid samples on either side of it, so the gap is interpolated
+        as in the whole recording. The kinetics and EMG DataFrames may cover the
+        whole trial or just the padded window (see padded_range and the loaders'
+        time_range argument); marker gaps are only bridged with samples that
+        are in the marker DataFrames.
+        
         Args:
             data_dict: Dictionary with 'kinetics', 'emg', 'kinematics' DataFrames
+            start: Window start in seconds (None: start of the data)
+            end: Window end in seconds (None: end of the shortest modality)
             
         Returns:
             Dictionary with synchronized DataFrames
@@ -145,24 +415,39 @@ class MultiModalSynchronizer:
         }
         common_duration = min(durations.values())
         
+        window_start = 0.0 if start is None else max(0.0, start)
+        window_end = common_duration if end is None else min(end, common_duration)
+        if window_end < window_start:
+            raise ValueError(f"Empty synchronization window: {window_start} to {window_end} s "
+                             f"(data ends at {common_duration} s)")
+        
         # Create master timeline
-        master_times = self.create_master_timeline(common_duration)
+        master_times = self.create_master_timeline(window_end - window_start, start=window_start)
         
         synchronized = {}
         
         # Process each modality
         for modality, df in data_dict.items():
-            # Trim to common duration
-            trimmed = df[df['time'] <= common_duration].copy()
+            # Trim to the window plus padding (and the samples bridging marker gaps)
+            trimmed = self._window_rows(df, window_start, window_end,
+                                        bridge_gaps=modality in MARKER_MODALITIES)
             
             if modality == 'kinetics':
-                # Kinetics is already at 1000 Hz, just resample to exact times
-                synchronized[modality] = self.resample_to_target_rate(trimmed, 'time', master_times)
+                # Kinetics is already at 1000 Hz: use it directly when its samples
+                # coincide with the master timeline, otherwise resample to exact times
+                aligned = self._aligned_view(trimmed, master_times)
+                if aligned is None:
+                    aligned = self.resample_to_target_rate(trimmed, 'time', master_times)
+                synchronized[modality] = aligned
             
             elif modality == 'emg':
-                # Downsample EMG from 2000 Hz
+                # Downsample EMG from 2000 Hz; skip the second interpolation
+                # when the downsampled grid already matches the master timeline
                 downsampled = self.downsample_emg(trimmed)
-                synchronized[modality] = self.resample_to_target_rate(downsampled, 'time', master_times)
+                aligned = self._aligned_view(downsampled, master_times)
+                if aligned is None:
+                    aligned = self.resample_to_target_rate(downsampled, 'time', master_times)
+                synchronized[modality] = aligned
             
             elif modality == 'kinematics':
                 # Upsample kinematics from 100 Hz
@@ -177,15 +462,21 @@ class MultiModalSynchronizer:
 def compute_emg_envelopes(emg_data: pd.DataFrame, 
                          channels: list = None,
                          window_ms: float = 50.0,
-                         sampling_rate: int = 1000) -> pd.DataFrame:
+                         sampling_rate: int = 1000,
+                         dtype=None,
+                         method: str = 'savgol') -> pd.DataFrame:
     """
     Compute EMG signal envelopes for visualization.
     
+    All channels are processed in one vectorized call (see emg_envelope).
+    
     Args:
         emg_data: EMG DataFrame
         channels: List of EMG channel columns (if None, auto-detect)
         window_ms: Smoothing window in milliseconds
         sampling_rate: Sampling rate in Hz
+        dtype: Envelope dtype (None keeps float32 channels as float32, else float64)
+        method: Envelope method, 'savgol', 'lowpass' or 'rms'
         
     Returns:
         DataFrame with EMG envelopes
@@ -194,20 +485,192 @@ def compute_emg_envelopes(emg_data: pd.DataFrame,
         # Auto-detect EMG channels (exclude time and non-numeric columns)
         channels = [col for col in emg_data.columns 
                    if col != 'time' and pd.api.types.is_numeric_dtype(emg_data[col])]
+    channels = [channel for channel in channels if channel in emg_data.columns]
+    
+    columns = {'time': emg_data['time'].to_numpy()}
+    if channels:
+        envelopes = emg_envelope(emg_data[channels].to_numpy(dtype=np.float64),
+                                 sampling_rate=sampling_rate, method=method,
+                                 window_ms=window_ms, dtype=np.float64)
+        for i, channel in enumerate(channels):
+            out_dtype = _output_dtype(emg_data[channel].dtype, dtype)
+            columns[f'{channel}_envelope'] = envelopes[:, i].astype(out_dtype, copy=False)
+    
+    return pd.DataFrame(columns, index=emg_data.index)
+
+class StreamingSynchronizer:
+    """
+    Synchronize multi-modal data incrementally from per-modality chunks.
     
-    envelopes = pd.DataFrame({'time': emg_data['time']})
+    Chunks (e.g. from GaitDataLoader.iter_chunks) are buffered per modality.
+    Once every modality extends WINDOW_PADDING_S past a point, the master
+    timeline up to that point is synchronized with MultiModalSynchronizer's
+    windowed path and emitted as a block. Blocks are processed overlap-save
+    style: each one is filtered and interpolated together with WINDOW_PADDING_S
+    of neighbouring raw data (kept in the buffers between blocks), so the
+    zero-phase EMG filter and the interpolation boundaries match the batch
+    path instead of restarting at every chunk edge.
+    
+    Marker columns (MARKER_MODALITIES) also carry their last two valid
+    samples between blocks, and a block only extends up to the last valid
+    sample of every marker seen so far. A marker gap therefore holds blocks
+    back until the marker reappears and is then interpolated across as in
+    the batch path, whatever the chunk size. Markers that have not had a
+    valid sample yet are NaN up to their first one (the batch path
+    extrapolates them backwards).
+    """
     
-    # Convert window to samples
-    window_samples = int(window_ms * sampling_rate / 1000)
+    def __init__(self, modalities=('kinetics', 'emg', 'kinematics'),
+                 target_rate: int = 1000, dtype=None, emg_method: str = 'filtfilt'):
+        """
+        Initialize streaming synchronizer.
+        
+        Args:
+            modalities: Modalities that will be pushed (a block is only emitted
+                        once all of them cover it)
+            target_rate: Target sampling rate in Hz
+            dtype: Output dtype for signal columns (see MultiModalSynchronizer)
+            emg_method: EMG downsampling method (see MultiModalSynchronizer); with
+                        'polyphase' the 'line' edge padding depends on each block's
+                        end points, so EMG matches the batch path only to ~1e-3
+        """
+        self.synchronizer = MultiModalSynchronizer(target_rate=target_rate, dtype=dtype,
+                                                   emg_method=emg_method)
+        self.target_rate = target_rate
+        self.modalities = list(modalities)
+        self.buffers = {modality: None for modality in self.modalities}
+        self.next_sample = 0  # Index of the next master timeline sample to emit
     
-    for channel in channels:
-        if channel in emg_data.columns:
-            # Rectify signal
-            rectified = np.abs(emg_data[channel])
+    def push(self, modality: str, chunk: pd.DataFrame) -> None:
+        """
+        Add a chunk of raw data for one modality.
+        
+        Args:
+            modality: One of self.modalities
+            chunk: DataFrame with 'time' column, continuing the previous chunk
+        """
+        if modality not in self.buffers:
+            raise KeyError(f"Unknown modality: {modality} (expected one of {self.modalities})")
+        if len(chunk) == 0:
+            return
+        
+        buffer = self.buffers[modality]
+        self.buffers[modality] = chunk if buffer is None else pd.concat([buffer, chunk])
+    
+    def _emit(self, end: float) -> Optional[Dict[str, pd.DataFrame]]:
+        """Synchronize master samples from next_sample up to end and drop consumed data."""
+        start = self.next_sample / float(self.target_rate)
+        last_sample = int(np.floor(end * self.target_rate + 1e-6))
+        if last_sample < self.next_sample:
+            return None
+        
+        block = self.synchronizer.synchronize_all_modalities(
+            self.buffers, start=start, end=last_sample / float(self.target_rate))
+        self.next_sample = last_sample + 1
+        
+        # Keep only the raw samples the next block still needs as padding
+        # (and the samples interpolation across marker gaps starts from)
+        keep_from = self.next_sample / float(self.target_rate) - WINDOW_PADDING_S
+        for modality, buffer in self.buffers.items():
+            first = int(np.searchsorted(buffer['time'].to_numpy(), keep_from, side='left'))
+            carried = self._carried_rows(buffer, first) if modality in MARKER_MODALITIES else []
+            if carried:
+                rows = np.concatenate([carried, np.arange(first, len(buffer))]).astype(np.intp)
+                self.buffers[modality] = buffer.iloc[rows]
+            else:
+                self.buffers[modality] = buffer.iloc[first:]
+        
+        return block
+    
+    @staticmethod
+    def _carried_rows(buffer: pd.DataFrame, first: int) -> list:
+        """Rows before first holding the last two valid samples of each signal column."""
+        carried = set()
+        for col in buffer.columns:
+            values = buffer[col].to_numpy()
+            if col == 'time' or values.dtype.kind != 'f':
+                continue
+            row = _find_valid(values, first - 1, -1)
+            if row is not None:
+                carried.add(row)
+                previous = _find_valid(values, row - 1, -1)
+                if previous is not None:
+                    carried.add(previous)
+        return sorted(carried)
+    
+    def _marker_ready_until(self) -> float:
+        """Time of the earliest last valid sample over the buffered marker columns."""
+        ready_until = np.inf
+        for modality, buffer in self.buffers.items():
+            if modality not in MARKER_MODALITIES:
+                continue
+            times = buffer['time'].to_numpy()
+            for col in buffer.columns:
+                values = buffer[col].to_numpy()
+                if col == 'time' or values.dtype.kind != 'f':
+                    continue
+                # Columns without any valid sample yet don't hold blocks back
+                row = _find_valid(values, len(values) - 1, -1)
+                if row is not None:
+                    ready_until = min(ready_until, times[row])
+        return ready_until
+    
+    def pop(self) -> Optional[Dict[str, pd.DataFrame]]:
+        """
+        Synchronize everything the buffered data fully determines.
+        
+        Returns:
+            Dictionary of synchronized DataFrames for the next block of the
+            master timeline, or None if no new samples are ready yet
+        """
+        if any(buffer is None for buffer in self.buffers.values()):
+            return None
+        
+        ready_until = min(buffer['time'].iloc[-1] for buffer in self.buffers.values()) - WINDOW_PADDING_S
+        # Samples inside a marker gap need the first valid sample after it
+        ready_until = min(ready_until, self._marker_ready_until())
+        return self._emit(ready_until)
+    
+    def finish(self) -> Optional[Dict[str, pd.DataFrame]]:
+        """
+        Synchronize the remaining buffered data after the last chunk.
+        
+        Returns:
+            Final block (up to the end of the shortest modality), or None if empty
+        """
+        if any(buffer is None for buffer in self.buffers.values()):
+            return None
+        
+        end = min(buffer['time'].iloc[-1] for buffer in self.buffers.values())
+        return self._emit(end)
+    
+    def synchronize_stream(self, streams: Dict[str, Iterable[pd.DataFrame]]) -> Iterator[Dict[str, pd.DataFrame]]:
+        """
+        Synchronize chunk streams, yielding blocks as soon as they are ready.
+        
+        Args:
+            streams: Chunk iterables keyed by modality, e.g.
+                     {'kinetics': loader.iter_kinetics("T5"), 'emg': loader.iter_emg("T5"), ...}
             
-            # Apply moving average filter
-            envelope = signal.savgol_filter(rectified, window_samples, 3)
+        Yields:
+            Dictionaries of synchronized DataFrames for consecutive blocks of the
+            master timeline (concatenated, they equal the batch synchronization)
+        """
+        iterators = {modality: iter(stream) for modality, stream in streams.items()}
+        
+        while iterators:
+            # One chunk from each unfinished stream per round keeps the buffers short
+            for modality in list(iterators):
+                chunk = next(iterators[modality], None)
+                if chunk is None:
+                    del iterators[modality]
+                else:
+                    self.push(modality, chunk)
             
-            envelopes[f'{channel}_envelope'] = envelope
-    
-    return envelopes
\ No newline at end of file
+            block = self.pop()
+            if block is not None:
+                yield block
+        
+        block = self.finish()
+        if block is not None:
+            yield block
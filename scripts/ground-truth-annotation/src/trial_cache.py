@@ -0,0 +1,216 @@
+"""
+On-disk binary cache for parsed trial data.
+Stores parsed CSV DataFrames as column-major .npy arrays that are memory-mapped on reload.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import pandas as pd
+import numpy as np
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+CACHE_FORMAT_VERSION = 1
+
+def temp_path(path: Path) -> Path:
+    """Temporary file next to path, unique per process and thread (for atomic os.replace)."""
+    return path.with_name(f'.{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+
+class TrialCache:
+    """Parse-once cache of trial DataFrames keyed by source file path, mtime and size."""
+
+    def __init__(self, cache_dir: Union[str, Path]):
+        """
+        Initialize cache in the given directory.
+
+        Args:
+            cache_dir: Directory holding cached arrays and metadata (created on first store)
+        """
+        self.cache_dir = Path(cache_dir)
+
+    @staticmethod
+    def fingerprint(source: Union[str, Path]) -> Dict:
+        """
+        Identify the current version of a source file.
+
+        Args:
+            source: Path to source CSV file
+
+        Returns:
+            Dictionary with resolved path, modification time (ns) and size (bytes)
+        """
+        source = Path(source).resolve()
+        stat = source.stat()
+        return {
+            'source': str(source),
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size
+        }
+
+    def _entry_dir(self, source: Union[str, Path], variant: str = '') -> Path:
+        """Get cache entry directory for a source file and load variant."""
+        source = Path(source).resolve()
+        key = hashlib.sha1(f'{source}|{variant}'.encode('utf-8')).hexdigest()[:16]
+        return self.cache_dir / f'{source.stem}_{key}'
+
+    def load(self, source: Union[str, Path], variant: str = '') -> Optional[pd.DataFrame]:
+        """
+        Load a cached DataFrame if it is still valid for the source file.
+
+        Args:
+            source: Path to source CSV file
+            variant: Extra key distinguishing different parses of the same file
+
+        Returns:
+            DataFrame backed by read-only memory-mapped arrays, or None on cache miss
+        """
+        entry_dir = self._entry_dir(source, variant)
+        meta_path = entry_dir / 'meta.json'
+
+        if not meta_path.exists():
+            return None
+
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # Invalidate when the source file changed since the cache was built
+        current = self.fingerprint(source)
+        if (meta.get('format_version') != CACHE_FORMAT_VERSION or
+                any(meta.get(key) != value for key, value in current.items())):
+            return None
+
+        # Memory-map one column-major array per dtype group
+        arrays = {}
+        try:
+            for group in meta['groups']:
+                values = np.load(entry_dir / group['file'], mmap_mode='r')
+                arrays[group['file']] = (values, group['columns'])
+        except (OSError, ValueError):
+            return None
+
+        # The entry directory's modification time orders entries for prune()
+        try:
+            os.utime(entry_dir)
+        except OSError:
+            pass
+
+        # Build the frame directly on the mapped arrays: concat or column
+        # reordering would copy the whole trial into RAM before pandas 3
+        if len(arrays) == 1:
+            values, columns = next(iter(arrays.values()))
+            if columns == meta['columns']:
+                return pd.DataFrame(values, columns=columns, copy=False)
+
+        column_views = {}
+        for values, columns in arrays.values():
+            for i, col in enumerate(columns):
+                column_views[col] = values[:, i]
+        return pd.DataFrame({col: column_views[col] for col in meta['columns']}, copy=False)
+
+    def store(self, source: Union[str, Path], df: pd.DataFrame, variant: str = '') -> bool:
+        """
+        Store a parsed DataFrame for the source file.
+
+        Args:
+            source: Path to source CSV file
+            df: Parsed DataFrame (all columns must be numeric)
+            variant: Extra key distinguishing different parses of the same file
+
+        Returns:
+            True if the DataFrame was cached, False if it cannot be cached
+        """
+        if not all(pd.api.types.is_numeric_dtype(dtype) for dtype in df.dtypes):
+            return False
+
+        entry_dir = self._entry_dir(source, variant)
+        entry_dir.mkdir(parents=True, exist_ok=True)
+
+        # Group columns by dtype so each group is one contiguous array
+        groups = {}
+        for col, dtype in df.dtypes.items():
+            groups.setdefault(np.dtype(dtype).name, []).append(col)
+
+        meta = self.fingerprint(source)
+        meta.update({
+            'format_version': CACHE_FORMAT_VERSION,
+            'variant': variant,
+            'columns': list(df.columns),
+            'n_rows': len(df),
+            'groups': []
+        })
+
+        for dtype_name, columns in groups.items():
+            filename = f'{dtype_name}.npy'
+            values = np.asfortranarray(df[columns].to_numpy(dtype=dtype_name))
+            # Concurrent stores of the same entry each write their own file
+            tmp_path = temp_path(entry_dir / filename)
+            with open(tmp_path, 'wb') as f:
+                np.save(f, values)
+            os.replace(tmp_path, entry_dir / filename)
+            meta['groups'].append({'file': filename, 'dtype': dtype_name, 'columns': columns})
+
+        # Metadata is written last so a partial entry is never treated as valid
+        tmp_meta = temp_path(entry_dir / 'meta.json')
+        with open(tmp_meta, 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_meta, entry_dir / 'meta.json')
+
+        return True
+
+    def prune(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None) -> int:
+        """
+        Remove the least recently used entries beyond a count or size limit.
+
+        Entries are ordered by the modification time of their directory, which
+        store and load update. The most recent entry and entries still being
+        written (no meta.json yet) are always kept.
+
+        Args:
+            max_entries: Number of entries to keep (None: no limit)
+            max_bytes: Total size of the entries to keep in bytes (None: no limit)
+
+        Returns:
+            Number of entries removed
+        """
+        if max_entries is None and max_bytes is None:
+            return 0
+
+        entries = []
+        try:
+            entry_dirs = list(self.cache_dir.iterdir())
+        except OSError:
+            return 0
+        for entry_dir in entry_dirs:
+            try:
+                if not (entry_dir / 'meta.json').is_file():
+                    continue
+                nbytes = sum(path.stat().st_size for path in entry_dir.iterdir())
+                entries.append((entry_dir.stat().st_mtime_ns, nbytes, entry_dir))
+            except OSError:
+                continue  # Removed by a concurrent prune or invalidate
+
+        kept, kept_bytes, removed = 0, 0, 0
+        for _, nbytes, entry_dir in sorted(entries, key=lambda entry: entry[0], reverse=True):
+            if kept > 0 and ((max_entries is not None and kept >= max_entries) or
+                             (max_bytes is not None and kept_bytes + nbytes > max_bytes)):
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                removed += 1
+                continue
+            kept += 1
+            kept_bytes += nbytes
+
+        return removed
+
+    def invalidate(self, source: Union[str, Path], variant: str = '') -> None:
+        """Remove the cache entry for a source file."""
+        shutil.rmtree(self._entry_dir(source, variant), ignore_errors=True)
+
+    def clear(self) -> None:
+        """Remove all cache entries."""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
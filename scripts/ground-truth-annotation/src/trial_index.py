@@ -0,0 +1,243 @@
+"""
+Trial discovery index for the multi-modal data directory.
+Scans kinetics/emg/kinematics CSV exports and records per-file row counts and
+durations (from line counts and known sampling rates) without parsing the data.
+"""
+
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from data_loader import HEADER_LINES, MODALITY_FILES, SAMPLING_RATES
+from trial_cache import temp_path
+
+INDEX_FORMAT_VERSION = 1
+
+# e.g. Sub1_Kinetics_T5.csv, Sub1_EMG_T12.csv
+TRIAL_FILE_PATTERN = re.compile(r'^Sub(?P<subject>\d+)_(?P<label>[A-Za-z]+)_(?P<trial>T\d+)\.csv$')
+
+def count_data_rows(filepath: Union[str, Path], block_size: int = 1 << 20) -> int:
+    """
+    Count data rows of a Vicon CSV export by counting line breaks.
+
+    Args:
+        filepath: Path to CSV file
+        block_size: Read block size in bytes
+
+    Returns:
+        Number of data rows (lines after the header, ignoring trailing blank lines)
+    """
+    n_lines = 0
+    tail = b''
+    with open(filepath, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            n_lines += block.count(b'\n')
+            tail = (tail + block)[-4096:]
+
+    # Last line without a terminating newline still counts
+    if tail and not tail.endswith(b'\n'):
+        n_lines += 1
+
+    # Blank lines at the end of the file are not data rows (read_csv skips them);
+    # the first newline after the last data row only terminates that row
+    trailing_newlines = tail[len(tail.rstrip(b'\r\n \t')):].count(b'\n')
+    if tail.endswith(b'\n'):
+        n_lines -= max(0, trailing_newlines - 1)
+    else:
+        n_lines -= trailing_newlines
+
+    return max(0, n_lines - HEADER_LINES)
+
+class TrialIndex:
+    """Persistent index of the trials available in a data directory (thread-safe)."""
+
+    def __init__(self, data_dir: str = "data", index_path: Optional[str] = None):
+        """
+        Initialize index for a data directory.
+
+        Args:
+            data_dir: Directory containing kinetics/emg/kinematics CSV folders
+            index_path: JSON file the index is persisted to
+                        (default: <data_dir>/.cache/trial_index.json)
+        """
+        self.data_dir = Path(data_dir)
+        self.index_path = Path(index_path) if index_path is not None else self.data_dir / ".cache" / "trial_index.json"
+        self.files = {}
+        # Serializes scans, so concurrent requests never write the index at the same time
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        """Load persisted index entries (ignored if missing or outdated)."""
+        try:
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if index.get('format_version') == INDEX_FORMAT_VERSION:
+            self.files = index.get('files', {})
+
+    def _save(self) -> None:
+        """Persist index entries atomically (caller holds the lock)."""
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        # Other processes may save the same index concurrently
+        tmp_path = temp_path(self.index_path)
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'format_version': INDEX_FORMAT_VERSION,
+                'data_dir': str(self.data_dir.resolve()),
+                'files': self.files
+            }, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def scan(self) -> Dict[str, Dict]:
+        """
+        Scan the data directory and update the index.
+
+        Files whose size and modification time are unchanged reuse their
+        previous entry, so only new or modified files are line-counted.
+        Concurrent scans run one at a time; self.files is replaced, not
+        modified, so readers always see a complete index.
+
+        Returns:
+            Dictionary of file entries keyed by path relative to data_dir
+        """
+        with self._lock:
+            return self._scan()
+
+    def _scan(self) -> Dict[str, Dict]:
+        """Scan the data directory and update the index (caller holds the lock)."""
+        labels = {label.lower(): modality for modality, (_, label, _) in MODALITY_FILES.items()}
+        files = {}
+
+        for modality, (subdir, _, _) in MODALITY_FILES.items():
+            modality_dir = self.data_dir / subdir
+            if not modality_dir.is_dir():
+                continue
+
+            for filepath in sorted(modality_dir.glob('Sub*_*_T*.csv')):
+                match = TRIAL_FILE_PATTERN.match(filepath.name)
+                if not match or labels.get(match.group('label').lower()) != modality:
+                    continue
+                key = f'{subdir}/{filepath.name}'
+                files[key] = self._file_entry(key, filepath, modality, match)
+
+        return self._update(files)
+
+    def _scan_trial(self, subject: str, trial_id: str) -> Dict[str, Dict]:
+        """Check only one trial's files and update their entries (caller holds the lock)."""
+        files = dict(self.files)
+
+        for modality, (subdir, label, _) in MODALITY_FILES.items():
+            filepath = self.data_dir / subdir / f'{subject}_{label}_{trial_id}.csv'
+            key = f'{subdir}/{filepath.name}'
+            match = TRIAL_FILE_PATTERN.match(filepath.name)
+            if match and filepath.is_file():
+                files[key] = self._file_entry(key, filepath, modality, match)
+            else:
+                files.pop(key, None)
+
+        return self._update(files)
+
+    def _file_entry(self, key: str, filepath: Path, modality: str, match: re.Match) -> Dict:
+        """
+        Index entry for one file.
+
+        The previous entry is reused if the file's size and modification time
+        are unchanged, so only new or modified files are line-counted.
+        """
+        stat = filepath.stat()
+        previous = self.files.get(key)
+        if (previous and previous['size'] == stat.st_size and
+                previous['mtime_ns'] == stat.st_mtime_ns):
+            return previous
+
+        rows = count_data_rows(filepath)
+        return {
+            'subject': f"Sub{match.group('subject')}",
+            'trial_id': match.group('trial'),
+            'modality': modality,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'rows': rows,
+            'sampling_rate': SAMPLING_RATES[modality],
+            'duration': max(0, rows - 1) / SAMPLING_RATES[modality]
+        }
+
+    def _update(self, files: Dict[str, Dict]) -> Dict[str, Dict]:
+        """Replace the index entries and persist them if they changed (caller holds the lock)."""
+        changed = files != self.files
+        self.files = files
+        if changed or not self.index_path.exists():
+            self._save()
+
+        return self.files
+
+    @staticmethod
+    def _group_trials(files: Dict[str, Dict], subject: Optional[str] = None,
+                      trial_id: Optional[str] = None) -> List[Dict]:
+        """Group file entries into trial dictionaries (see list_trials)."""
+        trials = {}
+        for entry in files.values():
+            if subject is not None and entry['subject'] != subject:
+                continue
+            if trial_id is not None and entry['trial_id'] != trial_id:
+                continue
+
+            trial = trials.setdefault((entry['subject'], entry['trial_id']), {
+                'subject': entry['subject'],
+                'trial_id': entry['trial_id'],
+                'modalities': {}
+            })
+            trial['modalities'][entry['modality']] = {
+                'rows': entry['rows'],
+                'duration': entry['duration'],
+                'size': entry['size'],
+                'sampling_rate': entry['sampling_rate']
+            }
+
+        for trial in trials.values():
+            trial['duration'] = min(info['duration'] for info in trial['modalities'].values())
+            trial['complete'] = set(trial['modalities']) == set(MODALITY_FILES)
+
+        return sorted(trials.values(),
+                      key=lambda t: (int(t['subject'][3:]), int(t['trial_id'][1:])))
+
+    def list_trials(self, subject: Optional[str] = None, rescan: bool = True) -> List[Dict]:
+        """
+        List trials with per-modality file information.
+
+        Args:
+            subject: Restrict to one subject (e.g., "Sub1")
+            rescan: Check the data directory for new/changed files first
+
+        Returns:
+            List of trial dictionaries sorted by subject and trial number, with keys:
+            subject, trial_id, duration (shortest modality), complete (all three
+            modalities present), modalities
+        """
+        files = self.scan() if rescan else self.files
+        return self._group_trials(files, subject)
+
+    def get_trial(self, trial_id: str, subject: str = "Sub1", rescan: bool = True) -> Optional[Dict]:
+        """
+        Get the index entry for one trial, or None if it is not available.
+
+        With rescan, only this trial's files are checked (one stat per
+        modality), not the whole data directory.
+        """
+        if rescan:
+            with self._lock:
+                files = self._scan_trial(subject, trial_id)
+        else:
+            files = self.files
+
+        trials = self._group_trials(files, subject, trial_id)
+        return trials[0] if trials else None
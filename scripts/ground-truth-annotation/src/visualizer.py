@@ -10,6 +10,8 @@ import pandas as pd
 from typing import Dict, List, Tuple, Optional
 import seaborn as sns
 
+from emg_envelope import emg_envelope
+
 # Set style for clean plots
 plt.style.use('default')
 sns.set_palette("husl")
@@ -363,13 +365,12 @@ def create_constrained_gait_plot(synchronized_data: Dict[str, pd.DataFrame],
         if len(emg_cols) >= 2:
             # Plot first 4 EMG channels with simple envelope
             emg_colors = ['blue', 'red', 'green', 'orange']
+            # Simple envelope: moving RMS over 100 samples, all channels at once
+            envelopes = emg_envelope(emg_filtered[emg_cols[:4]].to_numpy(dtype=np.float64),
+                                     sampling_rate=1000, method='rms', window_ms=100.0)
             for i, col in enumerate(emg_cols[:4]):
-                # Simple envelope: moving RMS over 100 samples
-                envelope = emg_filtered[col].rolling(window=100, center=True).apply(
-                    lambda x: np.sqrt(np.mean(x**2)), raw=True
-                )
                 color = emg_colors[i % len(emg_colors)]
-                axes[2].plot(emg_time, envelope, label=col, 
+                axes[2].plot(emg_time, envelopes[:, i], label=col, 
                            color=color, alpha=0.8, linewidth=1.5)
             
             axes[2].set_ylabel('EMG Amplitude (V)')
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that min/max pyramid queries match a brute-force
+min/max over the samples of every pixel.
+"""
+
+import sys
+sys.path.append('src')
+
+import numpy as np
+from minmax_pyramid import MinMaxPyramid
+
+SAMPLING_RATE = 1000
+
+def brute_force(values, first, stop, width, bucket_size):
+    """Min/max per pixel over the same samples the pyramid reduces (pixel edges snapped to buckets)."""
+    n = stop - first
+    edges = first + (np.arange(width + 1) * n) // width
+    starts = edges[:-1] // bucket_size * bucket_size
+    ends = np.append(starts[1:], -(-stop // bucket_size) * bucket_size)
+    mins = np.array([np.fmin.reduce(values[a:b], axis=0) for a, b in zip(starts, ends)])
+    maxs = np.array([np.fmax.reduce(values[a:b], axis=0) for a, b in zip(starts, ends)])
+    return mins, maxs
+
+def test_minmax_pyramid(duration=302.0, n_channels=6):
+    """Query random ranges and widths and compare with brute force."""
+    print(f"Testing min/max pyramid ({duration} s @ {SAMPLING_RATE} Hz, {n_channels} channels)...")
+
+    rng = np.random.default_rng(0)
+    n_samples = int(duration * SAMPLING_RATE) + 1
+    values = rng.normal(size=(n_samples, n_channels))
+    values[5000:5200, 1] = np.nan  # dropout
+    values[123456, 2] = 1e3        # single-sample spike
+
+    pyramid = MinMaxPyramid(values, sampling_rate=SAMPLING_RATE)
+    print(f"   {len(pyramid.levels)} levels, {pyramid.nbytes / 1e6:.1f} MB")
+
+    all_passed = True
+    queries = [(None, None, 1500), (123.0, 124.0, 300), (0.0, 20.0, 800), (4.9, 5.3, 50), (100.0, 100.2, 1000)]
+    queries += [tuple(sorted(rng.uniform(0, duration, 2))) + (int(rng.integers(1, 3000)),) for _ in range(20)]
+
+    for start, end, width in queries:
+        lod = pyramid.query(start, end, width)
+        first = 0 if start is None else int(np.ceil(start * SAMPLING_RATE - 1e-6))
+        stop = n_samples if end is None else int(np.floor(end * SAMPLING_RATE + 1e-6)) + 1
+
+        if stop - first <= width:
+            expected_min = expected_max = values[first:stop]
+        else:
+            expected_min, expected_max = brute_force(values, first, stop, width, lod['bucket_size'])
+
+        passed = (np.array_equal(lod['min'], expected_min, equal_nan=True) and
+                  np.array_equal(lod['max'], expected_max, equal_nan=True) and
+                  len(lod['time']) == len(expected_min))
+        all_passed &= passed
+        if not passed:
+            print(f"   ✗ [{start}, {end}] width {width}: level {lod['level']}")
+
+    # The spike must survive any zoom level that includes it
+    spike = pyramid.query(None, None, 100)['max'][:, 2].max()
+    all_passed &= spike == 1e3
+    print(f"   {'✓' if spike == 1e3 else '✗'} Spike preserved at 100 px: {spike}")
+
+    assert all_passed, "Pyramid queries differ from brute-force min/max"
+    print(f"\n✓ {len(queries)} pyramid queries match brute-force min/max")
+    return all_passed
+
+if __name__ == "__main__":
+    test_minmax_pyramid()
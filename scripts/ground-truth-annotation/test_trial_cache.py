@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that a trial cache hit returns memory-mapped data
+with the stored columns, values and dtypes, that chunked reads from the
+cache only bring one chunk into memory, that concurrent writes of the
+cache and trial index are safe, that looking up one trial only re-indexes
+that trial, and that pruning keeps the most recently used entries.
+"""
+
+import sys
+sys.path.append('src')
+
+import os
+import tempfile
+import threading
+import tracemalloc
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from data_loader import GaitDataLoader
+from trial_cache import TrialCache
+from trial_index import TrialIndex
+
+def is_memory_mapped(values):
+    """Whether an array is (a view of) a np.memmap rather than an in-memory copy."""
+    while values is not None:
+        if isinstance(values, np.memmap):
+            return True
+        values = values.base
+    return False
+
+def test_trial_cache_memory_maps(n_rows=50000):
+    """Store single- and mixed-dtype trials and check the cache hits are not copies."""
+    print(f"Testing trial cache memory mapping ({n_rows} rows)...")
+
+    rng = np.random.default_rng(0)
+    trials = {
+        'float64': pd.DataFrame({
+            'time': np.arange(n_rows) / 1000.0,
+            'Fz': rng.normal(size=n_rows),
+            'Fx': rng.normal(size=n_rows)
+        }),
+        # Interleaved dtypes: stored as one array per dtype, returned in source column order
+        'mixed': pd.DataFrame({
+            'Frame': np.arange(n_rows, dtype=np.int64),
+            'LCAL_X': rng.normal(size=n_rows).astype(np.float32),
+            'time': np.arange(n_rows) / 100.0,
+            'LCAL_Y': rng.normal(size=n_rows).astype(np.float32)
+        })
+    }
+
+    all_passed = True
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TrialCache(Path(tmp) / 'cache')
+        for name, df in trials.items():
+            source = Path(tmp) / f'{name}.csv'
+            source.write_text('placeholder source file\n')
+            assert cache.store(source, df), f"{name}: could not store"
+
+            cached = cache.load(source)
+            assert cached is not None, f"{name}: cache miss after store"
+
+            same = (list(cached.columns) == list(df.columns) and
+                    list(cached.dtypes) == list(df.dtypes) and
+                    cached.equals(df))
+            mapped = all(is_memory_mapped(cached[col].to_numpy()) for col in cached.columns)
+            chunk = cached.iloc[1000:2000]
+            chunk_mapped = all(is_memory_mapped(chunk[col].to_numpy()) for col in chunk.columns)
+
+            passed = same and mapped and chunk_mapped
+            all_passed &= passed
+            print(f"   {'✓' if passed else '✗'} {name}: same data {same}, "
+                  f"memory-mapped {mapped}, row slice memory-mapped {chunk_mapped}")
+
+    assert all_passed, "Trial cache hit is not a memory-mapped copy of the stored data"
+    print("\n✓ Trial cache hits are memory-mapped")
+    return all_passed
+
+def write_kinetics_csv(path, n_rows):
+    """Write a synthetic dual force plate export in the Vicon CSV layout."""
+    units = ','.join(['', ''] + ['N'] * 18)
+    header = ['Devices', '1000', ',,Force Plate 1,,,,,,,,,Force Plate 2', ',,Fx,Fy,Fz,Mx,My,Mz,Cx,Cy,Cz', units]
+    rng = np.random.default_rng(1)
+    values = np.column_stack([np.arange(1, n_rows + 1), np.zeros(n_rows, dtype=int)])
+    signals = rng.normal(size=(n_rows, 18))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        f.write('\n'.join(header) + '\n')
+        data = pd.DataFrame(np.column_stack([values, signals]))
+        data[[0, 1]] = data[[0, 1]].astype(int)
+        data.to_csv(f, header=False, index=False)
+
+def test_iter_chunks_from_cache(n_rows=100000, chunk_seconds=1.0):
+    """Stream a cached trial and check each chunk only reads its own rows."""
+    print(f"Testing chunked reads from the trial cache ({n_rows} rows)...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_kinetics_csv(Path(tmp) / 'kinetics' / 'Sub1_Kinetics_T1.csv', n_rows)
+        loader = GaitDataLoader(data_dir=tmp)
+        full = loader.load_kinetics("T1")  # parses the CSV and builds the cache
+        trial_bytes = full.memory_usage(index=False).sum()
+        del full
+
+        parsed = list(GaitDataLoader(data_dir=tmp, use_cache=False).iter_kinetics("T1", chunk_seconds))
+
+        cached, peaks = {}, {}
+        for name, columns in (('all columns', None), ('Fz_L, Fz_R', ['Fz_L', 'Fz_R'])):
+            tracemalloc.start()
+            chunks = loader.iter_kinetics("T1", chunk_seconds, columns=columns)
+            first = next(chunks)
+            peaks[name] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            cached[name] = [first] + list(chunks)
+
+    expected = {
+        'all columns': parsed,
+        'Fz_L, Fz_R': [chunk[['Fz_L', 'Fz_R', 'time']] for chunk in parsed]
+    }
+    passed = True
+    for name, chunks in cached.items():
+        bounded = peaks[name] < trial_bytes / 10
+        same = (len(chunks) == len(expected[name]) and
+                all(a.equals(b) for a, b in zip(chunks, expected[name])))
+        passed &= bounded and same
+        print(f"   {'✓' if bounded and same else '✗'} {name}: {len(chunks)} chunks match the CSV chunks "
+              f"{same}, first chunk peak allocation {peaks[name] / 1e6:.2f} MB "
+              f"(trial {trial_bytes / 1e6:.1f} MB)")
+
+    assert passed, "Chunked reads from the cache are not bounded to the chunk"
+    print("\n✓ Cached trials stream chunk by chunk")
+    return passed
+
+def run_concurrently(func, n_threads=8, repeats=20):
+    """Call func() from several threads released at once; returns the exceptions raised."""
+    barrier = threading.Barrier(n_threads)
+    errors = []
+
+    def worker():
+        barrier.wait()
+        for _ in range(repeats):
+            try:
+                func()
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+def test_concurrent_writes(n_rows=20000):
+    """Store the same cache entry and scan the same index from many threads at once."""
+    print("Testing concurrent cache stores and index scans...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / 'kinetics' / 'Sub1_Kinetics_T1.csv'
+        write_kinetics_csv(source, n_rows)
+        df = GaitDataLoader(data_dir=tmp, use_cache=False).load_kinetics("T1")
+
+        cache = TrialCache(Path(tmp) / 'cache')
+        store_errors = run_concurrently(lambda: cache.store(source, df))
+        stored = cache.load(source)
+        store_ok = not store_errors and stored is not None and stored.equals(df)
+
+        # One shared index (threads of a server) and one per thread (processes sharing the file)
+        index_path = Path(tmp) / 'cache' / 'trial_index.json'
+        shared = TrialIndex(tmp, index_path=str(index_path))
+
+        def scan_fresh():
+            index_path.unlink(missing_ok=True)
+            TrialIndex(tmp, index_path=str(index_path)).scan()
+
+        scan_errors = run_concurrently(shared.scan) + run_concurrently(scan_fresh)
+        trials = TrialIndex(tmp, index_path=str(index_path)).list_trials(rescan=False)
+        scan_ok = not scan_errors and [trial['trial_id'] for trial in trials] == ['T1']
+        leftovers = sorted(path.name for path in Path(tmp).rglob('*.tmp'))
+
+    passed = store_ok and scan_ok and not leftovers
+    print(f"   {'✓' if store_ok else '✗'} concurrent stores: {len(store_errors)} errors "
+          f"{[repr(e) for e in store_errors[:3]]}")
+    print(f"   {'✓' if scan_ok else '✗'} concurrent scans: {len(scan_errors)} errors "
+          f"{[repr(e) for e in scan_errors[:3]]}")
+    print(f"   {'✓' if not leftovers else '✗'} temporary files left: {leftovers}")
+
+    assert passed, "Concurrent cache or index writes failed"
+    print("\n✓ Cache and index writes are safe under concurrency")
+    return passed
+
+def test_get_trial_checks_one_trial(n_rows=2000):
+    """Look up single trials and check only their files are re-indexed."""
+    print("Testing single-trial lookups in the trial index...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        def write_trial(trial_id, rows):
+            write_kinetics_csv(Path(tmp) / 'kinetics' / f'Sub1_Kinetics_{trial_id}.csv', rows)
+
+        write_trial('T1', n_rows)
+        write_trial('T2', n_rows)
+        index = TrialIndex(tmp)
+        index.scan()
+
+        # T2 changes and T3 appears: a lookup of T1 must not touch them
+        write_trial('T2', 2 * n_rows)
+        write_trial('T3', n_rows)
+        t1 = index.get_trial('T1')
+        unchanged = (t1 is not None and t1['modalities']['kinetics']['rows'] == n_rows and
+                     index.files['kinetics/Sub1_Kinetics_T2.csv']['rows'] == n_rows and
+                     'kinetics/Sub1_Kinetics_T3.csv' not in index.files)
+
+        # Looking up the changed and new trials updates just their entries
+        t2, t3 = index.get_trial('T2'), index.get_trial('T3')
+        updated = (t2['modalities']['kinetics']['rows'] == 2 * n_rows and
+                   t3 is not None and t3['duration'] == (n_rows - 1) / 1000)
+
+        (Path(tmp) / 'kinetics' / 'Sub1_Kinetics_T3.csv').unlink()
+        removed = index.get_trial('T3') is None and index.get_trial('T9') is None
+        persisted = [trial['trial_id'] for trial in TrialIndex(tmp).list_trials(rescan=False)]
+        saved = persisted == ['T1', 'T2']
+
+    passed = unchanged and updated and removed and saved
+    print(f"   {'✓' if unchanged else '✗'} other trials untouched by a lookup")
+    print(f"   {'✓' if updated else '✗'} changed and new trials re-indexed on lookup")
+    print(f"   {'✓' if removed else '✗'} deleted and unknown trials not found")
+    print(f"   {'✓' if saved else '✗'} persisted trials: {persisted}")
+
+    assert passed, "Single-trial lookups did not re-index exactly that trial"
+    print("\n✓ Single-trial lookups only check that trial's files")
+    return passed
+
+def test_prune_least_recently_used(n_entries=6, n_rows=1000):
+    """Prune cache entries by count and size, keeping the most recently used."""
+    print(f"Testing trial cache pruning ({n_entries} entries)...")
+
+    df = pd.DataFrame({'time': np.arange(n_rows) / 1000.0, 'Fz': np.ones(n_rows)})
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / 'trial.csv'
+        source.write_text('placeholder source file\n')
+        cache = TrialCache(Path(tmp) / 'cache')
+        variants = [f'window{i}' for i in range(n_entries)]
+        for i, variant in enumerate(variants):
+            cache.store(source, df, variant=variant)
+            os.utime(cache._entry_dir(source, variant), ns=(i * 10 ** 9, i * 10 ** 9))
+        entry_bytes = sum(path.stat().st_size for path in cache._entry_dir(source, variants[0]).iterdir())
+
+        def cached():
+            return [variant for variant in variants if cache.load(source, variant=variant) is not None]
+
+        # Loading the oldest entry makes it the most recently used
+        cache.load(source, variant=variants[0])
+        removed_by_count = cache.prune(max_entries=4)
+        by_count = cached()
+
+        for seconds, variant in enumerate(['window3', 'window5', 'window0', 'window4']):
+            os.utime(cache._entry_dir(source, variant), ns=(seconds * 10 ** 9, seconds * 10 ** 9))
+        removed_by_size = cache.prune(max_bytes=int(2.5 * entry_bytes))
+        by_size = cached()
+        kept_newest = cache.prune(max_bytes=1) == 1 and len(cached()) == 1
+
+    count_ok = removed_by_count == 2 and by_count == ['window0', 'window3', 'window4', 'window5']
+    size_ok = removed_by_size == 2 and by_size == ['window0', 'window4']
+    passed = count_ok and size_ok and kept_newest
+    print(f"   {'✓' if count_ok else '✗'} max_entries=4 kept {by_count}")
+    print(f"   {'✓' if size_ok else '✗'} max_bytes of 2.5 entries kept {by_size}")
+    print(f"   {'✓' if kept_newest else '✗'} the most recent entry is kept even when it exceeds max_bytes")
+
+    assert passed, "Trial cache pruning did not keep the most recently used entries"
+    print("\n✓ Trial cache prunes least recently used entries")
+    return passed
+
+if __name__ == "__main__":
+    test_trial_cache_memory_maps()
+    test_iter_chunks_from_cache()
+    test_concurrent_writes()
+    test_get_trial_checks_one_trial()
+    test_prune_least_recently_used()
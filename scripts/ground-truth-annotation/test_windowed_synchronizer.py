@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test script to verify that synchronizing a time window matches the same rows
+of the whole-trial synchronization, including marker gaps at window edges.
+"""
+
+import sys
+sys.path.append('src')
+
+import numpy as np
+import pandas as pd
+from synchronizer import MultiModalSynchronizer
+
+# Maximum difference relative to each column's peak magnitude
+RELATIVE_TOLERANCE = 1e-9
+
+def make_trial(duration=8.0, seed=0):
+    """
+    Synthetic trial with marker dropouts.
+
+    LCAL_X has a 0.5 s gap (3.0 to 3.5 s), RTOE_Z is missing for the first
+    0.4 s and LCAL_Z from 7.5 s to the end.
+    """
+    rng = np.random.default_rng(seed)
+
+    def frame(rate, columns):
+        t = np.arange(int(round(duration * rate)) + 1) / rate
+        df = pd.DataFrame({'Frame': np.arange(1, len(t) + 1), 'Sub Frame': np.zeros(len(t), dtype=int)})
+        for i, col in enumerate(columns):
+            df[col] = np.sin(2 * np.pi * (0.7 + 0.3 * i) * t) * 100 + rng.normal(scale=5, size=len(t))
+        df['time'] = t
+        return df
+
+    kinematics = frame(100, ['LCAL_X', 'LCAL_Z', 'RTOE_Z'])
+    t = kinematics['time']
+    kinematics.loc[(t >= 3.0) & (t <= 3.5), 'LCAL_X'] = np.nan
+    kinematics.loc[t < 0.4, 'RTOE_Z'] = np.nan
+    kinematics.loc[t >= 7.5, 'LCAL_Z'] = np.nan
+
+    return {
+        'kinetics': frame(1000, ['Fz_L', 'Fz_R']),
+        'emg': frame(2000, ['LTA', 'RTA']),
+        'kinematics': kinematics
+    }
+
+def compare(actual, expected):
+    """Max relative difference between two synchronized DataFrames (inf if shapes or NaNs differ)."""
+    if actual.shape != expected.shape or list(actual.columns) != list(expected.columns):
+        return np.inf
+    a = actual.to_numpy(dtype=np.float64)
+    b = expected.to_numpy(dtype=np.float64)
+    if not np.array_equal(np.isnan(a), np.isnan(b)):
+        return np.inf
+    scale = np.maximum(np.nanmax(np.abs(b), axis=0), 1e-12)
+    with np.errstate(invalid='ignore'):
+        return float(np.nanmax(np.abs(a - b) / scale, initial=0.0))
+
+def test_windows_match_batch():
+    """Synchronize windows around the gaps and compare with the whole trial."""
+    print("Testing windowed synchronization against the whole trial...")
+
+    raw = make_trial()
+    synchronizer = MultiModalSynchronizer(target_rate=1000)
+    batch = synchronizer.synchronize_all_modalities(raw)
+
+    # Across, after and inside the LCAL_X gap, inside the leading RTOE_Z and trailing LCAL_Z gaps
+    windows = [(0.0, 3.2), (3.2, 6.0), (3.1, 3.3), (2.5, 4.0), (0.0, 0.2), (0.1, 1.0), (7.6, 8.0)]
+
+    all_passed = True
+    for start, end in windows:
+        # Whole trial, and kinetics/EMG loaded for the padded window only (as the pipeline does)
+        padded_start, padded_end = synchronizer.padded_range(start, end)
+        loaded = {modality: df if modality == 'kinematics' else
+                  df[(df['time'] >= padded_start) & (df['time'] <= padded_end)]
+                  for modality, df in raw.items()}
+
+        for source, data in (('whole', raw), ('padded', loaded)):
+            window = synchronizer.synchronize_all_modalities(data, start=start, end=end)
+            first = int(round(start * 1000))
+            for modality, expected in batch.items():
+                expected = expected.iloc[first:first + len(window[modality])].reset_index(drop=True)
+                max_rel = compare(window[modality], expected)
+                passed = (len(window[modality]) == int(round((end - start) * 1000)) + 1 and
+                          max_rel <= RELATIVE_TOLERANCE)
+                all_passed &= passed
+                if not passed or modality == 'kinematics':
+                    print(f"   {'✓' if passed else '✗'} {start}-{end} s {modality} ({source} input): "
+                          f"max relative difference {max_rel:.2e}")
+
+    assert all_passed, "Windowed synchronization differs from the whole trial"
+    print("\n✓ Windowed synchronization matches the whole trial")
+    return all_passed
+
+if __name__ == "__main__":
+    test_windows_match_batch()
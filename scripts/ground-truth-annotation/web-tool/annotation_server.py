@@ -6,162 +6,989 @@ Provides reliable browser-based annotation interface using Chart.js.
 
 import sys
 import os
+import gzip
+import hashlib
+import math
+import struct
+import threading
 from pathlib import Path
-from flask import Flask, render_template, jsonify, request, send_from_directory
+from typing import Optional
+from flask import (Blueprint, Flask, Response, current_app, render_template, jsonify,
+                   request, send_from_directory)
 import json
 import pandas as pd
 import numpy as np
-from datetime import datetime
+from datetime import datetime, timezone
+
+try:
+    import brotli
+except ImportError:  # Optional: responses are gzip-compressed only
+    brotli = None
 
 # Add src directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent / 'src'))
 
 from data_loader import GaitDataLoader
-from synchronizer import MultiModalSynchronizer, compute_emg_envelopes
-
-app = Flask(__name__, 
-            static_folder='static',
-            template_folder='static')
-
-# Global data storage
-loader = None
-synchronizer = None
-current_trial_data = None
-
-def init_data_loader():
-    """Initialize data loader and synchronizer."""
-    global loader, synchronizer
-    data_dir = Path(__file__).parent.parent / 'data'
-    loader = GaitDataLoader(str(data_dir))
-    synchronizer = MultiModalSynchronizer(target_rate=1000)
-    print(f"✓ Data loader initialized with directory: {data_dir}")
-
-@app.route('/')
+from jobs import JobManager
+from minmax_pyramid import MinMaxPyramid
+from pipeline import LRUCache, SingleFlight, TrialPipeline
+from synchronizer import WINDOW_PADDING_S, MultiModalSynchronizer
+
+bp = Blueprint('annotation', __name__)
+
+# Modalities shown in the annotation interface (heel/toe markers instead of full kinematics)
+ANNOTATION_MODALITIES = ('kinetics', 'emg', 'key_markers')
+
+# Known conditions of recorded trials; other trials are listed with neutral details
+TRIAL_DESCRIPTIONS = {
+    'T5': {
+        'name': 'Trial 5 (Constrained Gait)',
+        'description': 'Subject 1 with left leg locked in extension',
+        'constraint': 'Left leg extension lock'
+    }
+}
+
+# Default page length in seconds (consistent with demo) and the longest page served
+ANNOTATION_WINDOW_S = 20.0
+ANNOTATION_MAX_WINDOW_S = 60.0
+
+# Prepared trials kept in memory; least recently used trials are evicted beyond
+# either limit (override with GAIT_TRIAL_CACHE_ENTRIES / GAIT_TRIAL_CACHE_MB)
+TRIAL_CACHE_MAX_ENTRIES = int(os.environ.get('GAIT_TRIAL_CACHE_ENTRIES', 8))
+TRIAL_CACHE_MAX_BYTES = int(float(os.environ.get('GAIT_TRIAL_CACHE_MB', 512)) * 1024 * 1024)
+
+# Binary /api/data responses: little-endian uint32 header length, JSON header
+# (padded to 4 bytes), then the float32 channel arrays at the header's offsets
+BINARY_MIMETYPE = 'application/octet-stream'
+BINARY_FORMAT_VERSION = 1
+
+# Level-of-detail responses: default and maximum number of pixels per query
+LOD_DEFAULT_WIDTH = 1000
+LOD_MAX_WIDTH = 10000
+
+# Encoded (and compressed) data responses kept for repeated requests, keyed by
+# ETag (override the size with GAIT_RESPONSE_CACHE_MB)
+RESPONSE_CACHE_MAX_ENTRIES = 64
+RESPONSE_CACHE_MAX_BYTES = int(float(os.environ.get('GAIT_RESPONSE_CACHE_MB', 128)) * 1024 * 1024)
+
+# Compression settings (favour speed: responses are compressed on first request)
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Part of every ETag; bump when the response layout changes
+RESPONSE_VERSION = 1
+
+# Background trial preparation: worker threads (override with GAIT_PREPARE_WORKERS),
+# the stages they report, and the priorities of requested and prefetched trials
+PREPARE_WORKERS = int(os.environ.get('GAIT_PREPARE_WORKERS', 2))
+PREPARE_STAGES = ('parse', 'sync', 'envelopes')
+PREPARE_PRIORITY = 0
+PREFETCH_PRIORITY = 1
+
+# Seconds between keep-alive comments of job progress streams
+JOB_STREAM_KEEPALIVE_S = 15.0
+
+# Streamed pages (/api/stream): default seconds of full-resolution data per chunk
+STREAM_CHUNK_S = 2.0
+
+class AnnotationState:
+    """
+    Data loader, processing pipeline and caches of one application.
+    
+    Shared by all request threads of the server process: the caches are thread-safe and
+    each trial (and each response) is computed once even when several
+    annotators request it at the same time, while requests for other trials
+    and cached pages proceed in parallel.
+    """
+    
+    def __init__(self, data_dir: Path, output_dir: Path,
+                 trial_cache_entries: int = TRIAL_CACHE_MAX_ENTRIES,
+                 trial_cache_bytes: int = TRIAL_CACHE_MAX_BYTES,
+                 response_cache_bytes: int = RESPONSE_CACHE_MAX_BYTES,
+                 prepare_workers: int = PREPARE_WORKERS):
+        self.data_dir = Path(data_dir)
+        self.output_dir = Path(output_dir)
+        self.loader = GaitDataLoader(str(self.data_dir))
+        self.synchronizer = MultiModalSynchronizer(target_rate=1000)
+        # Prepared trials are held by trial_cache; the pipeline only needs to pass
+        # results between stages of one request
+        self.pipeline = TrialPipeline(self.loader, self.synchronizer, max_entries=3)
+        self.trial_cache = LRUCache(max_entries=trial_cache_entries, max_bytes=trial_cache_bytes)
+        self.response_cache = LRUCache(max_entries=RESPONSE_CACHE_MAX_ENTRIES, max_bytes=response_cache_bytes)
+        self.in_flight = SingleFlight()
+        # Trials prepared in the background (requested or prefetched)
+        self.jobs = JobManager(max_workers=prepare_workers, stages=PREPARE_STAGES)
+        print(f"✓ Data loader initialized with directory: {self.data_dir}")
+
+def create_app(data_dir: Optional[str] = None, output_dir: Optional[str] = None,
+               trial_cache_entries: int = TRIAL_CACHE_MAX_ENTRIES,
+               trial_cache_bytes: int = TRIAL_CACHE_MAX_BYTES,
+               response_cache_bytes: int = RESPONSE_CACHE_MAX_BYTES,
+               prepare_workers: int = PREPARE_WORKERS) -> Flask:
+    """
+    Create the annotation server application.
+    
+    Each application has its own loader, pipeline, caches and background jobs,
+    shared by its request threads and kept in memory only. Serve it from a
+    single process with many threads, so job polls, progress streams and pages
+    of prefetched trials reach the process holding them, e.g.:
+    
+        gunicorn --chdir web-tool --workers 1 --threads 16 --bind 0.0.0.0:5000 \\
+            'annotation_server:create_app()'
+    
+    Args:
+        data_dir: Data directory (default: GAIT_DATA_DIR or ../data)
+        output_dir: Annotation output directory (default: GAIT_OUTPUT_DIR or ../output)
+        trial_cache_entries: Maximum number of prepared trials kept in memory
+        trial_cache_bytes: Maximum size of the prepared trials kept in memory
+        response_cache_bytes: Maximum size of the encoded responses kept in memory
+        prepare_workers: Number of threads preparing trials in the background
+        
+    Returns:
+        Flask application
+    """
+    root = Path(__file__).parent.parent
+    data_dir = data_dir or os.environ.get('GAIT_DATA_DIR') or root / 'data'
+    output_dir = output_dir or os.environ.get('GAIT_OUTPUT_DIR') or root / 'output'
+    
+    app = Flask(__name__,
+                static_folder='static',
+                template_folder='static')
+    app.extensions['annotation'] = AnnotationState(data_dir, output_dir, trial_cache_entries,
+                                                   trial_cache_bytes, response_cache_bytes,
+                                                   prepare_workers)
+    app.register_blueprint(bp)
+    return app
+
+def get_state() -> AnnotationState:
+    """State of the application handling the current request."""
+    return current_app.extensions['annotation']
+
+@bp.route('/')
 def index():
     """Serve the main annotation interface."""
     return send_from_directory('static', 'annotation_tool.html')
 
-@app.route('/annotation.js')
+@bp.route('/annotation.js')
 def serve_js():
     """Serve the JavaScript file."""
     return send_from_directory('static', 'annotation.js')
 
-@app.route('/api/trials')
+@bp.route('/api/trials')
 def get_trials():
     """Get list of available trials."""
     try:
-        # For now, return T5 which we know works
-        trials = [
-            {
-                'id': 'T5',
-                'name': 'Trial 5 (Constrained Gait)',
-                'description': 'Subject 1 with left leg locked in extension',
-                'duration': '302 seconds',
-                'constraint': 'Left leg extension lock'
-            }
-        ]
+        # Trials come from the persisted index; only new or changed files are re-counted
+        trials = []
+        for trial in get_state().loader.get_trial_index().list_trials(subject='Sub1'):
+            if not trial['complete']:
+                continue
+            modalities = sorted(trial['modalities'])
+            trials.append(dict({
+                'id': trial['trial_id'],
+                'name': f"Trial {trial['trial_id'][1:]}",
+                'description': (f"{trial['subject']}, {trial['duration']:.0f} s of "
+                                f"{', '.join(modalities)}"),
+                'duration': f"{trial['duration']:.0f} seconds",
+                'duration_seconds': trial['duration'],
+                'modalities': modalities
+            }, **TRIAL_DESCRIPTIONS.get(trial['trial_id'], {})))
         return jsonify({'trials': trials})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/data/<trial_id>')
-def get_trial_data(trial_id):
-    """Load and return trial data for annotation."""
-    global current_trial_data
+def cached_trial(trial_id: str) -> Optional[dict]:
+    """Whole synchronized trial if it is in trial_cache (see prepare_trial), else None."""
+    state = get_state()
+    trial = state.trial_cache.get(state.pipeline.trial_key(trial_id, ANNOTATION_MODALITIES))
+    return None if trial is None else dict(trial, cached=True)
+
+def trial_duration(trial_id: str) -> float:
+    """
+    Duration of a trial's synchronized data, from the trial index (without loading it).
     
-    try:
-        print(f"Loading trial {trial_id}...")
+    Raises:
+        FileNotFoundError: If the trial is not in the data directory
+    """
+    state = get_state()
+    trial = state.loader.get_trial_index().get_trial(trial_id)
+    if trial is None:
+        raise FileNotFoundError(f"Trial not found: {trial_id}")
+    # Last sample of the master timeline over the shortest modality
+    rate = state.synchronizer.target_rate
+    return int(np.floor(trial['duration'] * rate + 1e-6)) / float(rate)
+
+def window_page(trial_id: str, start: float, end: float) -> dict:
+    """
+    Synchronize only one page of a trial (plus WINDOW_PADDING_S on each side).
+    
+    The padding keeps the envelope smoothing window away from the page
+    borders, so the page equals the same rows of the prepared trial.
+    
+    Returns:
+        Synchronized DataFrames incl. 'emg_envelopes' between start and end (inclusive)
+    """
+    state = get_state()
+    window = (max(0.0, start - WINDOW_PADDING_S), end + WINDOW_PADDING_S)
+    data = state.pipeline.synchronized(trial_id, ANNOTATION_MODALITIES, *window)
+    data['emg_envelopes'] = state.pipeline.envelopes(trial_id, ANNOTATION_MODALITIES, *window)
+    return slice_page(data, start, end, state.synchronizer.target_rate)
+
+def prepare_trial(trial_id: str, progress=None) -> dict:
+    """
+    Get a whole synchronized trial, from trial_cache if possible.
+    
+    The cache key covers the source file fingerprints and processing parameters,
+    so a re-exported CSV is never served from a stale entry. Pages are sliced
+    from the cached trial, so envelopes have no edge effects at page borders.
+    
+    Args:
+        trial_id: Trial identifier
+        progress: Optional function called as progress(stage, status) for the
+                  PREPARE_STAGES this call computes (see JobManager)
+    
+    Returns:
+        Dictionary with trial_id, duration, data (synchronized DataFrames incl.
+        'emg_envelopes') and cached (whether it was served from memory)
+    """
+    state = get_state()
+    key = state.pipeline.trial_key(trial_id, ANNOTATION_MODALITIES)
+    
+    trial = cached_trial(trial_id)
+    if trial is not None:
+        return trial
+    
+    def synchronize():
+        # The trial may have been prepared by a request that finished meanwhile
+        trial = state.trial_cache.get(key)
+        if trial is not None:
+            return trial
         
-        # Load raw data
-        kinetics_data = loader.load_kinetics(trial_id)
-        emg_data = loader.load_emg(trial_id)
-        kinematics_data = loader.load_kinematics(trial_id)
+        report = progress or (lambda stage, status: None)
+        pipeline = state.pipeline
         
-        print(f"✓ Raw data loaded")
+        report('parse', 'running')
+        pipeline.raw(trial_id, modalities=ANNOTATION_MODALITIES)
+        report('parse', 'done')
         
-        # Synchronize data
-        synchronized_data = synchronizer.synchronize_all_modalities({
-            'kinetics': kinetics_data,
-            'emg': emg_data,
-            'kinematics': kinematics_data
-        })
+        report('sync', 'running')
+        synchronized_data = pipeline.synchronized(trial_id, modalities=ANNOTATION_MODALITIES)
+        report('sync', 'done')
         
-        print(f"✓ Data synchronized at 1000Hz")
+        report('envelopes', 'running')
+        synchronized_data['emg_envelopes'] = pipeline.envelopes(trial_id, modalities=ANNOTATION_MODALITIES)
+        report('envelopes', 'done')
         
-        # Load key markers for annotation guidance
-        key_markers = loader.load_kinematics_key_markers(trial_id)
-        master_timeline = synchronizer.create_master_timeline(synchronized_data['kinetics']['time'].max())
-        synchronized_data['key_markers'] = synchronizer.upsample_kinematics(key_markers, master_timeline)
+        times = synchronized_data['kinetics']['time']
+        duration = float(times.iloc[-1]) if len(times) else 0.0
+        trial = {'trial_id': trial_id, 'duration': duration, 'data': synchronized_data}
+        state.trial_cache.put(key, trial)
+        return trial
+    
+    # Concurrent requests for the same trial wait for one synchronization
+    return dict(state.in_flight.do(key, synchronize), cached=False)
+
+def page_bounds(duration: float) -> tuple:
+    """
+    Page requested with the start/end query parameters.
+    
+    Args:
+        duration: Trial duration in seconds
         
-        # Compute EMG envelopes
-        emg_envelopes = compute_emg_envelopes(synchronized_data['emg'])
-        synchronized_data['emg_envelopes'] = emg_envelopes
+    Returns:
+        (start, end) in seconds; end defaults to start + ANNOTATION_WINDOW_S and
+        is clipped to the trial
         
-        print(f"✓ EMG envelopes computed")
-        print(f"  Available EMG envelope columns: {list(emg_envelopes.columns)}")
+    Raises:
+        ValueError: If the parameters are not finite numbers, the page is empty
+                    or longer than ANNOTATION_MAX_WINDOW_S
+    """
+    try:
+        start = float(request.args.get('start', 0.0))
+        end = float(request.args.get('end', start + ANNOTATION_WINDOW_S))
+    except ValueError:
+        raise ValueError("start and end must be numbers (seconds)")
+    # NaN would pass every comparison below
+    if not (math.isfinite(start) and math.isfinite(end)):
+        raise ValueError(f"start and end must be finite numbers (seconds), got {start} and {end}")
+    
+    end = min(end, duration)
+    if start < 0 or end <= start:
+        raise ValueError(f"Empty page: {start} to {end} s (trial duration {duration:.3f} s)")
+    if end - start > ANNOTATION_MAX_WINDOW_S + 1e-9:
+        raise ValueError(f"Page longer than {ANNOTATION_MAX_WINDOW_S} s: {start} to {end} s")
+    return start, end
+
+def slice_page(data: dict, start: float, end: float, sampling_rate: float) -> dict:
+    """Rows of every synchronized DataFrame between start and end (inclusive, zero-copy views)."""
+    times = data['kinetics']['time'].to_numpy()
+    half_sample = 0.5 / sampling_rate
+    first = int(np.searchsorted(times, start - half_sample))
+    stop = int(np.searchsorted(times, end + half_sample))
+    return {name: df.iloc[first:stop] for name, df in data.items()}
+
+def annotation_channels(data: dict) -> list:
+    """
+    Signals sent to the annotation interface.
+    
+    Args:
+        data: Synchronized DataFrames incl. 'emg_envelopes'
         
-        # Create 20-second window for annotation (consistent with demo)
-        time_window = 20.0
+    Returns:
+        List of (path, values) with path the location in the JSON response,
+        e.g. ('force_plates', 'left', 'fz')
+    """
+    kinetics = data['kinetics']
+    key_markers = data['key_markers']
+    emg_envelopes = data['emg_envelopes']
+    
+    channels = []
+    for side, suffix in (('left', 'L'), ('right', 'R')):
+        for component in ('fz', 'fx', 'fy'):
+            channels.append((('force_plates', side, component),
+                             kinetics[f'F{component[1]}_{suffix}'].to_numpy()))
+    
+    for marker in ('left_heel_z', 'left_toe_z', 'right_heel_z', 'right_toe_z'):
+        channels.append((('key_markers', marker), key_markers[marker].to_numpy()))
+    
+    for col in list(emg_envelopes.columns)[1:9]:  # First 8 EMG channels (skip time column)
+        if col != 'time':
+            channels.append((('emg_envelopes', col.replace('_envelope', '')),
+                             emg_envelopes[col].to_numpy()))
+    
+    return channels
+
+def nest_channels(response: dict, channels: list) -> dict:
+    """Place (path, value) pairs into a JSON response, e.g. response['force_plates']['left']['fz']."""
+    for path, value in channels:
+        node = response
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = value
+    return response
+
+def select_channels(channels: list, selection: str) -> list:
+    """
+    Filter channels by a comma-separated list of dotted paths or path prefixes.
+    
+    For example "force_plates.left.fz,emg_envelopes" keeps the left vertical
+    force and all EMG envelopes.
+    
+    Raises:
+        ValueError: If a name matches no channel
+    """
+    names = [name.strip() for name in selection.split(',') if name.strip()]
+    selected = []
+    for name in names:
+        matches = [(path, values) for path, values in channels
+                   if '.'.join(path) == name or '.'.join(path).startswith(name + '.')]
+        if not matches:
+            raise ValueError(f"Unknown channel: {name}")
+        selected.extend(match for match in matches if match not in selected)
+    return selected
+
+def encode_binary(header: dict, channels: list) -> bytes:
+    """
+    Pack channels as float32 arrays behind a JSON header (see BINARY_MIMETYPE).
+    
+    Args:
+        header: Trial metadata; channel paths, byte offsets and lengths are added
+        channels: List of (path, values) as returned by annotation_channels
         
-        # Filter data to time window
-        time_mask = synchronized_data['kinetics']['time'] <= time_window
+    Returns:
+        Response body
+    """
+    arrays = []
+    specs = []
+    offset = 0
+    for path, values in channels:
+        array = np.ascontiguousarray(values, dtype='<f4')
+        specs.append({'path': list(path), 'offset': offset, 'length': len(array)})
+        arrays.append(array)
+        offset += array.nbytes
+    
+    header = dict(header, format_version=BINARY_FORMAT_VERSION, dtype='float32',
+                  byte_order='little', channels=specs)
+    header_bytes = json.dumps(header).encode('utf-8')
+    # Pad so the float32 data starts on a 4-byte boundary (typed array views need it)
+    header_bytes += b' ' * (-(4 + len(header_bytes)) % 4)
+    
+    return b''.join([struct.pack('<I', len(header_bytes)), header_bytes] +
+                    [array.tobytes() for array in arrays])
+
+def requested_format() -> str:
+    """Response format from ?format= or, failing that, the Accept header ('json' or 'binary')."""
+    response_format = request.args.get('format')
+    if response_format is not None:
+        return response_format
+    best = request.accept_mimetypes.best_match(['application/json', BINARY_MIMETYPE],
+                                               default='application/json')
+    return 'binary' if best == BINARY_MIMETYPE else 'json'
+
+def response_encoding():
+    """Content coding accepted by the client: 'br' (if brotli is installed), 'gzip' or None."""
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return request.accept_encodings.best_match(offered)
+
+def compress(body: bytes, encoding) -> bytes:
+    """Compress a response body with the given content coding (None: unchanged)."""
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
+
+def trial_validators(trial_id: str, endpoint: str, response_format: str, encoding) -> tuple:
+    """
+    ETag and Last-Modified of a response derived from a trial.
+    
+    The ETag covers the trial key (source file fingerprints + processing
+    parameters), the endpoint, its query parameters, the response format and
+    content coding; computing it only needs the source files' stat().
+    
+    Returns:
+        (etag, last_modified) with last_modified the newest source file mtime (UTC)
+    """
+    pipeline = get_state().pipeline
+    payload = json.dumps([
+        RESPONSE_VERSION,
+        endpoint,
+        pipeline.trial_key(trial_id, ANNOTATION_MODALITIES),
+        sorted(request.args.items(multi=True)),
+        response_format,
+        encoding
+    ])
+    etag = hashlib.sha1(payload.encode('utf-8')).hexdigest()
+    
+    fingerprints = pipeline.source_fingerprints(trial_id, ANNOTATION_MODALITIES)
+    mtime = max(fingerprint['mtime_ns'] for fingerprint in fingerprints.values()) / 1e9
+    return etag, datetime.fromtimestamp(int(mtime), tz=timezone.utc)
+
+def conditional_response(etag: str, last_modified: datetime, encoding, build) -> Response:
+    """
+    Serve a data response with validators: 304 if the client's copy is current,
+    else the encoded body from response_cache or build().
+    
+    Args:
+        etag: Response ETag (see trial_validators)
+        last_modified: Response Last-Modified
+        encoding: Content coding ('br', 'gzip' or None)
+        build: Function returning (body bytes, mimetype); only called on a cache miss
         
-        annotation_data = {
-            'trial_id': trial_id,
-            'time_window': time_window,
-            'sampling_rate': 1000,
-            'timestamps': synchronized_data['kinetics']['time'][time_mask].tolist(),
-            'force_plates': {
-                'left': {
-                    'fz': synchronized_data['kinetics']['Fz_L'][time_mask].tolist(),
-                    'fx': synchronized_data['kinetics']['Fx_L'][time_mask].tolist(),
-                    'fy': synchronized_data['kinetics']['Fy_L'][time_mask].tolist()
-                },
-                'right': {
-                    'fz': synchronized_data['kinetics']['Fz_R'][time_mask].tolist(),
-                    'fx': synchronized_data['kinetics']['Fx_R'][time_mask].tolist(),
-                    'fy': synchronized_data['kinetics']['Fy_R'][time_mask].tolist()
-                }
-            },
-            'key_markers': {
-                'left_heel_z': synchronized_data['key_markers']['left_heel_z'][time_mask].tolist(),
-                'left_toe_z': synchronized_data['key_markers']['left_toe_z'][time_mask].tolist(),
-                'right_heel_z': synchronized_data['key_markers']['right_heel_z'][time_mask].tolist(),
-                'right_toe_z': synchronized_data['key_markers']['right_toe_z'][time_mask].tolist()
-            },
-            'emg_envelopes': {
-                col.replace('_envelope', ''): synchronized_data['emg_envelopes'][col][time_mask].tolist()
-                for col in list(emg_envelopes.columns)[1:9]  # First 8 EMG channels (skip time column)
-                if col != 'time'
-            }
-        }
+    Returns:
+        Response
+    """
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains(etag)
+    else:
+        not_modified = request.if_modified_since is not None and last_modified <= request.if_modified_since
+    
+    if not_modified:
+        response = Response(status=304)
+    else:
+        state = get_state()
         
-        # Store for later use
-        current_trial_data = synchronized_data
+        def encode():
+            cached = state.response_cache.get(etag)
+            if cached is None:
+                body, mimetype = build()
+                cached = (compress(body, encoding), mimetype)
+                state.response_cache.put(etag, cached, nbytes=len(cached[0]))
+            return cached
         
-        print(f"✓ Trial {trial_id} prepared for annotation")
-        print(f"  - Time window: 0 to {time_window}s")
-        print(f"  - Data points: {len(annotation_data['timestamps'])}")
-        print(f"  - Force plates: Left & Right (Fx, Fy, Fz)")
-        print(f"  - Key markers: 4 heel/toe positions")
-        print(f"  - EMG channels: 8 envelope signals")
+        cached = state.response_cache.get(etag)
+        if cached is None:
+            cached = state.in_flight.do(('response', etag), encode)
+        body, mimetype = cached
+        response = Response(body, mimetype=mimetype)
+        if encoding is not None:
+            response.content_encoding = encoding
+    
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    # Clients may keep responses but must revalidate (source files can change)
+    response.cache_control.no_cache = True
+    response.vary.update(['Accept', 'Accept-Encoding'])
+    return response
+
+def build_trial_page(trial_id: str, response_format: str) -> tuple:
+    """
+    Encode the requested page of a trial.
+    
+    Returns:
+        (body, mimetype)
         
-        return jsonify(annotation_data)
+    Raises:
+        ValueError: If the page or channel selection is invalid
+    """
+    print(f"Loading trial {trial_id}...")
+    
+    sampling_rate = get_state().synchronizer.target_rate
+    trial = cached_trial(trial_id)
+    if trial is not None:
+        print(f"✓ Trial served from memory cache")
+        duration = trial['duration']
+        start, end = page_bounds(duration)
+        page = slice_page(trial['data'], start, end, sampling_rate)
+    else:
+        # Opening a trial costs one page: the whole trial is prepared in the
+        # background for the pages and overviews that follow
+        duration = trial_duration(trial_id)
+        start, end = page_bounds(duration)
+        submit_preparation(trial_id)
+        page = window_page(trial_id, start, end)
+        print(f"✓ Page synchronized at 1000Hz (whole trial queued for preparation)")
+        print(f"  Available EMG envelope columns: {list(page['emg_envelopes'].columns)}")
+    
+    channels = annotation_channels(page)
+    if request.args.get('channels'):
+        channels = select_channels(channels, request.args['channels'])
+    
+    timestamps = page['kinetics']['time']
+    
+    print(f"✓ Trial {trial_id} prepared for annotation")
+    print(f"  - Page: {start} to {end}s of {duration:.1f}s")
+    print(f"  - Data points: {len(timestamps)}")
+    print(f"  - Channels: {len(channels)}")
+    
+    metadata = {
+        'trial_id': trial_id,
+        'time_window': end - start,
+        'start': start,
+        'end': end,
+        'duration': duration,
+        'sampling_rate': 1000
+    }
+    
+    if response_format == 'binary':
+        # Timestamps are implied: sample i is at (first_sample + i) / sampling_rate
+        start_time = float(timestamps.iloc[0]) if len(timestamps) else start
+        header = dict(metadata,
+                      start_time=start_time,
+                      first_sample=int(round(start_time * sampling_rate)),
+                      n_samples=len(timestamps))
+        return encode_binary(header, channels), BINARY_MIMETYPE
+    
+    annotation_data = dict(metadata, timestamps=timestamps.tolist())
+    nest_channels(annotation_data, [(path, values.tolist()) for path, values in channels])
+    return current_app.json.dumps(annotation_data, separators=(',', ':')).encode('utf-8'), 'application/json'
+
+@bp.route('/api/data/<trial_id>')
+def get_trial_data(trial_id):
+    """
+    Load and return a page of trial data for annotation.
+    
+    Query parameters: start and end in seconds (default: the first
+    ANNOTATION_WINDOW_S seconds), channels (comma-separated paths such as
+    force_plates.left.fz or emg_envelopes; default: all) and format
+    ('json' or float32 'binary'). Responses are compressed when the client
+    accepts it and carry ETag/Last-Modified, so unchanged pages are 304s.
+    """
+    response_format = requested_format()
+    if response_format not in ('json', 'binary'):
+        return jsonify({'error': f"Unknown format: {response_format} (expected 'json' or 'binary')"}), 400
+    
+    try:
+        encoding = response_encoding()
+        etag, last_modified = trial_validators(trial_id, 'data', response_format, encoding)
+        return conditional_response(etag, last_modified, encoding,
+                                    lambda: build_trial_page(trial_id, response_format))
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"❌ Error loading trial {trial_id}: {str(e)}")
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/annotations/<trial_id>', methods=['POST'])
+def channel_pyramid(data: dict, channels: list, sampling_rate: float) -> MinMaxPyramid:
+    """Min/max pyramid with one column per channel of annotation_channels(data)."""
+    # float32 is plenty for plotting and halves the pyramid
+    stacked = np.empty((len(data['kinetics']), len(channels)), dtype=np.float32)
+    for i, (_, values) in enumerate(channels):
+        stacked[:, i] = values
+    
+    start_time = float(data['kinetics']['time'].iloc[0]) if len(stacked) else 0.0
+    return MinMaxPyramid(stacked, sampling_rate=sampling_rate, start_time=start_time)
+
+def trial_pyramid(trial_id: str) -> dict:
+    """
+    Get the min/max pyramid of a whole synchronized trial, from trial_cache if possible.
+    
+    Returns:
+        Dictionary with paths (channel paths as in annotation_channels) and
+        pyramid (MinMaxPyramid with one column per path)
+    """
+    state = get_state()
+    key = ('lod', state.pipeline.trial_key(trial_id, ANNOTATION_MODALITIES))
+    entry = state.trial_cache.get(key)
+    if entry is not None:
+        return entry
+    
+    def build():
+        entry = state.trial_cache.get(key)
+        if entry is not None:
+            return entry
+        
+        data = prepare_trial(trial_id)['data']
+        channels = annotation_channels(data)
+        pyramid = channel_pyramid(data, channels, state.synchronizer.target_rate)
+        entry = {'paths': [path for path, _ in channels], 'pyramid': pyramid}
+        state.trial_cache.put(key, entry, nbytes=pyramid.nbytes)
+        return entry
+    
+    return state.in_flight.do(key, build)
+
+def build_level_of_detail(trial_id: str, start, end, width: int) -> tuple:
+    """
+    Encode the min/max per pixel of every annotation channel for a time range.
+    
+    Returns:
+        (body, mimetype)
+        
+    Raises:
+        ValueError: If the range is invalid
+    """
+    entry = trial_pyramid(trial_id)
+    pyramid = entry['pyramid']
+    lod = pyramid.query(start, end, width)
+    
+    response = {
+        'trial_id': trial_id,
+        'duration': pyramid.duration,
+        'sampling_rate': pyramid.sampling_rate,
+        'width': width,
+        'level': lod['level'],
+        'bucket_size': lod['bucket_size'],
+        'timestamps': lod['time'].tolist()
+    }
+    nest_channels(response, [
+        (path, {'min': lod['min'][:, i].tolist(), 'max': lod['max'][:, i].tolist()})
+        for i, path in enumerate(entry['paths'])
+    ])
+    return current_app.json.dumps(response, separators=(',', ':')).encode('utf-8'), 'application/json'
+
+@bp.route('/api/lod/<trial_id>')
+def get_level_of_detail(trial_id):
+    """
+    Min/max of every annotation channel per pixel over any time range of the whole trial.
+    
+    Query parameters: start and end in seconds (default: whole trial) and width
+    in pixels. Each channel is returned as {'min': [...], 'max': [...]} at the
+    same location as in /api/data; timestamps are the start times of the pixels.
+    """
+    start = request.args.get('start', type=float)
+    end = request.args.get('end', type=float)
+    width = request.args.get('width', default=LOD_DEFAULT_WIDTH, type=int)
+    if not 1 <= width <= LOD_MAX_WIDTH:
+        return jsonify({'error': f"width must be between 1 and {LOD_MAX_WIDTH}"}), 400
+    
+    try:
+        encoding = response_encoding()
+        etag, last_modified = trial_validators(trial_id, 'lod', 'json', encoding)
+        return conditional_response(etag, last_modified, encoding,
+                                    lambda: build_level_of_detail(trial_id, start, end, width))
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"❌ Error computing level of detail for {trial_id}: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+def sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+def submit_preparation(trial_id: str, priority: int = PREPARE_PRIORITY) -> dict:
+    """
+    Prepare a trial in the background (see prepare_trial).
+    
+    Jobs are keyed by trial, so submitting a trial that is already queued or
+    being prepared returns the existing job.
+    
+    Returns:
+        Job snapshot (see JobManager)
+    """
+    state = get_state()
+    app = current_app._get_current_object()
+    
+    def run(report):
+        # Worker threads have no request; the application context gives them its state
+        with app.app_context():
+            trial = prepare_trial(trial_id, progress=report)
+        return {'trial_id': trial_id, 'duration': trial['duration'], 'cached': trial['cached']}
+    
+    return state.jobs.submit(f'prepare/{trial_id}', run, priority=priority)
+
+def next_trial(trial_id: str) -> Optional[str]:
+    """Trial after trial_id in the trial list (None if it is the last or unknown)."""
+    trial_ids = [trial['trial_id']
+                 for trial in get_state().loader.get_trial_index().list_trials(subject='Sub1')
+                 if trial['complete']]
+    if trial_id in trial_ids and trial_ids.index(trial_id) + 1 < len(trial_ids):
+        return trial_ids[trial_ids.index(trial_id) + 1]
+    return None
+
+def job_response(job: dict) -> dict:
+    """Job snapshot with its result once it is done."""
+    return dict(job, result=get_state().jobs.result(job['job_id']))
+
+@bp.route('/api/jobs/prepare/<trial_id>', methods=['POST'])
+def submit_prepare_job(trial_id):
+    """
+    Start preparing a trial in the background.
+    
+    Returns 202 with the job (poll /api/jobs/<job_id> or stream
+    /api/jobs/<job_id>/events). Unless ?prefetch=0, the next trial in the list
+    is queued behind it at a lower priority, so it is ready when the annotator
+    moves on.
+    """
+    try:
+        job = submit_preparation(trial_id)
+        prefetch = None
+        if request.args.get('prefetch', '1') != '0':
+            following = next_trial(trial_id)
+            if following is not None:
+                prefetch = submit_preparation(following, priority=PREFETCH_PRIORITY)
+        
+        response = jsonify({'job': job_response(job), 'prefetch': prefetch})
+        response.status_code = 202
+        response.headers['Location'] = f"/api/jobs/{job['job_id']}"
+        return response
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/jobs')
+def list_jobs():
+    """Get all known background jobs (oldest first) and job counts."""
+    state = get_state()
+    return jsonify({'jobs': state.jobs.list_jobs(), 'stats': state.jobs.stats()})
+
+@bp.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    """Get the status, per-stage progress and (once done) the result of a job."""
+    job = get_state().jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': f"Unknown job: {job_id}"}), 404
+    return jsonify(job_response(job))
+
+@bp.route('/api/jobs/<job_id>/events')
+def stream_job(job_id):
+    """
+    Stream job progress as Server-Sent Events.
+    
+    Sends a 'progress' event with the job snapshot on every change and ends
+    with a 'done' or 'failed' event carrying the result or error.
+    """
+    state = get_state()
+    if state.jobs.get(job_id) is None:
+        return jsonify({'error': f"Unknown job: {job_id}"}), 404
+    
+    def events():
+        version = -1
+        while True:
+            job = state.jobs.wait(job_id, version, timeout=JOB_STREAM_KEEPALIVE_S)
+            if job is None:
+                return
+            if job['version'] == version:
+                yield ': keep-alive\n\n'
+                continue
+            version = job['version']
+            
+            finished = job['status'] in ('done', 'failed')
+            if finished:
+                job = dict(job, result=state.jobs.result(job_id))
+            yield sse_event(job['status'] if finished else 'progress', job)
+            if finished:
+                return
+    
+    response = Response(events(), mimetype='text/event-stream')
+    response.cache_control.no_cache = True
+    response.headers['X-Accel-Buffering'] = 'no'  # Don't let a proxy buffer the stream
+    return response
+
+@bp.route('/api/stream/<trial_id>')
+def stream_trial_data(trial_id):
+    """
+    Stream a page of trial data as Server-Sent Events, coarse to fine.
+    
+    Takes the start, end and channels parameters of /api/data, plus width
+    (pixels of the overview) and chunk (seconds per chunk). Events:
+    - progress (only for a trial that is not prepared yet): the background
+      preparation job, sent before any data is loaded; the page is then
+      synchronized on its own (see window_page), and an unknown channel is
+      reported as 'failed' instead of a 400
+    - overview: min/max per pixel of the page from the trial's pyramid (or
+      the page's own for a trial that is not prepared yet), so the charts
+      can be drawn before any full-resolution data is sent
+    - chunk (repeated, in time order): full-resolution samples; sample i is
+      at (first_sample + i) / sampling_rate
+    - end: number of chunks and samples sent
+    Channels are lists of {'path', ...} with path as in annotation_channels.
+    """
+    width = request.args.get('width', default=LOD_DEFAULT_WIDTH, type=int)
+    chunk_seconds = request.args.get('chunk', default=STREAM_CHUNK_S, type=float)
+    if not 1 <= width <= LOD_MAX_WIDTH:
+        return jsonify({'error': f"width must be between 1 and {LOD_MAX_WIDTH}"}), 400
+    if not 0 < chunk_seconds <= ANNOTATION_MAX_WINDOW_S:
+        return jsonify({'error': f"chunk must be between 0 and {ANNOTATION_MAX_WINDOW_S} seconds"}), 400
+    
+    app = current_app._get_current_object()
+    sampling_rate = get_state().synchronizer.target_rate
+    selection = request.args.get('channels')
+    try:
+        trial = cached_trial(trial_id)
+        if trial is not None:
+            duration = trial['duration']
+            start, end = page_bounds(duration)
+            page = slice_page(trial['data'], start, end, sampling_rate)
+            channels = annotation_channels(page)
+            if selection:
+                channels = select_channels(channels, selection)
+            entry = trial_pyramid(trial_id)
+            job = None
+        else:
+            # Don't wait for the whole trial: it is prepared in the background
+            # while the events below synchronize just this page
+            duration = trial_duration(trial_id)
+            start, end = page_bounds(duration)
+            job = submit_preparation(trial_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"❌ Error streaming trial {trial_id}: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+    
+    metadata = {
+        'trial_id': trial_id,
+        'time_window': end - start,
+        'start': start,
+        'end': end,
+        'duration': duration,
+        'sampling_rate': sampling_rate
+    }
+    chunk_samples = max(1, int(round(chunk_seconds * sampling_rate)))
+    
+    def events():
+        # Runs after the request has returned: only use the values captured above
+        # (and the application context, to synchronize a page of an unprepared trial)
+        try:
+            if job is None:
+                page_data, page_channels, pyramid = page, channels, entry['pyramid']
+                columns = [entry['paths'].index(path) for path, _ in channels]
+            else:
+                yield sse_event('progress', job)
+                with app.app_context():
+                    page_data = window_page(trial_id, start, end)
+                page_channels = annotation_channels(page_data)
+                if selection:
+                    page_channels = select_channels(page_channels, selection)
+                pyramid = channel_pyramid(page_data, page_channels, sampling_rate)
+                columns = list(range(len(page_channels)))
+            
+            lod = pyramid.query(start, end, width)
+            yield sse_event('overview', dict(
+                metadata,
+                width=width,
+                level=lod['level'],
+                bucket_size=lod['bucket_size'],
+                timestamps=lod['time'].tolist(),
+                channels=[{'path': list(path), 'min': lod['min'][:, column].tolist(),
+                           'max': lod['max'][:, column].tolist()}
+                          for (path, _), column in zip(page_channels, columns)]
+            ))
+            
+            timestamps = page_data['kinetics']['time'].to_numpy()
+            first_sample = int(round(timestamps[0] * sampling_rate)) if len(timestamps) else 0
+            n_chunks = 0
+            for offset in range(0, len(timestamps), chunk_samples):
+                yield sse_event('chunk', {
+                    'first_sample': first_sample + offset,
+                    'sampling_rate': sampling_rate,
+                    'n_samples': len(timestamps[offset:offset + chunk_samples]),
+                    'channels': [{'path': list(path), 'values': values[offset:offset + chunk_samples].tolist()}
+                                 for path, values in page_channels]
+                })
+                n_chunks += 1
+            
+            yield sse_event('end', {'chunks': n_chunks, 'n_samples': len(timestamps)})
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            yield sse_event('failed', {'error': str(e)})
+    
+    response = Response(events(), mimetype='text/event-stream')
+    response.cache_control.no_cache = True
+    response.headers['X-Accel-Buffering'] = 'no'  # Don't let a proxy buffer the stream
+    return response
+
+@bp.route('/api/cache/stats')
+def get_cache_stats():
+    """Get trial cache, response cache, processing pipeline and job statistics."""
+    state = get_state()
+    return jsonify({
+        'trials': state.trial_cache.stats(),
+        'responses': state.response_cache.stats(),
+        'pipeline': state.pipeline.stats(),
+        'in_flight': state.in_flight.in_flight(),
+        'jobs': state.jobs.stats()
+    })
+
+def annotated_ranges(annotations: dict) -> list:
+    """
+    Time ranges covered by an annotation, sorted and merged.
+    
+    Args:
+        annotations: Saved annotations with annotated_ranges ([start, end] of
+                     every page the annotator viewed) or, from older clients,
+                     time_window (annotated from 0 to time_window seconds)
+                     
+    Returns:
+        List of [start, end] in seconds
+        
+    Raises:
+        ValueError: If there are no ranges or a range is not two finite
+                    numbers with 0 <= start < end
+    """
+    ranges = annotations.get('annotated_ranges')
+    if ranges is None:
+        ranges = [[0.0, annotations.get('time_window', ANNOTATION_WINDOW_S)]]
+    
+    merged = []
+    try:
+        ranges = sorted((float(start), float(end)) for start, end in ranges)
+    except (TypeError, ValueError):
+        raise ValueError("annotated_ranges must be a list of [start, end] pairs (seconds)")
+    for start, end in ranges:
+        if not (math.isfinite(start) and math.isfinite(end)) or start < 0 or end <= start:
+            raise ValueError(f"Invalid annotated range: {start} to {end} s")
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    if not merged:
+        raise ValueError("annotated_ranges must not be empty")
+    return merged
+
+@bp.route('/api/annotations/<trial_id>', methods=['POST'])
 def save_annotations(trial_id):
-    """Save annotated events."""
+    """Save annotated events and the time ranges they cover."""
     try:
         annotations = request.json
+        try:
+            ranges = annotated_ranges(annotations)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        # Annotated seconds from the trial start, for readers unaware of ranges
+        duration = ranges[0][1] if ranges[0][0] == 0 else 0.0
         
         # Create output directory
-        output_dir = Path(__file__).parent.parent / 'output'
+        output_dir = get_state().output_dir
         output_dir.mkdir(exist_ok=True)
         
         # Prepare export data
@@ -170,7 +997,8 @@ def save_annotations(trial_id):
                 'trial_id': trial_id,
                 'total_events': len(annotations['events']),
                 'annotation_date': datetime.now().isoformat(),
-                'duration_seconds': annotations.get('time_window', 20.0),
+                'duration_seconds': duration,
+                'annotated_ranges': ranges,
                 'annotator': 'web_tool',
                 'sampling_rate': 1000
             },
@@ -178,16 +1006,19 @@ def save_annotations(trial_id):
                 'annotation_method': 'manual_expert_web_interface',
                 'constraint_type': 'left_leg_extension_lock',
                 'data_modalities': ['force_plates', 'kinematics', 'emg'],
-                'time_window': f"0 to {annotations.get('time_window', 20.0)} seconds",
+                'time_window': ', '.join(f"{start:g} to {end:g}" for start, end in ranges) + ' seconds',
                 'annotation_tool': 'web_based_chart_interface'
             },
             'events': annotations['events']
         }
         
         # Save to file
+        # Write to a temporary file first so concurrent readers never see a partial file
         output_file = output_dir / f'{trial_id}_ground_truth_events.json'
-        with open(output_file, 'w') as f:
+        temp_file = output_file.with_name(f'.{output_file.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        with open(temp_file, 'w') as f:
             json.dump(export_data, f, indent=2)
+        os.replace(temp_file, output_file)
         
         print(f"✓ Annotations saved to: {output_file}")
         print(f"  - Total events: {len(annotations['events'])}")
@@ -212,11 +1043,11 @@ def save_annotations(trial_id):
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/annotations/<trial_id>', methods=['GET'])
+@bp.route('/api/annotations/<trial_id>', methods=['GET'])
 def load_annotations(trial_id):
     """Load existing annotations if they exist."""
     try:
-        output_file = Path(__file__).parent.parent / 'output' / f'{trial_id}_ground_truth_events.json'
+        output_file = get_state().output_dir / f'{trial_id}_ground_truth_events.json'
         
         if output_file.exists():
             with open(output_file, 'r') as f:
@@ -236,8 +1067,8 @@ if __name__ == '__main__':
     print("🚀 Starting Ground Truth Annotation Server")
     print("=" * 50)
     
-    # Initialize data loader
-    init_data_loader()
+    # Initialize data loader, pipeline and caches
+    app = create_app()
     
     print(f"📝 Annotation interface will be available at:")
     print(f"   http://localhost:5000")
@@ -257,4 +1088,5 @@ if __name__ == '__main__':
     print(f"   5. Save annotations for algorithm validation")
     print("=" * 50)
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    # Development server; see create_app() for multi-worker serving
+    app.run(debug=True, host='0.0.0.0', port=5000, threaded=True)
\ No newline at end of file
@@ -3,14 +3,26 @@
 
 let trialData = null;
 let annotations = [];
+// Time ranges [start, end] shown to the annotator (sorted, non-overlapping);
+// saved with the events so evaluations only score what was annotated
+let annotatedRanges = [];
 let charts = {};
 let pendingEventTime = null;
 
+// Seconds of data fetched and shown per page
+const PAGE_SECONDS = 20.0;
+
+// Pixels of the min/max overview drawn while a page is streaming
+const OVERVIEW_WIDTH = 1000;
+
 // DOM elements
 const loadTrialBtn = document.getElementById('loadTrialBtn');
 const saveAnnotationsBtn = document.getElementById('saveAnnotationsBtn');
 const clearAnnotationsBtn = document.getElementById('clearAnnotationsBtn');
 const undoBtn = document.getElementById('undoBtn');
+const prevPageBtn = document.getElementById('prevPageBtn');
+const nextPageBtn = document.getElementById('nextPageBtn');
+const pageInfo = document.getElementById('pageInfo');
 const status = document.getElementById('status');
 const error = document.getElementById('error');
 const charts_container = document.getElementById('charts');
@@ -23,6 +35,8 @@ loadTrialBtn.addEventListener('click', loadTrial);
 saveAnnotationsBtn.addEventListener('click', saveAnnotations);
 clearAnnotationsBtn.addEventListener('click', clearAnnotations);
 undoBtn.addEventListener('click', undoLastAnnotation);
+prevPageBtn.addEventListener('click', () => showPage(trialData.start - PAGE_SECONDS));
+nextPageBtn.addEventListener('click', () => showPage(trialData.end));
 
 // Chart.js default configuration
 Chart.defaults.color = '#e5e7eb';
@@ -46,6 +60,242 @@ function hideMessages() {
     error.style.display = 'none';
 }
 
+// Decode a binary /api/data response: uint32 header length (little-endian), JSON header,
+// then float32 channels at the header's byte offsets. Returns the same structure as
+// the JSON response, with Float32Array channels and timestamps rebuilt from the sample index.
+function decodeBinaryTrialData(buffer) {
+    const headerLength = new DataView(buffer).getUint32(0, true);
+    const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, headerLength)));
+    const dataStart = 4 + headerLength;
+    
+    const data = {
+        trial_id: header.trial_id,
+        time_window: header.time_window,
+        start: header.start,
+        end: header.end,
+        duration: header.duration,
+        sampling_rate: header.sampling_rate,
+        timestamps: Array.from({ length: header.n_samples },
+                               (_, i) => (header.first_sample + i) / header.sampling_rate)
+    };
+    
+    header.channels.forEach(channel => {
+        let node = data;
+        channel.path.slice(0, -1).forEach(key => {
+            node = node[key] = node[key] || {};
+        });
+        node[channel.path[channel.path.length - 1]] =
+            new Float32Array(buffer, dataStart + channel.offset, channel.length);
+    });
+    
+    return data;
+}
+
+// Fetch one page of a trial; channels is an optional list of paths such as
+// 'force_plates.left.fz' or 'emg_envelopes' (default: all channels)
+async function fetchTrialPage(trialId, start, end, channels = null) {
+    const params = new URLSearchParams({ format: 'binary', start: start, end: end });
+    if (channels) {
+        params.set('channels', channels.join(','));
+    }
+    
+    const response = await fetch(`/api/data/${trialId}?${params}`);
+    if (!response.ok) {
+        throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+    }
+    return decodeBinaryTrialData(await response.arrayBuffer());
+}
+
+// Set a value at a channel path, e.g. data.force_plates.left.fz
+function setChannel(data, path, values) {
+    let node = data;
+    path.slice(0, -1).forEach(key => {
+        node = node[key] = node[key] || {};
+    });
+    node[path[path.length - 1]] = values;
+}
+
+// Page built from the streamed full-resolution samples so far, followed by the
+// overview for the rest of the page (each pixel drawn as its min and max)
+function mergeStreamedPage(overview, received) {
+    const lastTime = received.timestamps.length
+        ? received.timestamps[received.timestamps.length - 1]
+        : -Infinity;
+    const pixels = [];
+    overview.timestamps.forEach((time, i) => {
+        if (time > lastTime) pixels.push(i);
+    });
+    
+    const data = {
+        trial_id: overview.trial_id,
+        time_window: overview.time_window,
+        start: overview.start,
+        end: overview.end,
+        duration: overview.duration,
+        sampling_rate: overview.sampling_rate,
+        timestamps: received.timestamps.concat(
+            pixels.flatMap(i => [overview.timestamps[i], overview.timestamps[i]]))
+    };
+    
+    overview.channels.forEach(channel => {
+        const samples = received.channels[channel.path.join('.')] || [];
+        setChannel(data, channel.path,
+                   samples.concat(pixels.flatMap(i => [channel.min[i], channel.max[i]])));
+    });
+    
+    return data;
+}
+
+// Stream one page over Server-Sent Events: onUpdate(page) is called with a coarse
+// overview first, then as full-resolution chunks replace it from left to right.
+// Resolves with the complete page.
+function streamTrialPage(trialId, start, end, onUpdate) {
+    const params = new URLSearchParams({ start: start, end: end, width: OVERVIEW_WIDTH });
+    
+    return new Promise((resolve, reject) => {
+        const events = new EventSource(`/api/stream/${trialId}?${params}`);
+        const received = { timestamps: [], channels: {} };
+        let overview = null;
+        
+        events.addEventListener('overview', (event) => {
+            overview = JSON.parse(event.data);
+            onUpdate(mergeStreamedPage(overview, received));
+        });
+        events.addEventListener('chunk', (event) => {
+            const chunk = JSON.parse(event.data);
+            for (let i = 0; i < chunk.n_samples; i++) {
+                received.timestamps.push((chunk.first_sample + i) / chunk.sampling_rate);
+            }
+            chunk.channels.forEach(channel => {
+                const samples = received.channels[channel.path.join('.')] ||= [];
+                channel.values.forEach(value => samples.push(value));
+            });
+            onUpdate(mergeStreamedPage(overview, received));
+        });
+        events.addEventListener('end', () => {
+            events.close();
+            resolve(mergeStreamedPage(overview, received));
+        });
+        events.addEventListener('failed', (event) => {
+            events.close();
+            reject(new Error(JSON.parse(event.data).error));
+        });
+        events.onerror = () => {
+            events.close();
+            reject(new Error('Could not stream trial data'));
+        };
+    });
+}
+
+// Redraw the charts at most once per animation frame while a page streams in
+let redrawPending = false;
+
+function scheduleRedraw() {
+    if (redrawPending) return;
+    redrawPending = true;
+    requestAnimationFrame(() => {
+        redrawPending = false;
+        createCharts();
+    });
+}
+
+// Add a time range to annotatedRanges, merging it with ranges it overlaps or touches
+function addAnnotatedRange(start, end) {
+    const ranges = [...annotatedRanges, [start, end]].sort((a, b) => a[0] - b[0]);
+    annotatedRanges = [];
+    ranges.forEach(([rangeStart, rangeEnd]) => {
+        const last = annotatedRanges[annotatedRanges.length - 1];
+        if (last && rangeStart <= last[1] + 1e-6) {
+            last[1] = Math.max(last[1], rangeEnd);
+        } else {
+            annotatedRanges.push([rangeStart, rangeEnd]);
+        }
+    });
+}
+
+// Show a page of a trial, streamed progressively where the browser supports it
+async function loadPage(trialId, start, end) {
+    if (!window.EventSource) {
+        trialData = await fetchTrialPage(trialId, start, end);
+        createCharts();
+    } else {
+        trialData = await streamTrialPage(trialId, start, end, (page) => {
+            trialData = page;
+            scheduleRedraw();
+        });
+        scheduleRedraw();
+    }
+    
+    // Only pages that loaded completely count as annotated
+    addAnnotatedRange(trialData.start, trialData.end);
+}
+
+// Prepare a trial in the background, showing progress of each stage;
+// resolves with the job result ({trial_id, duration, cached})
+async function prepareTrial(trialId) {
+    const response = await fetch(`/api/jobs/prepare/${trialId}`, { method: 'POST' });
+    if (!response.ok) {
+        throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+    }
+    const { job } = await response.json();
+    
+    return new Promise((resolve, reject) => {
+        const events = new EventSource(`/api/jobs/${job.job_id}/events`);
+        
+        const showProgress = (event) => {
+            const stages = JSON.parse(event.data).stages;
+            const progress = Object.entries(stages)
+                .map(([stage, info]) => `${stage} ${info.status === 'done' ? '✓' : info.status === 'running' ? '…' : '–'}`)
+                .join('  ');
+            showStatus(`Preparing trial ${trialId}: ${progress}`);
+        };
+        
+        events.addEventListener('progress', showProgress);
+        events.addEventListener('done', (event) => {
+            events.close();
+            resolve(JSON.parse(event.data).result);
+        });
+        events.addEventListener('failed', (event) => {
+            events.close();
+            reject(new Error(JSON.parse(event.data).error));
+        });
+        events.onerror = () => {
+            events.close();
+            reject(new Error('Lost connection while preparing trial'));
+        };
+    });
+}
+
+async function showPage(start) {
+    if (!trialData) return;
+    
+    // Keep full pages at the end of the trial
+    const pageStart = Math.max(0, Math.min(start, trialData.duration - PAGE_SECONDS));
+    
+    try {
+        prevPageBtn.disabled = true;
+        nextPageBtn.disabled = true;
+        
+        await loadPage(trialData.trial_id, pageStart, pageStart + PAGE_SECONDS);
+        
+    } catch (err) {
+        console.error('Error loading page:', err);
+        showStatus(`Error loading page: ${err.message}`, true);
+    } finally {
+        updatePageControls();
+    }
+}
+
+function updatePageControls() {
+    const hasData = trialData !== null;
+    
+    prevPageBtn.disabled = !hasData || trialData.start <= 0;
+    nextPageBtn.disabled = !hasData || trialData.end >= trialData.duration;
+    pageInfo.textContent = hasData
+        ? `${trialData.start.toFixed(1)}-${trialData.end.toFixed(1)} s of ${trialData.duration.toFixed(1)} s`
+        : '';
+}
+
 async function loadTrial() {
     const trialId = 'T5';
     
@@ -53,32 +303,40 @@ async function loadTrial() {
         showStatus('Loading trial data...');
         loadTrialBtn.disabled = true;
         
-        const response = await fetch(`/api/data/${trialId}`);
-        if (!response.ok) {
-            throw new Error(`HTTP ${response.status}: ${response.statusText}`);
-        }
-        
-        trialData = await response.json();
+        // Synchronize in the background (the server also prefetches the next trial);
+        // the first page is streamed meanwhile
+        const preparation = prepareTrial(trialId);
         
         // Load existing annotations if they exist
+        annotatedRanges = [];
+        let loadedMessage = '✓ Trial loaded - ready for annotation';
         const annotationsResponse = await fetch(`/api/annotations/${trialId}`);
         if (annotationsResponse.ok) {
             const existingAnnotations = await annotationsResponse.json();
             if (existingAnnotations.exists) {
                 annotations = existingAnnotations.events || [];
-                showStatus(`✓ Trial loaded with ${annotations.length} existing annotations`);
+                // Files without ranges covered the trial from 0 to duration_seconds
+                const info = existingAnnotations.trial_info || {};
+                (info.annotated_ranges || [[0, info.duration_seconds || 0]])
+                    .filter(([start, end]) => end > start)
+                    .forEach(([start, end]) => addAnnotatedRange(start, end));
+                loadedMessage = `✓ Trial loaded with ${annotations.length} existing annotations`;
             } else {
                 annotations = [];
-                showStatus('✓ Trial loaded - ready for annotation');
             }
         }
         
-        createCharts();
+        // Charts need a visible container to size themselves while the page streams in
+        charts_container.style.display = 'block';
+        loading.style.display = 'none';
+        
+        await loadPage(trialId, 0, PAGE_SECONDS);
         updateEventCounts();
         updateButtons();
+        updatePageControls();
         
-        charts_container.style.display = 'block';
-        loading.style.display = 'none';
+        await preparation;
+        showStatus(loadedMessage);
         
     } catch (err) {
         console.error('Error loading trial:', err);
@@ -323,11 +581,14 @@ function handleChartClick(event, chart, chartType) {
     const rect = chart.canvas.getBoundingClientRect();
     const x = event.clientX - rect.left;
     
-    // Convert pixel position to data coordinates
+    // Convert pixel position to data coordinates: the x axis is a category
+    // scale over trialData.timestamps, so it returns a sample index, not seconds
     const canvasPosition = Chart.helpers.getRelativePosition(event, chart);
-    const dataX = chart.scales.x.getValueForPixel(canvasPosition.x);
+    const index = Math.round(chart.scales.x.getValueForPixel(canvasPosition.x));
+    if (!(index >= 0 && index < trialData.timestamps.length)) return;
+    const dataX = trialData.timestamps[index];
     
-    if (dataX >= 0 && dataX <= trialData.time_window) {
+    if (dataX >= trialData.start && dataX <= trialData.end) {
         pendingEventTime = dataX;
         eventTime.textContent = dataX.toFixed(3);
         eventModal.style.display = 'block';
@@ -452,7 +713,7 @@ async function saveAnnotations() {
         
         const payload = {
             events: annotations,
-            time_window: trialData.time_window
+            annotated_ranges: annotatedRanges
         };
         
         const response = await fetch(`/api/annotations/${trialData.trial_id}`, {
@@ -513,4 +774,5 @@ function undoLastAnnotation() {
 
 // Initialize
 hideMessages();
-updateButtons();
\ No newline at end of file
+updateButtons();
+updatePageControls();
\ No newline at end of file